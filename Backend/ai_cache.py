@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from starlette.concurrency import run_in_threadpool
+
+from ai_client import GEMINI_MODEL
+from database import SessionLocal
+from models import AICacheEntry
+
+# Endpoint türüne göre saniye cinsinden yaşam süreleri
+CACHE_TTLS = {
+    "note_quiz": 60 * 60,
+    "question_quiz": 60 * 60,
+    "note_check": 7 * 24 * 60 * 60,
+    "note_edit": 7 * 24 * 60 * 60,
+    "quiz_condense": 24 * 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+# Veritabanındaki süresi geçmiş kayıtların silinme aralığı (saniye)
+AI_CACHE_PURGE_INTERVAL = float(os.getenv("AI_CACHE_PURGE_INTERVAL", "3600"))
+
+
+class LRUCache:
+    """Süre sınırlı, en az kullanılanı atan bellek içi önbellek"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: int):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+memory_cache = LRUCache(int(os.getenv("AI_CACHE_MAX_ENTRIES", "1024")))
+stats = {}
+
+
+def _count(kind: str, field: str):
+    kind_stats = stats.setdefault(kind, {"memory_hits": 0, "db_hits": 0, "misses": 0})
+    kind_stats[field] += 1
+
+
+def make_key(template_version: str, inputs, model: str = GEMINI_MODEL) -> str:
+    """Model adı, prompt şablon versiyonu ve girdilerden içerik adresli anahtar üretir"""
+    raw = json.dumps([model, template_version, inputs], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _load_from_db(key: str) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        entry = db.query(AICacheEntry).filter(
+            AICacheEntry.key == key,
+            AICacheEntry.expires_at > datetime.now(timezone.utc)
+        ).first()
+        return entry.response if entry else None
+    finally:
+        db.close()
+
+
+def _save_to_db(key: str, kind: str, value: str, ttl: int):
+    now = datetime.now(timezone.utc)
+    values = {
+        "key": key,
+        "kind": kind,
+        "response": value,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=ttl),
+    }
+    stmt = insert(AICacheEntry).values(**values)
+    stmt = stmt.on_conflict_do_update(index_elements=[AICacheEntry.key], set_=values)
+    db = SessionLocal()
+    try:
+        db.execute(stmt)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _purge_db() -> int:
+    db = SessionLocal()
+    try:
+        # expires_at indeksi sayesinde sadece süresi geçmiş kayıtlar taranır
+        deleted = db.query(AICacheEntry).filter(
+            AICacheEntry.expires_at < datetime.now(timezone.utc)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+async def lookup(kind: str, template_version: str, inputs) -> Optional[str]:
+    """Önce bellekte, sonra veritabanında geçerli bir kayıt arar"""
+    key = make_key(f"{kind}:{template_version}", inputs)
+
+    value = memory_cache.get(key)
+    if value is not None:
+        _count(kind, "memory_hits")
+        return value
+
+    try:
+        value = await run_in_threadpool(_load_from_db, key)
+    except Exception as e:
+        print(f"AI cache okunamadı: {e}")
+        value = None
+    if value is not None:
+        _count(kind, "db_hits")
+        memory_cache.set(key, value, CACHE_TTLS.get(kind, DEFAULT_TTL))
+        return value
+
+    _count(kind, "misses")
+    return None
+
+
+async def store(kind: str, template_version: str, inputs, value: str):
+    key = make_key(f"{kind}:{template_version}", inputs)
+    ttl = CACHE_TTLS.get(kind, DEFAULT_TTL)
+    memory_cache.set(key, value, ttl)
+    try:
+        await run_in_threadpool(_save_to_db, key, kind, value, ttl)
+    except Exception as e:
+        print(f"AI cache yazılamadı: {e}")
+
+
+async def cached_generate(
+    kind: str,
+    template_version: str,
+    inputs,
+    produce: Callable[[], Awaitable[str]],
+    validate: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """Önbellekte varsa yanıtı döndürür, yoksa produce() ile üretip iki katmana da yazar.
+
+    validate verilirse sadece geçerli sayılan yanıtlar önbelleğe alınır.
+    """
+    value = await lookup(kind, template_version, inputs)
+    if value is not None:
+        return value
+
+    value = await produce()
+    if value and (validate is None or validate(value)):
+        await store(kind, template_version, inputs, value)
+    return value
+
+
+async def run_purger():
+    """Süresi geçmiş önbellek kayıtlarını düzenli aralıklarla silen arka plan görevi"""
+    while True:
+        try:
+            deleted = await run_in_threadpool(_purge_db)
+            if deleted:
+                print(f"AI cache: {deleted} süresi geçmiş kayıt silindi")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"AI cache temizlenemedi: {e}")
+        await asyncio.sleep(AI_CACHE_PURGE_INTERVAL)
+
+
+def get_stats() -> dict:
+    return {
+        "memory_entries": len(memory_cache),
+        "by_kind": stats,
+    }
@@ -0,0 +1,141 @@
+import json
+import os
+from typing import AsyncIterator, Optional
+
+import httpx
+
+# HTTP/2 için h2 paketi gerekiyor, yoksa HTTP/1.1 ile devam et
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Yük testlerinde scripts/gemini_stub.py'ye yönlendirmek için GEMINI_BASE_URL değiştirilebilir
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_URL = f"{GEMINI_BASE_URL}/v1beta/models/{GEMINI_MODEL}:generateContent"
+GEMINI_STREAM_URL = f"{GEMINI_BASE_URL}/v1beta/models/{GEMINI_MODEL}:streamGenerateContent"
+DEFAULT_TIMEOUT = 30.0
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+class AIServiceError(Exception):
+    """Gemini isteği başarısız olduğunda fırlatılır"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def get_client() -> httpx.AsyncClient:
+    """Tüm AI endpoint'lerinin paylaştığı keep-alive havuzlu istemciyi döndürür"""
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("GEMINI_MAX_CONNECTIONS", "200")),
+            max_keepalive_connections=int(os.getenv("GEMINI_MAX_KEEPALIVE", "50")),
+            keepalive_expiry=float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "60")),
+        )
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=limits,
+            timeout=httpx.Timeout(float(os.getenv("GEMINI_TIMEOUT", DEFAULT_TIMEOUT)), connect=10.0),
+            headers={"Content-Type": "application/json"},
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def build_payload(prompt: str) -> dict:
+    return {
+        "contents": [
+            {
+                "parts": [
+                    {
+                        "text": prompt
+                    }
+                ]
+            }
+        ]
+    }
+
+
+def clean_ai_json(ai_response: str) -> str:
+    """AI yanıtındaki ```json ve ``` işaretlerini kaldırır"""
+    ai_response = ai_response.strip()
+    if ai_response.startswith("```json"):
+        ai_response = ai_response[7:]  # ```json kısmını kaldır
+    if ai_response.startswith("```"):
+        ai_response = ai_response[3:]  # ``` kısmını kaldır
+    if ai_response.endswith("```"):
+        ai_response = ai_response[:-3]  # Sondaki ``` kısmını kaldır
+    return ai_response.strip()
+
+
+def extract_text(response_data: dict) -> str:
+    """Gemini yanıtından ilk adayın metnini çıkarır"""
+    candidates = response_data.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts") or [{}]
+    return parts[0].get("text", "")
+
+
+async def generate_content(prompt: str, api_key: str, timeout: Optional[float] = None) -> str:
+    """Prompt'u Gemini'ye gönderir ve yanıt metnini döndürür.
+
+    timeout verilmezse istemcinin varsayılan timeout'u kullanılır.
+    """
+    client = get_client()
+    request_timeout = timeout if timeout is not None else client.timeout
+
+    try:
+        response = await client.post(
+            GEMINI_URL,
+            params={"key": api_key},
+            json=build_payload(prompt),
+            timeout=request_timeout,
+        )
+    except httpx.HTTPError as e:
+        raise AIServiceError(f"AI servisi hatası: {str(e)}")
+
+    if response.status_code != 200:
+        raise AIServiceError("AI servisi ile iletişim kurulamadı", status_code=response.status_code)
+
+    return extract_text(response.json())
+
+
+async def stream_generate_content(prompt: str, api_key: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """Prompt'u streamGenerateContent ile gönderir, gelen metin parçalarını sırayla verir"""
+    client = get_client()
+    request_timeout = timeout if timeout is not None else client.timeout
+
+    try:
+        async with client.stream(
+            "POST",
+            GEMINI_STREAM_URL,
+            params={"key": api_key, "alt": "sse"},
+            json=build_payload(prompt),
+            timeout=request_timeout,
+        ) as response:
+            if response.status_code != 200:
+                raise AIServiceError("AI servisi ile iletişim kurulamadı", status_code=response.status_code)
+
+            # Her SSE olayı "data: {...}" satırı olarak gelir
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if not payload:
+                    continue
+                text = extract_text(json.loads(payload))
+                if text:
+                    yield text
+    except httpx.HTTPError as e:
+        raise AIServiceError(f"AI servisi hatası: {str(e)}")
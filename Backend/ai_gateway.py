@@ -0,0 +1,237 @@
+import asyncio
+import os
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException
+from starlette import status
+
+from ai_client import generate_content, stream_generate_content, AIServiceError
+
+# Tüm Gemini çağrıları için eşzamanlılık sınırları
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "100"))
+AI_MAX_CONCURRENCY_PER_KEY = int(os.getenv("AI_MAX_CONCURRENCY_PER_KEY", "50"))
+# Slot bekleme süresi, dolarsa istek sıraya girmek yerine hızlıca reddedilir (saniye)
+AI_QUEUE_TIMEOUT = float(os.getenv("AI_QUEUE_TIMEOUT", "5"))
+# 429 ve 5xx yanıtlarında tekrar deneme ayarları
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+AI_BACKOFF_BASE = float(os.getenv("AI_BACKOFF_BASE", "0.5"))
+AI_BACKOFF_MAX = float(os.getenv("AI_BACKOFF_MAX", "8"))
+# Art arda bu kadar hata olursa devre açılır ve istekler hemen reddedilir
+AI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("AI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+AI_CIRCUIT_RESET_TIMEOUT = float(os.getenv("AI_CIRCUIT_RESET_TIMEOUT", "30"))
+
+API_KEY_NAMES = ("GOOGLE_API_KEY", "GOOGLE_API_KEY_3")
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class AIUnavailableError(AIServiceError):
+    """Upstream sağlıksız ya da kapasite dolu olduğunda fırlatılır"""
+
+
+class CircuitBreaker:
+    """Art arda hatalarda açılan, bekleme süresinden sonra tek deneme isteğine izin veren devre kesici"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # allow_request sonuçları; TRIAL alan çağıran, deneme isteğinin yerini kendisi boşaltır
+    REJECTED = 0
+    ALLOWED = 1
+    TRIAL = 2
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow_request(self) -> int:
+        if self.state == self.CLOSED:
+            return self.ALLOWED
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return self.TRIAL
+        return self.REJECTED
+
+    def record_success(self, trial: bool = False):
+        self.state = self.CLOSED
+        self.failures = 0
+        if trial:
+            self._trial_in_flight = False
+
+    def record_failure(self, trial: bool = False):
+        # Devre kapalıyken kabul edilip geç biten istek, süren denemenin yerini boşaltmaz
+        if trial:
+            self._trial_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Sonucu kaydedilmeden biten (429, iptal, beklenmeyen hata) deneme isteğinin yerini boşaltır.
+
+        Çağrılmazsa devre yarı açık kalır ve sonraki tüm istekler reddedilir.
+        """
+        self._trial_in_flight = False
+
+
+circuit = CircuitBreaker(AI_CIRCUIT_FAILURE_THRESHOLD, AI_CIRCUIT_RESET_TIMEOUT)
+_global_slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+_key_slots: Dict[str, asyncio.Semaphore] = {}
+# 429 alan anahtar bu zamana kadar tercih edilmez
+_key_cooldown_until: Dict[str, float] = {}
+
+
+def has_api_key() -> bool:
+    """Gateway'in deneyebileceği en az bir anahtar tanımlı mı"""
+    return any(os.getenv(name) for name in API_KEY_NAMES)
+
+
+def candidate_keys(preferred_key: Optional[str]) -> List[str]:
+    """Tercih edilen anahtar önce, sonra diğerleri; soğumadaki anahtarlar en sona"""
+    keys = []
+    for key in [preferred_key] + [os.getenv(name) for name in API_KEY_NAMES]:
+        if key and key not in keys:
+            keys.append(key)
+    now = time.monotonic()
+    return sorted(keys, key=lambda k: _key_cooldown_until.get(k, 0) > now)
+
+
+def backoff_delay(attempt: int) -> float:
+    # Full jitter: 0 ile üstel sınır arasında rastgele bekleme
+    return random.uniform(0, min(AI_BACKOFF_MAX, AI_BACKOFF_BASE * (2 ** attempt)))
+
+
+def is_retryable(e: AIServiceError) -> bool:
+    return e.status_code is None or e.status_code in RETRYABLE_STATUS_CODES
+
+
+def is_upstream_failure(e: AIServiceError) -> bool:
+    # Bağlantı hataları ve 5xx upstream sağlığını gösterir; 4xx isteğin kendisinden kaynaklanır
+    return e.status_code is None or e.status_code >= 500
+
+
+async def _acquire(semaphore: asyncio.Semaphore):
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=AI_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise AIUnavailableError("AI servisi şu anda yoğun, lütfen tekrar deneyin", status_code=503)
+
+
+def _key_semaphore(key: str) -> asyncio.Semaphore:
+    if key not in _key_slots:
+        _key_slots[key] = asyncio.Semaphore(AI_MAX_CONCURRENCY_PER_KEY)
+    return _key_slots[key]
+
+
+def _record_error(key: str, e: AIServiceError, attempt: int, trial: bool):
+    if e.status_code == 429:
+        # Kota hatası upstream sağlığını göstermez, sadece anahtarı soğumaya al
+        _key_cooldown_until[key] = time.monotonic() + backoff_delay(attempt + 1)
+    elif is_upstream_failure(e):
+        circuit.record_failure(trial)
+
+
+async def generate(prompt: str, api_key: Optional[str] = None, timeout: Optional[float] = None) -> str:
+    """generate_content'i eşzamanlılık sınırı, tekrar deneme ve devre kesici ile çağırır"""
+    keys = candidate_keys(api_key)
+    if not keys:
+        raise AIServiceError("AI API key bulunamadı")
+
+    last_error = None
+    for attempt in range(AI_MAX_RETRIES + 1):
+        admission = circuit.allow_request()
+        if admission == CircuitBreaker.REJECTED:
+            raise AIUnavailableError("AI servisi geçici olarak kullanılamıyor", status_code=503)
+        trial = admission == CircuitBreaker.TRIAL
+
+        key = keys[attempt % len(keys)]
+        try:
+            await _acquire(_global_slots)
+            try:
+                await _acquire(_key_semaphore(key))
+                try:
+                    result = await generate_content(prompt, key, timeout=timeout)
+                finally:
+                    _key_semaphore(key).release()
+            except AIUnavailableError:
+                raise
+            except AIServiceError as e:
+                last_error = e
+                _record_error(key, e, attempt, trial)
+                if not is_retryable(e) or attempt == AI_MAX_RETRIES:
+                    raise
+            else:
+                circuit.record_success(trial)
+                return result
+            finally:
+                _global_slots.release()
+        finally:
+            if trial:
+                circuit.release_trial()
+
+        await asyncio.sleep(backoff_delay(attempt))
+
+    raise last_error
+
+
+async def stream(prompt: str, api_key: Optional[str] = None, timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """stream_generate_content'i aynı korumalarla çağırır.
+
+    İlk parça gelmeden oluşan hatalarda tekrar denenir, parça gönderildikten
+    sonra oluşan hata doğrudan çağırana iletilir.
+    """
+    keys = candidate_keys(api_key)
+    if not keys:
+        raise AIServiceError("AI API key bulunamadı")
+
+    for attempt in range(AI_MAX_RETRIES + 1):
+        admission = circuit.allow_request()
+        if admission == CircuitBreaker.REJECTED:
+            raise AIUnavailableError("AI servisi geçici olarak kullanılamıyor", status_code=503)
+        trial = admission == CircuitBreaker.TRIAL
+
+        key = keys[attempt % len(keys)]
+        started = False
+        try:
+            await _acquire(_global_slots)
+            try:
+                await _acquire(_key_semaphore(key))
+                try:
+                    async for chunk in stream_generate_content(prompt, key, timeout=timeout):
+                        started = True
+                        yield chunk
+                finally:
+                    _key_semaphore(key).release()
+            except AIUnavailableError:
+                raise
+            except AIServiceError as e:
+                _record_error(key, e, attempt, trial)
+                if started or not is_retryable(e) or attempt == AI_MAX_RETRIES:
+                    raise
+            else:
+                circuit.record_success(trial)
+                return
+            finally:
+                _global_slots.release()
+        finally:
+            # İstemci bağlantıyı kesse (GeneratorExit) de deneme isteğinin yeri boşalır
+            if trial:
+                circuit.release_trial()
+
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+def to_http_exception(e: AIServiceError) -> HTTPException:
+    if isinstance(e, AIUnavailableError):
+        return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -0,0 +1,37 @@
+"""AI cache entries added.
+
+Revision ID: a3c91f0d2b57
+Revises: 0157a05a04e7
+Create Date: 2026-10-18 10:12:31.204815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c91f0d2b57'
+down_revision: Union[str, Sequence[str], None] = '0157a05a04e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ai_cache_entries',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_ai_cache_entries_expires_at'), 'ai_cache_entries', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ai_cache_entries_expires_at'), table_name='ai_cache_entries')
+    op.drop_table('ai_cache_entries')
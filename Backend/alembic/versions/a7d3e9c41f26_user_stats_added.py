@@ -0,0 +1,68 @@
+"""User stats added.
+
+Revision ID: a7d3e9c41f26
+Revises: f3a8d2e61b47
+Create Date: 2026-10-18 15:52:31.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9c41f26'
+down_revision: Union[str, Sequence[str], None] = 'f3a8d2e61b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTER_COLUMNS = (
+    'note_lessons', 'note_terms', 'notes',
+    'question_lessons', 'question_terms', 'questions',
+    'questions_easy', 'questions_medium', 'questions_hard',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    *[sa.Column(column, sa.Integer(), server_default='0', nullable=False) for column in COUNTER_COLUMNS],
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Mevcut kullanıcıların sayaçlarını doldur
+    op.execute("""
+        INSERT INTO user_stats (user_id, note_lessons, note_terms, notes, question_lessons, question_terms,
+                                questions, questions_easy, questions_medium, questions_hard)
+        SELECT u.id,
+               coalesce(n.note_lessons, 0), coalesce(n.note_terms, 0), coalesce(n.notes, 0),
+               coalesce(q.question_lessons, 0), coalesce(q.question_terms, 0), coalesce(q.questions, 0),
+               coalesce(q.questions_easy, 0), coalesce(q.questions_medium, 0), coalesce(q.questions_hard, 0)
+        FROM users u
+        LEFT JOIN (
+            SELECT l.user_id, count(DISTINCT l.id) AS note_lessons, count(DISTINCT t.id) AS note_terms,
+                   count(n.id) AS notes
+            FROM note_lessons l
+            LEFT JOIN note_terms t ON t.n_lesson_id = l.id
+            LEFT JOIN notes n ON n.term_id = t.id
+            GROUP BY l.user_id
+        ) n ON n.user_id = u.id
+        LEFT JOIN (
+            SELECT l.user_id, count(DISTINCT l.id) AS question_lessons, count(DISTINCT t.id) AS question_terms,
+                   count(q.id) AS questions,
+                   count(q.id) FILTER (WHERE q.difficulty_category = 1) AS questions_easy,
+                   count(q.id) FILTER (WHERE q.difficulty_category = 2) AS questions_medium,
+                   count(q.id) FILTER (WHERE q.difficulty_category = 3) AS questions_hard
+            FROM question_lessons l
+            LEFT JOIN question_terms t ON t.q_lesson_id = l.id
+            LEFT JOIN questions q ON q.term_id = t.id
+            GROUP BY l.user_id
+        ) q ON q.user_id = u.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_stats')
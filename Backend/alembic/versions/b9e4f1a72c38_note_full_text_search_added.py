@@ -0,0 +1,40 @@
+"""Note full text search added.
+
+Revision ID: b9e4f1a72c38
+Revises: a7d3e9c41f26
+Create Date: 2026-10-18 16:41:07.552913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4f1a72c38'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e9c41f26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Generated kolon eklemek tabloyu bir kez yeniden yazar, mevcut notlar da burada indekslenir
+    op.add_column('notes', sa.Column(
+        'content_tsv',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('turkish', coalesce(content, ''))", persisted=True),
+        nullable=True,
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_notes_content_tsv', 'notes', ['content_tsv'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_notes_content_tsv', table_name='notes', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('notes', 'content_tsv')
@@ -0,0 +1,34 @@
+"""Question ocr trigram index added.
+
+Revision ID: c2d7a5e83f19
+Revises: b9e4f1a72c38
+Create Date: 2026-10-18 17:12:45.130482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d7a5e83f19'
+down_revision: Union[str, Sequence[str], None] = 'b9e4f1a72c38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        op.create_index('ix_questions_ocr_text_trgm', 'questions', ['ocr_text'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'ocr_text': 'gin_trgm_ops'},
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Eklenti başka nesneler tarafından da kullanılıyor olabilir, kaldırılmaz
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_questions_ocr_text_trgm', table_name='questions', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""Cultural question pool added.
+
+Revision ID: c5e27b8a4f10
+Revises: a3c91f0d2b57
+Create Date: 2026-10-18 11:03:47.519203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e27b8a4f10'
+down_revision: Union[str, Sequence[str], None] = 'a3c91f0d2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cultural_questions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.Column('question_hash', sa.String(length=64), nullable=False),
+    sa.Column('pool_date', sa.Date(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('pool_date', 'question_hash')
+    )
+    op.create_index(op.f('ix_cultural_questions_pool_date'), 'cultural_questions', ['pool_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cultural_questions_pool_date'), table_name='cultural_questions')
+    op.drop_table('cultural_questions')
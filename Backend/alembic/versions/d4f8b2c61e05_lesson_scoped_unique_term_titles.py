@@ -0,0 +1,68 @@
+"""Lesson scoped unique term titles.
+
+Revision ID: d4f8b2c61e05
+Revises: c2d7a5e83f19
+Create Date: 2026-10-18 17:48:19.604311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f8b2c61e05'
+down_revision: Union[str, Sequence[str], None] = 'c2d7a5e83f19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (term tablosu, lesson kolonu, içerik tablosu, lesson tablosu, sayaç kolonu, eski index, yeni unique index)
+TERM_TABLES = [
+    ('question_terms', 'q_lesson_id', 'questions', 'question_lessons', 'question_terms',
+     'ix_question_terms_q_lesson_id', 'uq_question_terms_q_lesson_id_term_title'),
+    ('note_terms', 'n_lesson_id', 'notes', 'note_lessons', 'note_terms',
+     'ix_note_terms_n_lesson_id', 'uq_note_terms_n_lesson_id_term_title'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for term_table, lesson_column, content_table, lesson_table, counter, _, _ in TERM_TABLES:
+        # Aynı derste aynı başlıklı term'ler en eski term'de birleştirilir, içerik kaybolmaz
+        duplicates = f"""
+            SELECT id, min(id) OVER (PARTITION BY {lesson_column}, term_title) AS keep_id
+            FROM {term_table} WHERE term_title IS NOT NULL
+        """
+        op.execute(f"""
+            UPDATE {content_table} c SET term_id = d.keep_id
+            FROM ({duplicates}) d
+            WHERE c.term_id = d.id AND d.id <> d.keep_id
+        """)
+        op.execute(f"""
+            DELETE FROM {term_table} t USING ({duplicates}) d
+            WHERE t.id = d.id AND d.id <> d.keep_id
+        """)
+        op.execute(f"""
+            UPDATE user_stats s SET {counter} = (
+                SELECT count(t.id) FROM {lesson_table} l JOIN {term_table} t ON t.{lesson_column} = l.id
+                WHERE l.user_id = s.user_id
+            )
+        """)
+
+    with op.get_context().autocommit_block():
+        for term_table, lesson_column, _, _, _, old_index, unique_index in TERM_TABLES:
+            op.create_index(unique_index, term_table, [lesson_column, 'term_title'], unique=True,
+                            postgresql_concurrently=True, if_not_exists=True)
+            # Unique index lesson kolonuyla başladığı için tek kolonluk index gereksiz kalır
+            op.drop_index(old_index, table_name=term_table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Birleştirilen term'ler geri ayrılmaz, sadece index'ler eski haline döner
+    with op.get_context().autocommit_block():
+        for term_table, lesson_column, _, _, _, old_index, unique_index in reversed(TERM_TABLES):
+            op.create_index(old_index, term_table, [lesson_column], unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(unique_index, table_name=term_table, postgresql_concurrently=True, if_exists=True)
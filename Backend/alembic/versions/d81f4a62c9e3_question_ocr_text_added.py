@@ -0,0 +1,32 @@
+"""Question OCR text added.
+
+Revision ID: d81f4a62c9e3
+Revises: c5e27b8a4f10
+Create Date: 2026-10-18 12:21:05.882714
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4a62c9e3'
+down_revision: Union[str, Sequence[str], None] = 'c5e27b8a4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('questions', sa.Column('ocr_text', sa.Text(), nullable=True))
+    op.add_column('questions', sa.Column('image_hash', sa.String(length=64), nullable=True))
+    op.add_column('questions', sa.Column('ocr_engine_version', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('questions', 'ocr_engine_version')
+    op.drop_column('questions', 'image_hash')
+    op.drop_column('questions', 'ocr_text')
@@ -0,0 +1,46 @@
+"""Quiz jobs added.
+
+Revision ID: e4b0c7d15a92
+Revises: d81f4a62c9e3
+Create Date: 2026-10-18 13:40:12.671930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b0c7d15a92'
+down_revision: Union[str, Sequence[str], None] = 'd81f4a62c9e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('quiz_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('params', sa.Text(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_quiz_jobs_queue', 'quiz_jobs', ['status', 'priority', 'created_at'], unique=False)
+    op.create_index(op.f('ix_quiz_jobs_user_id'), 'quiz_jobs', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_quiz_jobs_user_id'), table_name='quiz_jobs')
+    op.drop_index('ix_quiz_jobs_queue', table_name='quiz_jobs')
+    op.drop_table('quiz_jobs')
@@ -0,0 +1,53 @@
+"""Cascading foreign keys.
+
+Revision ID: e6a1c3d94b27
+Revises: d4f8b2c61e05
+Create Date: 2026-10-18 18:30:52.271840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a1c3d94b27'
+down_revision: Union[str, Sequence[str], None] = 'd4f8b2c61e05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tablo, kolon, referans tablo); constraint adları PostgreSQL'in varsayılan adlarıdır
+FOREIGN_KEYS = [
+    ('question_lessons', 'user_id', 'users'),
+    ('note_lessons', 'user_id', 'users'),
+    ('question_terms', 'q_lesson_id', 'question_lessons'),
+    ('note_terms', 'n_lesson_id', 'note_lessons'),
+    ('questions', 'term_id', 'question_terms'),
+    ('notes', 'term_id', 'note_terms'),
+]
+
+
+def replace_foreign_keys(ondelete) -> None:
+    on_delete = f' ON DELETE {ondelete}' if ondelete else ''
+    # Her ALTER ayrı transaction'da çalışır: constraint tek ifadede değiştirilip NOT VALID eklenir
+    # (kısa kilit, tarama yok), doğrulama taraması sonra yazmaları engellemeyen kilitle yapılır
+    with op.get_context().autocommit_block():
+        for table, column, referred in FOREIGN_KEYS:
+            name = f'{table}_{column}_fkey'
+            op.execute(
+                f'ALTER TABLE {table} DROP CONSTRAINT {name}, '
+                f'ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referred} (id){on_delete} NOT VALID'
+            )
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ORM alt kayıtları yüklemeden siler (passive_deletes), silme zinciri veritabanında yürür
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    replace_foreign_keys(None)
@@ -0,0 +1,43 @@
+"""Foreign key and filter indexes added.
+
+Revision ID: f3a8d2e61b47
+Revises: e4b0c7d15a92
+Create Date: 2026-10-18 15:08:54.310266
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8d2e61b47'
+down_revision: Union[str, Sequence[str], None] = 'e4b0c7d15a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index adı, tablo, kolonlar); composite index'ler baştaki kolon için ayrı index ihtiyacını da karşılar
+INDEXES = [
+    ('ix_question_lessons_user_id_lesson_title', 'question_lessons', ['user_id', 'lesson_title']),
+    ('ix_note_lessons_user_id_lesson_title', 'note_lessons', ['user_id', 'lesson_title']),
+    ('ix_question_terms_q_lesson_id', 'question_terms', ['q_lesson_id']),
+    ('ix_note_terms_n_lesson_id', 'note_terms', ['n_lesson_id']),
+    ('ix_questions_term_id_difficulty_category_id', 'questions', ['term_id', 'difficulty_category', 'id']),
+    ('ix_notes_term_id_id', 'notes', ['term_id', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY tabloyu kilitlemez ama transaction içinde çalışamaz
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
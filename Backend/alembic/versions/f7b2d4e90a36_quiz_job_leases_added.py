@@ -0,0 +1,30 @@
+"""Quiz job leases added.
+
+Revision ID: f7b2d4e90a36
+Revises: e6a1c3d94b27
+Create Date: 2026-10-18 21:05:37.418263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b2d4e90a36'
+down_revision: Union[str, Sequence[str], None] = 'e6a1c3d94b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('quiz_jobs', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    # Lease'i olmayan eski çalışan kayıtlar ilk taramada yeniden kuyruğa alınsın
+    op.execute("UPDATE quiz_jobs SET lease_expires_at = now() WHERE status = 'running'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('quiz_jobs', 'lease_expires_at')
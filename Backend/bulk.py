@@ -0,0 +1,42 @@
+"""Toplu oluşturma endpoint'lerinin ortak sınırı ve yanıt modelleri"""
+import os
+from typing import List, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from starlette import status
+
+# Tek istekte kabul edilen en fazla öğe sayısı
+MAX_BULK_ITEMS = int(os.getenv("MAX_BULK_ITEMS", "500"))
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+def ensure_bulk_size(count: int):
+    if count == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="En az bir öğe gönderilmelidir")
+    if count > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tek istekte en fazla {MAX_BULK_ITEMS} öğe gönderilebilir"
+        )
+
+
+def failure(index: int, error: str) -> BulkItemResult:
+    return BulkItemResult(index=index, success=False, error=error)
+
+
+def build_response(results: List[BulkItemResult]) -> BulkResponse:
+    created = sum(1 for result in results if result.success)
+    return BulkResponse(created=created, failed=len(results) - created, results=results)
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from starlette.concurrency import run_in_threadpool
+
+from ai_client import clean_ai_json, AIServiceError
+from ai_gateway import generate, has_api_key
+from database import SessionLocal
+from models import CulturalInfo
+
+# Her gün için havuzda tutulacak doğrulanmış soru sayısı
+CULTURAL_POOL_TARGET = int(os.getenv("CULTURAL_POOL_TARGET", "200"))
+# Havuz dolduktan sonra tekrar kontrol aralığı (saniye)
+CULTURAL_POOL_CHECK_INTERVAL = int(os.getenv("CULTURAL_POOL_CHECK_INTERVAL", "300"))
+# Gemini hata verdiğinde bekleme süresi (saniye)
+CULTURAL_POOL_ERROR_BACKOFF = int(os.getenv("CULTURAL_POOL_ERROR_BACKOFF", "60"))
+# Eski günlerin soruları bu kadar gün saklanır
+CULTURAL_POOL_RETENTION_DAYS = int(os.getenv("CULTURAL_POOL_RETENTION_DAYS", "7"))
+# Endpoint'in her istekte döndürdüğü soru sayısı
+CULTURAL_SLICE_SIZE = 10
+
+CULTURAL_PROMPT = """Genel kültür alanında, tarih, coğrafya, sanat, spor, bilim ve teknoloji, matematik, biyoloji
+    fizik, kimya, astronomi, arkeoloji, edebiyat, dünya kültürleri ve gelenekleri, keşifler ve coğrafi buluşlar, 
+    dünya siyaseti, ekonomi, dinler tarihi, popüler kültür, eğlence, sinema, film ve dizi kültürü gibi farklı konulardan oluşan 10 tane açık uçlu genel kültür sorusu üret.
+
+SORULARIN ÖZELLİKLERİ:
+1. Her soru sadece tek bir doğru cevaba sahip olmalı.
+2. Sorular kısa ve bilgi içerikli (hap bilgi) olmalı.
+3. Bazı sorular ilginç ya da az bilinen bilgiler içerebilir.
+4. Tüm sorular farklı kategorilerden gelmeli (her soru farklı bir alandan).
+5. Sorular kişisel yorum gerektirmemeli, tamamen bilgiye dayalı olmalı.
+6. Sorular farklı zorluk türlerinde olmalı (bazıları kolay, bazıları orta, bazıları zor).
+7. Sorular yenilendiğinde de olabildiğince farklı ve çeşitli koulardan gelmeli.
+
+    Her soru için:
+        - Soru metni 
+        - Doğru cevap
+        
+        KURALLAR:
+        1. SADECE JSON formatında yanıt ver
+        2. Başka hiçbir açıklama ekleme
+        3. JSON dışında hiçbir metin yazma
+        4. Yanıtın tamamen geçerli JSON olması gerekiyor
+
+
+        YANIT FORMATI:
+        {{
+            "questions": [
+            {{
+                "question": "Açık uçlu soru metni",
+                "answer": "Cevap metni",
+            }}
+            ]
+
+        }}
+    """
+
+
+def today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def validate_question(q) -> bool:
+    """Havuza girecek sorunun boş ya da bozuk olmadığını kontrol eder"""
+    if not isinstance(q, dict):
+        return False
+    question = q.get("question")
+    answer = q.get("answer")
+    if not isinstance(question, str) or not isinstance(answer, str):
+        return False
+    question = question.strip()
+    answer = answer.strip()
+    return 10 <= len(question) <= 500 and 0 < len(answer) <= 300
+
+
+async def generate_cultural_questions() -> list:
+    """Gemini'den bir parti kültürel soru üretir ve doğrulananları döndürür"""
+    # Üretici kendi anahtarını tercih eder, tanımlı değilse gateway diğer anahtarlara düşer
+    if not has_api_key():
+        raise AIServiceError("AI API key bulunamadı")
+
+    ai_response = clean_ai_json(await generate(CULTURAL_PROMPT, os.getenv("GOOGLE_API_KEY_3")))
+    try:
+        questions = json.loads(ai_response).get("questions", [])
+    except (json.JSONDecodeError, AttributeError):
+        print(f"Kültürel soru yanıtı parse edilemedi: {ai_response[:200]}...")
+        return []
+
+    return [
+        {"question": q["question"].strip(), "answer": q["answer"].strip()}
+        for q in questions if validate_question(q)
+    ]
+
+
+def count_pool(pool_date: date) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(func.count(CulturalInfo.id)).filter(CulturalInfo.pool_date == pool_date).scalar()
+    finally:
+        db.close()
+
+
+def store_questions(pool_date: date, questions: list) -> int:
+    """Soruları havuza ekler, aynı gün içindeki tekrarları atlar"""
+    if not questions:
+        return 0
+    rows = [
+        {
+            "question": q["question"],
+            "answer": q["answer"],
+            "question_hash": hashlib.sha256(q["question"].lower().encode("utf-8")).hexdigest(),
+            "pool_date": pool_date,
+        }
+        for q in questions
+    ]
+    stmt = insert(CulturalInfo).values(rows).on_conflict_do_nothing(
+        index_elements=[CulturalInfo.pool_date, CulturalInfo.question_hash]
+    )
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt)
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+def purge_old_pools(pool_date: date):
+    db = SessionLocal()
+    try:
+        cutoff = pool_date - timedelta(days=CULTURAL_POOL_RETENTION_DAYS)
+        db.query(CulturalInfo).filter(CulturalInfo.pool_date < cutoff).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def refill_pool():
+    """Günün havuzunu hedef sayıya ulaşana kadar doldurur"""
+    pool_date = today()
+    current = await run_in_threadpool(count_pool, pool_date)
+    while current < CULTURAL_POOL_TARGET:
+        questions = await generate_cultural_questions()
+        added = await run_in_threadpool(store_questions, pool_date, questions)
+        if added == 0:
+            # Geçerli ya da yeni soru gelmedi, bir sonraki turda tekrar dene
+            break
+        current += added
+        print(f"Kültürel soru havuzu {pool_date}: {current}/{CULTURAL_POOL_TARGET}")
+    await run_in_threadpool(purge_old_pools, pool_date)
+
+
+async def run_producer():
+    """Uygulama açık kaldığı sürece havuzu dolu tutan arka plan görevi"""
+    while True:
+        try:
+            await refill_pool()
+            await asyncio.sleep(CULTURAL_POOL_CHECK_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Kültürel soru havuzu doldurulamadı: {e}")
+            await asyncio.sleep(CULTURAL_POOL_ERROR_BACKOFF)
+
+
+async def read_pool_slice(db, size: int = CULTURAL_SLICE_SIZE) -> list:
+    """Günün havuzundan rastgele soru döndürür, gün boşsa en son dolu güne düşer"""
+    pool_date = today()
+    exists_today = await db.scalar(select(CulturalInfo.id).where(CulturalInfo.pool_date == pool_date).limit(1))
+    if exists_today is None:
+        pool_date = await db.scalar(select(func.max(CulturalInfo.pool_date)))
+        if pool_date is None:
+            return []
+
+    return (await db.scalars(
+        select(CulturalInfo).where(CulturalInfo.pool_date == pool_date).order_by(func.random()).limit(size)
+    )).all()
@@ -0,0 +1,225 @@
+"""Sahiplik kontrolü yapan ortak yükleyiciler ve FastAPI dependency'leri.
+
+Kullanıcı, lesson ve term kontrolü tek bir join sorgusunda yapılır; lesson
+kullanıcıya aitse kullanıcı da zaten vardır. load_* fonksiyonları istek dışında
+(arka plan işleri, form parametreli endpoint'ler) doğrudan çağrılabilir,
+owned_* fonksiyonları aynı kontrolü path parametrelerinden Depends ile yapar.
+"""
+import os
+from typing import Annotated, Dict, Iterable, Tuple
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from starlette import status
+
+from database import AsyncSessionLocal
+from models import Note, NoteTerm, NoteLesson, Question, QuestionTerm, QuestionLesson
+from read_routing import WRITE_TOKEN_HEADER, is_read_only, session_factory
+from routers.auth import get_current_user
+
+# Süreç geneli işletim bilgilerini (önbellek sayaçları vb.) görebilen kullanıcılar, virgülle ayrılmış id'ler
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+
+async def get_async_db(request: Request, user: Annotated[dict, Depends(get_current_user)]):
+    """İstek oturumu; @read_only endpoint'lerde uygun bir replikadan açılır"""
+    factory = await session_factory(
+        is_read_only(request.scope.get("endpoint")), user.get("id"), request.headers.get(WRITE_TOKEN_HEADER)
+    )
+    async with factory() as db:
+        if factory is AsyncSessionLocal:
+            # Commit olursa kullanıcının sonraki okumaları bir süre primary'de kalır
+            db.info["write_user_id"] = user.get("id")
+        yield db
+
+
+async_db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+
+def get_user_id(user: Annotated[dict, Depends(get_current_user)]) -> int:
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
+    return user.get("id")
+
+
+user_id_dependency = Annotated[int, Depends(get_user_id)]
+
+
+def get_admin_user_id(user_id: user_id_dependency) -> int:
+    if user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Bu işlem için yetkiniz yok")
+    return user_id
+
+
+admin_user_id_dependency = Annotated[int, Depends(get_admin_user_id)]
+
+
+def not_found(name: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{name} bulunamadı")
+
+
+# ===== YÜKLEYİCİLER =====
+
+async def load_note_lesson(db: AsyncSession, user_id: int, lesson_id: int) -> NoteLesson:
+    lesson = await db.scalar(
+        select(NoteLesson).where(NoteLesson.id == lesson_id, NoteLesson.user_id == user_id)
+    )
+    if lesson is None:
+        raise not_found("Lesson")
+    return lesson
+
+
+async def load_question_lesson(db: AsyncSession, user_id: int, lesson_id: int) -> QuestionLesson:
+    lesson = await db.scalar(
+        select(QuestionLesson).where(QuestionLesson.id == lesson_id, QuestionLesson.user_id == user_id)
+    )
+    if lesson is None:
+        raise not_found("Lesson")
+    return lesson
+
+
+async def load_note_term(db: AsyncSession, user_id: int, lesson_id: int, term_id: int) -> Tuple[NoteLesson, NoteTerm]:
+    # Outer join sayesinde lesson ve term için ayrı hata mesajı tek sorguda verilebilir
+    row = (await db.execute(
+        select(NoteLesson, NoteTerm).outerjoin(
+            NoteTerm, and_(NoteTerm.n_lesson_id == NoteLesson.id, NoteTerm.id == term_id)
+        ).where(NoteLesson.id == lesson_id, NoteLesson.user_id == user_id)
+    )).first()
+    if row is None:
+        raise not_found("Lesson")
+    lesson, term = row
+    if term is None:
+        raise not_found("Term")
+    return lesson, term
+
+
+async def load_question_term(db: AsyncSession, user_id: int, lesson_id: int,
+                             term_id: int) -> Tuple[QuestionLesson, QuestionTerm]:
+    row = (await db.execute(
+        select(QuestionLesson, QuestionTerm).outerjoin(
+            QuestionTerm, and_(QuestionTerm.q_lesson_id == QuestionLesson.id, QuestionTerm.id == term_id)
+        ).where(QuestionLesson.id == lesson_id, QuestionLesson.user_id == user_id)
+    )).first()
+    if row is None:
+        raise not_found("Lesson")
+    lesson, term = row
+    if term is None:
+        raise not_found("Term")
+    return lesson, term
+
+
+async def load_note_term_by_id(db: AsyncSession, user_id: int, term_id: int) -> NoteTerm:
+    term = await db.scalar(
+        select(NoteTerm).join(NoteTerm.n_lesson).where(NoteTerm.id == term_id, NoteLesson.user_id == user_id)
+    )
+    if term is None:
+        raise not_found("Term")
+    return term
+
+
+async def load_question_term_by_id(db: AsyncSession, user_id: int, term_id: int) -> QuestionTerm:
+    term = await db.scalar(
+        select(QuestionTerm).join(QuestionTerm.q_lesson).where(
+            QuestionTerm.id == term_id,
+            QuestionLesson.user_id == user_id
+        )
+    )
+    if term is None:
+        raise not_found("Term")
+    return term
+
+
+async def load_owned_note_terms(db: AsyncSession, user_id: int, term_ids: Iterable[int]) -> Dict[int, int]:
+    """Kullanıcıya ait term'lerin term_id -> lesson_id eşlemesini tek sorguda döndürür"""
+    rows = await db.execute(
+        select(NoteTerm.id, NoteTerm.n_lesson_id).join(NoteTerm.n_lesson).where(
+            NoteTerm.id.in_(set(term_ids)),
+            NoteLesson.user_id == user_id
+        )
+    )
+    return dict(rows.all())
+
+
+async def load_owned_question_terms(db: AsyncSession, user_id: int, term_ids: Iterable[int]) -> Dict[int, int]:
+    rows = await db.execute(
+        select(QuestionTerm.id, QuestionTerm.q_lesson_id).join(QuestionTerm.q_lesson).where(
+            QuestionTerm.id.in_(set(term_ids)),
+            QuestionLesson.user_id == user_id
+        )
+    )
+    return dict(rows.all())
+
+
+async def load_note(db: AsyncSession, user_id: int, note_id: int) -> Note:
+    # Term join'den doldurulur, note.term async oturumda ayrıca yüklenmez
+    note = await db.scalar(
+        select(Note).join(Note.term).join(NoteTerm.n_lesson).options(contains_eager(Note.term)).where(
+            Note.id == note_id,
+            NoteLesson.user_id == user_id
+        )
+    )
+    if note is None:
+        raise not_found("Note")
+    return note
+
+
+async def load_question(db: AsyncSession, user_id: int, question_id: int) -> Question:
+    question = await db.scalar(
+        select(Question).join(Question.term).join(QuestionTerm.q_lesson).options(contains_eager(Question.term)).where(
+            Question.id == question_id,
+            QuestionLesson.user_id == user_id
+        )
+    )
+    if question is None:
+        raise not_found("Question")
+    return question
+
+
+# ===== DEPENDENCY'LER =====
+
+async def owned_note_lesson(lesson_id: int, user_id: user_id_dependency, db: async_db_dependency) -> NoteLesson:
+    return await load_note_lesson(db, user_id, lesson_id)
+
+
+async def owned_question_lesson(lesson_id: int, user_id: user_id_dependency,
+                                db: async_db_dependency) -> QuestionLesson:
+    return await load_question_lesson(db, user_id, lesson_id)
+
+
+async def owned_note_term(lesson_id: int, term_id: int, user_id: user_id_dependency,
+                          db: async_db_dependency) -> Tuple[NoteLesson, NoteTerm]:
+    return await load_note_term(db, user_id, lesson_id, term_id)
+
+
+async def owned_question_term(lesson_id: int, term_id: int, user_id: user_id_dependency,
+                              db: async_db_dependency) -> Tuple[QuestionLesson, QuestionTerm]:
+    return await load_question_term(db, user_id, lesson_id, term_id)
+
+
+async def owned_note_term_by_id(term_id: int, user_id: user_id_dependency, db: async_db_dependency) -> NoteTerm:
+    return await load_note_term_by_id(db, user_id, term_id)
+
+
+async def owned_question_term_by_id(term_id: int, user_id: user_id_dependency,
+                                    db: async_db_dependency) -> QuestionTerm:
+    return await load_question_term_by_id(db, user_id, term_id)
+
+
+async def owned_note(note_id: int, user_id: user_id_dependency, db: async_db_dependency) -> Note:
+    return await load_note(db, user_id, note_id)
+
+
+async def owned_question(question_id: int, user_id: user_id_dependency, db: async_db_dependency) -> Question:
+    return await load_question(db, user_id, question_id)
+
+
+note_lesson_dependency = Annotated[NoteLesson, Depends(owned_note_lesson)]
+question_lesson_dependency = Annotated[QuestionLesson, Depends(owned_question_lesson)]
+note_term_dependency = Annotated[Tuple[NoteLesson, NoteTerm], Depends(owned_note_term)]
+question_term_dependency = Annotated[Tuple[QuestionLesson, QuestionTerm], Depends(owned_question_term)]
+note_term_by_id_dependency = Annotated[NoteTerm, Depends(owned_note_term_by_id)]
+question_term_by_id_dependency = Annotated[QuestionTerm, Depends(owned_question_term_by_id)]
+note_dependency = Annotated[Note, Depends(owned_note)]
+question_dependency = Annotated[Question, Depends(owned_question)]
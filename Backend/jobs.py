@@ -0,0 +1,411 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from models import QuizJob
+
+# "memory" tek process için, birden çok uvicorn worker'ı varsa "database" kullanılmalı
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Veritabanı backend'i boş kuyrukta bu aralıkla yeni iş arar (saniye)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# Biten işlerin sonucu bu kadar süre tutulur (saniye)
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+# Veritabanı backend'inde çalışan iş bu süre yenilenmezse worker'ı ölmüş sayılır ve
+# iş yeniden kuyruğa alınır (saniye); çalışan worker süreyi üçte birinde bir uzatır
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+# Süresi geçmiş lease'lerin ve eski sonuçların temizlenme aralığı (saniye)
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", "60"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+MIN_PRIORITY = 0
+MAX_PRIORITY = 10
+
+_handlers: Dict[str, Callable[[dict], Awaitable[dict]]] = {}
+# İş türü -> kuyruk önceliği; istemci değil sunucu belirler
+_priorities: Dict[str, int] = {}
+
+
+class JobFailed(Exception):
+    """Handler'ın işi kullanıcıya gösterilecek bir hata ile bitirmesi için"""
+
+
+def register_handler(kind: str, handler: Callable[[dict], Awaitable[dict]], priority: int = MIN_PRIORITY):
+    _handlers[kind] = handler
+    _priorities[kind] = priority
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+def new_job(kind: str, user_id: int, params: dict, priority: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "user_id": user_id,
+        "params": params,
+        "priority": max(MIN_PRIORITY, min(MAX_PRIORITY, priority)),
+        "status": QUEUED,
+        "result": None,
+        "error": None,
+        "created_at": now(),
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+class MemoryJobBackend:
+    """Tek process içinde çalışan, asyncio.PriorityQueue tabanlı backend"""
+
+    def __init__(self):
+        self._jobs: Dict[str, dict] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+
+    @property
+    def queue(self) -> asyncio.PriorityQueue:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        return self._queue
+
+    def _purge(self):
+        cutoff = time.time() - JOB_RESULT_TTL
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED_STATUSES and job["finished_at"].timestamp() < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def submit(self, job: dict) -> str:
+        self._purge()
+        self._jobs[job["id"]] = job
+        # Yüksek öncelik önce, aynı öncelikte geliş sırası korunur
+        await self.queue.put((-job["priority"], next(self._sequence), job["id"]))
+        return job["id"]
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return self._jobs.get(job_id)
+
+    async def next_job(self) -> dict:
+        while True:
+            _, _, job_id = await self.queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != QUEUED:
+                continue
+            job["status"] = RUNNING
+            job["started_at"] = now()
+            return job
+
+    async def finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != RUNNING:
+            return
+        job.update(status=status, result=result, error=error, finished_at=now())
+
+    async def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return False
+        job.update(status=CANCELLED, finished_at=now())
+        return True
+
+    async def renew(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        return job is not None and job["status"] == RUNNING
+
+    async def release(self, job_id: str):
+        # Process kapanırken kuyruk da kaybolur, geri alınacak bir şey yok
+        pass
+
+    async def sweep(self):
+        self._purge()
+
+
+class DatabaseJobBackend:
+    """quiz_jobs tablosunu kuyruk olarak kullanan, birden çok worker process'i destekleyen backend"""
+
+    @staticmethod
+    def _to_dict(row: QuizJob) -> dict:
+        return {
+            "id": row.id,
+            "kind": row.kind,
+            "user_id": row.user_id,
+            "params": json.loads(row.params),
+            "priority": row.priority,
+            "status": row.status,
+            "result": json.loads(row.result) if row.result else None,
+            "error": row.error,
+            "created_at": row.created_at,
+            "started_at": row.started_at,
+            "finished_at": row.finished_at,
+        }
+
+    def _submit(self, job: dict) -> str:
+        db = SessionLocal()
+        try:
+            db.add(QuizJob(
+                id=job["id"],
+                kind=job["kind"],
+                user_id=job["user_id"],
+                params=json.dumps(job["params"]),
+                priority=job["priority"],
+                status=QUEUED,
+                created_at=job["created_at"],
+            ))
+            db.commit()
+            return job["id"]
+        finally:
+            db.close()
+
+    def _get(self, job_id: str) -> Optional[dict]:
+        db = SessionLocal()
+        try:
+            row = db.query(QuizJob).filter(QuizJob.id == job_id).first()
+            return self._to_dict(row) if row else None
+        finally:
+            db.close()
+
+    def _claim(self) -> Optional[dict]:
+        db = SessionLocal()
+        try:
+            # SKIP LOCKED sayesinde aynı işi iki worker alamaz
+            row = db.query(QuizJob).filter(QuizJob.status == QUEUED).order_by(
+                QuizJob.priority.desc(), QuizJob.created_at
+            ).with_for_update(skip_locked=True).first()
+            if row is None:
+                db.rollback()
+                return None
+            row.status = RUNNING
+            row.started_at = now()
+            row.lease_expires_at = row.started_at + timedelta(seconds=JOB_LEASE_SECONDS)
+            db.commit()
+            return self._to_dict(row)
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, status: str, result: Optional[dict], error: Optional[str]):
+        db = SessionLocal()
+        try:
+            # İptal edilmiş işin sonucu yazılmaz
+            db.query(QuizJob).filter(QuizJob.id == job_id, QuizJob.status == RUNNING).update({
+                QuizJob.status: status,
+                QuizJob.result: json.dumps(result) if result is not None else None,
+                QuizJob.error: error,
+                QuizJob.finished_at: now(),
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _cancel(self, job_id: str) -> bool:
+        db = SessionLocal()
+        try:
+            updated = db.query(QuizJob).filter(
+                QuizJob.id == job_id,
+                QuizJob.status.in_([QUEUED, RUNNING])
+            ).update({QuizJob.status: CANCELLED, QuizJob.finished_at: now()}, synchronize_session=False)
+            db.commit()
+            return updated > 0
+        finally:
+            db.close()
+
+    def _renew(self, job_id: str) -> bool:
+        db = SessionLocal()
+        try:
+            updated = db.query(QuizJob).filter(QuizJob.id == job_id, QuizJob.status == RUNNING).update(
+                {QuizJob.lease_expires_at: now() + timedelta(seconds=JOB_LEASE_SECONDS)},
+                synchronize_session=False
+            )
+            db.commit()
+            return updated > 0
+        finally:
+            db.close()
+
+    def _release(self, job_id: str):
+        db = SessionLocal()
+        try:
+            db.query(QuizJob).filter(QuizJob.id == job_id, QuizJob.status == RUNNING).update({
+                QuizJob.status: QUEUED,
+                QuizJob.started_at: None,
+                QuizJob.lease_expires_at: None,
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _sweep(self):
+        db = SessionLocal()
+        try:
+            current = now()
+            # Worker'ı çöken veya bağlantısını kaybeden işler başka bir worker'a kalır
+            requeued = db.query(QuizJob).filter(
+                QuizJob.status == RUNNING,
+                QuizJob.lease_expires_at < current
+            ).update({
+                QuizJob.status: QUEUED,
+                QuizJob.started_at: None,
+                QuizJob.lease_expires_at: None,
+            }, synchronize_session=False)
+            purged = db.query(QuizJob).filter(
+                QuizJob.status.in_(FINISHED_STATUSES),
+                QuizJob.finished_at < current - timedelta(seconds=JOB_RESULT_TTL)
+            ).delete(synchronize_session=False)
+            db.commit()
+            if requeued or purged:
+                print(f"İş kuyruğu temizliği: {requeued} iş yeniden kuyruğa alındı, {purged} eski iş silindi")
+        finally:
+            db.close()
+
+    async def submit(self, job: dict) -> str:
+        return await run_in_threadpool(self._submit, job)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await run_in_threadpool(self._get, job_id)
+
+    async def next_job(self) -> dict:
+        while True:
+            job = await run_in_threadpool(self._claim)
+            if job is not None:
+                return job
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    async def finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        await run_in_threadpool(self._finish, job_id, status, result, error)
+
+    async def cancel(self, job_id: str) -> bool:
+        return await run_in_threadpool(self._cancel, job_id)
+
+    async def renew(self, job_id: str) -> bool:
+        return await run_in_threadpool(self._renew, job_id)
+
+    async def release(self, job_id: str):
+        await run_in_threadpool(self._release, job_id)
+
+    async def sweep(self):
+        await run_in_threadpool(self._sweep)
+
+
+backend = DatabaseJobBackend() if JOB_BACKEND == "database" else MemoryJobBackend()
+
+_workers = []
+_sweeper: Optional[asyncio.Task] = None
+_stopping = False
+# Bu process'te çalışan işler, iptal edildiğinde task'ı durdurabilmek için
+_running: Dict[str, asyncio.Task] = {}
+
+
+async def submit(kind: str, user_id: int, params: dict) -> dict:
+    if kind not in _handlers:
+        raise ValueError(f"Bilinmeyen iş türü: {kind}")
+    job = new_job(kind, user_id, params, _priorities[kind])
+    await backend.submit(job)
+    return job
+
+
+async def get(job_id: str) -> Optional[dict]:
+    return await backend.get(job_id)
+
+
+async def cancel(job_id: str) -> bool:
+    cancelled = await backend.cancel(job_id)
+    task = _running.get(job_id)
+    if cancelled and task is not None:
+        task.cancel()
+    return cancelled
+
+
+async def _keep_lease(job_id: str, task: asyncio.Task):
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            if not await backend.renew(job_id):
+                # Başka bir process'ten iptal edilmiş, sonucu yazılmayacak iş boşuna sürmesin
+                task.cancel()
+                return
+        except Exception as e:
+            print(f"İş lease'i uzatılamadı ({job_id}): {e}")
+
+
+async def _run_job(job: dict):
+    handler = _handlers[job["kind"]]
+    task = asyncio.ensure_future(handler(job))
+    _running[job["id"]] = task
+    lease = asyncio.create_task(_keep_lease(job["id"], task))
+    try:
+        result = await task
+        await backend.finish(job["id"], DONE, result=result)
+    except asyncio.CancelledError:
+        # İş iptal edildiyse durum zaten CANCELLED, worker kapanıyorsa iş kuyruğa geri
+        # bırakılır ve iptal yukarı iletilir
+        if _stopping:
+            await backend.release(job["id"])
+            raise
+    except JobFailed as e:
+        await backend.finish(job["id"], FAILED, error=str(e))
+    except Exception as e:
+        print(f"İş başarısız ({job['id']}): {e}")
+        await backend.finish(job["id"], FAILED, error=f"Beklenmeyen hata: {str(e)}")
+    finally:
+        lease.cancel()
+        _running.pop(job["id"], None)
+
+
+async def _worker():
+    while True:
+        try:
+            job = await backend.next_job()
+            await _run_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Geçici veritabanı hatası worker'ı bitirmesin; sonucu yazılamayan işin lease'i
+            # artık uzatılmadığından süresi dolunca iş yeniden kuyruğa alınır
+            print(f"İş worker'ı hata aldı: {e}")
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+
+async def _sweep_loop():
+    while True:
+        try:
+            await backend.sweep()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"İş kuyruğu temizliği başarısız: {e}")
+        await asyncio.sleep(JOB_SWEEP_INTERVAL)
+
+
+def start_workers(count: int = JOB_WORKERS):
+    global _stopping, _sweeper
+    _stopping = False
+    for _ in range(count):
+        _workers.append(asyncio.create_task(_worker()))
+    _sweeper = asyncio.create_task(_sweep_loop())
+
+
+async def stop_workers():
+    global _stopping, _sweeper
+    _stopping = True
+    if _sweeper is not None:
+        _sweeper.cancel()
+        _sweeper = None
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
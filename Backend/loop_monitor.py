@@ -0,0 +1,119 @@
+"""Event loop takılmalarını tespit eden izleyici.
+
+Loop üzerinde çalışan bir heartbeat görevi düzenli aralıklarla zaman damgası
+günceller. Ayrı bir thread bu damga LOOP_STALL_THRESHOLD_MS'ten uzun süre
+güncellenmezse loop thread'inin o anki stack'ini alır, stack'te bir endpoint
+fonksiyonu bulursa handler'ı, bulamazsa işlemdeki istekleri loglar. Böylece
+async handler içinde kalan senkron DB/dosya işi hangi endpoint'te olduğuyla
+birlikte görünür.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR", "1") == "1"
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "200"))
+LOOP_HEARTBEAT_INTERVAL_MS = float(os.getenv("LOOP_HEARTBEAT_INTERVAL_MS", "50"))
+# Logda gösterilecek en fazla stack satırı
+STALL_STACK_DEPTH = 8
+
+_last_beat = time.monotonic()
+_loop_thread_id: Optional[int] = None
+_handlers: Dict[object, str] = {}
+# id -> "METHOD /path"; watchdog thread'i sadece okur
+_in_flight: Dict[int, str] = {}
+_heartbeat: Optional[asyncio.Task] = None
+_stop = threading.Event()
+
+
+class InFlightMiddleware:
+    """İşlemdeki HTTP isteklerini takılma raporları için kaydeden ASGI middleware'i"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        key = id(scope)
+        _in_flight[key] = f"{scope['method']} {scope['path']}"
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _in_flight.pop(key, None)
+
+
+def _route_handlers(app) -> Dict[object, str]:
+    handlers = {}
+    for route in app.routes:
+        endpoint = getattr(route, "endpoint", None)
+        methods = getattr(route, "methods", None)
+        if endpoint is not None and methods and hasattr(endpoint, "__code__"):
+            handlers[endpoint.__code__] = f"{','.join(sorted(methods))} {route.path}"
+    return handlers
+
+
+def _find_handler(frame) -> Optional[str]:
+    # Coroutine'ler çalışırken await zinciri loop thread'inin stack'indedir
+    while frame is not None:
+        handler = _handlers.get(frame.f_code)
+        if handler is not None:
+            return handler
+        frame = frame.f_back
+    return None
+
+
+def _report_stall(stalled_ms: float):
+    frame = sys._current_frames().get(_loop_thread_id)
+    handler = _find_handler(frame)
+    stack = traceback.format_list(traceback.extract_stack(frame)[-STALL_STACK_DEPTH:]) if frame else []
+    print(
+        f"Event loop {stalled_ms:.0f} ms'dir bloklu; handler: {handler or 'bilinmiyor'}, "
+        f"işlemdeki istekler: {sorted(_in_flight.values())}\n{''.join(stack)}"
+    )
+
+
+def _watch():
+    threshold = LOOP_STALL_THRESHOLD_MS / 1000
+    stalled_since = None
+    while not _stop.wait(LOOP_HEARTBEAT_INTERVAL_MS / 1000):
+        last_beat = _last_beat
+        stalled = time.monotonic() - last_beat
+        if stalled >= threshold:
+            if stalled_since != last_beat:
+                # Her takılma bir kez, tespit anındaki stack ile raporlanır
+                stalled_since = last_beat
+                _report_stall(stalled * 1000)
+        elif stalled_since is not None:
+            print(f"Event loop takılması bitti, toplam ~{(_last_beat - stalled_since) * 1000:.0f} ms")
+            stalled_since = None
+
+
+async def _beat():
+    global _last_beat
+    while True:
+        _last_beat = time.monotonic()
+        await asyncio.sleep(LOOP_HEARTBEAT_INTERVAL_MS / 1000)
+
+
+def start(app):
+    """Lifespan başlangıcında, route'lar eklendikten sonra loop içinden çağrılır"""
+    global _loop_thread_id, _handlers, _heartbeat, _last_beat
+    _loop_thread_id = threading.get_ident()
+    _handlers = _route_handlers(app)
+    _last_beat = time.monotonic()
+    _stop.clear()
+    _heartbeat = asyncio.create_task(_beat())
+    threading.Thread(target=_watch, name="loop-stall-monitor", daemon=True).start()
+
+
+def stop():
+    global _heartbeat
+    _stop.set()
+    if _heartbeat is not None:
+        _heartbeat.cancel()
+        _heartbeat = None
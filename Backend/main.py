@@ -1,16 +1,55 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import asyncio
 from dotenv import load_dotenv
 
-from database import Base, engine
-from routers import auth, lesson, question, term, note, api
-
-# Load environment variables
+# Load environment variables (modüller import edilirken ayarları okuyabilsin diye önce)
 load_dotenv()
 
-app = FastAPI()
+import ai_cache
+import ai_client
+import cultural_pool
+import jobs
+import loop_monitor
+import ocr
+import read_routing
+from database import Base, engine, async_engine, replica_engines
+from routers import auth, lesson, question, term, note, api, dashboard, tree
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Paylaşılan AI istemcisini .env yüklendikten sonra oluştur
+    ai_client.get_client()
+    if loop_monitor.LOOP_MONITOR_ENABLED:
+        loop_monitor.start(app)
+    producer = None
+    if os.getenv("CULTURAL_POOL_PRODUCER", "1") == "1":
+        producer = asyncio.create_task(cultural_pool.run_producer())
+    cache_purger = asyncio.create_task(ai_cache.run_purger())
+    lag_monitor = None
+    if replica_engines:
+        lag_monitor = asyncio.create_task(read_routing.run_lag_monitor())
+    jobs.start_workers()
+    yield
+    await jobs.stop_workers()
+    if producer is not None:
+        producer.cancel()
+    cache_purger.cancel()
+    if lag_monitor is not None:
+        lag_monitor.cancel()
+    await ai_client.close_client()
+    ocr.shutdown_executor()
+    await async_engine.dispose()
+    await read_routing.dispose_replicas()
+    loop_monitor.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS ayarları
 app.add_middleware(
@@ -19,7 +58,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[read_routing.WRITE_TOKEN_HEADER],
 )
+if loop_monitor.LOOP_MONITOR_ENABLED:
+    app.add_middleware(loop_monitor.InFlightMiddleware)
+if replica_engines:
+    app.add_middleware(read_routing.WriteTokenMiddleware)
 
 # Upload klasörü oluştur
 UPLOAD_DIR = "uploads"
@@ -38,4 +82,6 @@ app.include_router(question.router)
 app.include_router(term.router)
 app.include_router(note.router)
 app.include_router(api.router)
+app.include_router(dashboard.router)
+app.include_router(tree.router)
 Base.metadata.create_all(bind=engine)
@@ -1,8 +1,15 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Date, UniqueConstraint, Index, Computed, DDL, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 from database import Base
 
+# İlişkiler hiçbir zaman örtük sorgu ile yüklenmez (lazy="raise_on_sql"): ihtiyaç duyan
+# sorgu contains_eager/selectinload/joinedload ile açıkça yükler, unutulan yükleme
+# sessizce N+1 sorgu üretmek yerine hata verir. Alt kayıtlar veritabanındaki
+# ON DELETE CASCADE ile silinir (passive_deletes), ORM silmeden önce onları yüklemez.
+LAZY = "raise_on_sql"
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -12,54 +19,145 @@ class User(Base):
     email = Column(String,unique=True)
     firstName = Column(String)
     lastName = Column(String)
-    q_lessons=relationship("QuestionLesson",back_populates="user",cascade="all, delete-orphan")
-    n_lessons=relationship("NoteLesson",back_populates="user",cascade="all, delete-orphan")
+    q_lessons=relationship("QuestionLesson",back_populates="user",cascade="all, delete-orphan",
+                           passive_deletes=True, lazy=LAZY)
+    n_lessons=relationship("NoteLesson",back_populates="user",cascade="all, delete-orphan",
+                           passive_deletes=True, lazy=LAZY)
 
 class QuestionLesson(Base):
     __tablename__ = 'question_lessons'
+    __table_args__ = (Index('ix_question_lessons_user_id_lesson_title', 'user_id', 'lesson_title'),)
     id = Column(Integer, primary_key=True)
     lesson_title=Column(String)
-    user_id = Column(Integer, ForeignKey('users.id'))
-    user=relationship("User",back_populates="q_lessons")
-    q_terms=relationship("QuestionTerm",back_populates="q_lesson",cascade="all, delete-orphan")
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'))
+    user=relationship("User",back_populates="q_lessons", lazy=LAZY)
+    q_terms=relationship("QuestionTerm",back_populates="q_lesson",cascade="all, delete-orphan",
+                         passive_deletes=True, lazy=LAZY)
 
 
 class NoteLesson(Base):
     __tablename__ = 'note_lessons'
+    __table_args__ = (Index('ix_note_lessons_user_id_lesson_title', 'user_id', 'lesson_title'),)
     id = Column(Integer, primary_key=True)
     lesson_title=Column(String)
-    user_id = Column(Integer, ForeignKey('users.id'))
-    user=relationship("User",back_populates="n_lessons")
-    n_terms = relationship("NoteTerm", back_populates="n_lesson", cascade="all, delete-orphan")
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'))
+    user=relationship("User",back_populates="n_lessons", lazy=LAZY)
+    n_terms = relationship("NoteTerm", back_populates="n_lesson", cascade="all, delete-orphan",
+                           passive_deletes=True, lazy=LAZY)
 
 class QuestionTerm(Base):
     __tablename__ = 'question_terms'
+    __table_args__ = (Index('uq_question_terms_q_lesson_id_term_title', 'q_lesson_id', 'term_title', unique=True),)
     id = Column(Integer, primary_key=True)
     term_title=Column(String)
-    q_lesson_id = Column(Integer, ForeignKey('question_lessons.id'))
-    q_lesson=relationship("QuestionLesson",back_populates="q_terms")
-    questions=relationship("Question",back_populates="term",cascade="all, delete-orphan")
+    q_lesson_id = Column(Integer, ForeignKey('question_lessons.id', ondelete='CASCADE'))
+    q_lesson=relationship("QuestionLesson",back_populates="q_terms", lazy=LAZY)
+    questions=relationship("Question",back_populates="term",cascade="all, delete-orphan",
+                           passive_deletes=True, lazy=LAZY)
 
 class NoteTerm(Base):
     __tablename__ = 'note_terms'
+    __table_args__ = (Index('uq_note_terms_n_lesson_id_term_title', 'n_lesson_id', 'term_title', unique=True),)
     id = Column(Integer, primary_key=True)
     term_title=Column(String)
-    n_lesson_id = Column(Integer, ForeignKey('note_lessons.id'))
-    n_lesson=relationship("NoteLesson",back_populates="n_terms")
-    notes=relationship("Note",back_populates="term",cascade="all, delete-orphan")
+    n_lesson_id = Column(Integer, ForeignKey('note_lessons.id', ondelete='CASCADE'))
+    n_lesson=relationship("NoteLesson",back_populates="n_terms", lazy=LAZY)
+    notes=relationship("Note",back_populates="term",cascade="all, delete-orphan",
+                       passive_deletes=True, lazy=LAZY)
 
 class Question(Base):
     __tablename__ = 'questions'
+    __table_args__ = (
+        Index('ix_questions_term_id_difficulty_category_id', 'term_id', 'difficulty_category', 'id'),
+        Index('ix_questions_ocr_text_trgm', 'ocr_text', postgresql_using='gin',
+              postgresql_ops={'ocr_text': 'gin_trgm_ops'}),
+    )
     id = Column(Integer, primary_key=True)
     image_path = Column(String, nullable=False)
     note = Column(String, nullable=True)
     difficulty_category = Column(Integer, nullable=False)
-    term_id = Column(Integer, ForeignKey('question_terms.id'))
-    term = relationship("QuestionTerm",back_populates="questions")
+    ocr_text = Column(Text, nullable=True)
+    image_hash = Column(String(64), nullable=True)
+    ocr_engine_version = Column(String, nullable=True)
+    term_id = Column(Integer, ForeignKey('question_terms.id', ondelete='CASCADE'))
+    term = relationship("QuestionTerm",back_populates="questions", lazy=LAZY)
+
+# Not araması için kullanılan PostgreSQL metin arama yapılandırması
+NOTE_SEARCH_CONFIG = 'turkish'
+
+
+# create_all ile kurulan veritabanlarında trigram index'inden önce eklenti hazır olsun
+event.listen(Question.__table__, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
 
 class Note(Base):
     __tablename__ = 'notes'
+    __table_args__ = (
+        Index('ix_notes_term_id_id', 'term_id', 'id'),
+        Index('ix_notes_content_tsv', 'content_tsv', postgresql_using='gin'),
+    )
     id = Column(Integer, primary_key=True)
     content = Column(String)
-    term_id = Column(Integer, ForeignKey('note_terms.id'))
-    term=relationship("NoteTerm",back_populates="notes")
\ No newline at end of file
+    # Veritabanı tarafından üretilir, normal sorgularda yüklenmez
+    content_tsv = deferred(Column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{NOTE_SEARCH_CONFIG}', coalesce(content, ''))", persisted=True),
+    ))
+    term_id = Column(Integer, ForeignKey('note_terms.id', ondelete='CASCADE'))
+    term=relationship("NoteTerm",back_populates="notes", lazy=LAZY)
+
+class AICacheEntry(Base):
+    __tablename__ = 'ai_cache_entries'
+    key = Column(String(64), primary_key=True)
+    kind = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class CulturalInfo(Base):
+    __tablename__ = 'cultural_questions'
+    __table_args__ = (UniqueConstraint('pool_date', 'question_hash'),)
+    id = Column(Integer, primary_key=True)
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    question_hash = Column(String(64), nullable=False)
+    pool_date = Column(Date, nullable=False, index=True)
+
+
+class QuizJob(Base):
+    __tablename__ = 'quiz_jobs'
+    __table_args__ = (Index('ix_quiz_jobs_queue', 'status', 'priority', 'created_at'),)
+    id = Column(String(36), primary_key=True)
+    kind = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    params = Column(Text, nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # Çalışan işi tutan worker bu süreyi uzatır; süresi geçen iş yeniden kuyruğa alınır
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+
+
+# Kullanıcının primary'deki son commit zamanı; read-your-writes tüm worker'larda geçerli olsun diye
+class UserWriteMark(Base):
+    __tablename__ = 'user_write_marks'
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    written_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class UserStats(Base):
+    __tablename__ = 'user_stats'
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    note_lessons = Column(Integer, nullable=False, default=0, server_default='0')
+    note_terms = Column(Integer, nullable=False, default=0, server_default='0')
+    notes = Column(Integer, nullable=False, default=0, server_default='0')
+    question_lessons = Column(Integer, nullable=False, default=0, server_default='0')
+    question_terms = Column(Integer, nullable=False, default=0, server_default='0')
+    questions = Column(Integer, nullable=False, default=0, server_default='0')
+    questions_easy = Column(Integer, nullable=False, default=0, server_default='0')
+    questions_medium = Column(Integer, nullable=False, default=0, server_default='0')
+    questions_hard = Column(Integer, nullable=False, default=0, server_default='0')
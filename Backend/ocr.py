@@ -0,0 +1,287 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytesseract
+from dotenv import load_dotenv
+from PIL import Image
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+# Backfill script olarak çalıştırıldığında database import edilmeden önce DSN okunsun
+load_dotenv()
+
+from database import SessionLocal, AsyncSessionLocal  # noqa: E402
+from models import Question  # noqa: E402
+
+# Tesseract path'ini ayarla
+tesseract_paths = [
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+    r"C:\Users\USER\AppData\Local\Programs\Tesseract-OCR\tesseract.exe"
+]
+
+tesseract_found = False
+for path in tesseract_paths:
+    if os.path.exists(path):
+        pytesseract.pytesseract.tesseract_cmd = path
+        tesseract_found = True
+        print(f"Tesseract found at: {path}")
+        break
+
+if not tesseract_found:
+    print("Tesseract not found in common paths. Please install Tesseract OCR.")
+    print("Download from: https://github.com/UB-Mannheim/tesseract/wiki")
+
+OCR_LANG = "tur"
+EMPTY_TEXT = "Metin çıkarılamadı"
+
+# Process havuzu ayarları: worker sayısı, aynı anda kuyrukta bekleyebilecek iş sayısı ve resim başına süre sınırı
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", str(os.cpu_count() or 2)))
+OCR_MAX_IN_FLIGHT = int(os.getenv("OCR_MAX_IN_FLIGHT", str(OCR_MAX_WORKERS * 2)))
+OCR_IMAGE_TIMEOUT = float(os.getenv("OCR_IMAGE_TIMEOUT", "60"))
+# Tesseract süre aşımında öldürülür; bekleyen taraf resmi açma/hash süresi için biraz daha bekler
+OCR_WAIT_GRACE = 5
+
+_executor = None
+_in_flight = None
+
+_engine_version = None
+
+
+def get_engine_version() -> str:
+    """Kayıtlara yazılan OCR motoru versiyonu, motor ya da dil değişince eski metinler yenilenir"""
+    global _engine_version
+    if _engine_version is None:
+        _engine_version = f"tesseract-{pytesseract.get_tesseract_version()}-{OCR_LANG}"
+    return _engine_version
+
+
+def image_file_path(image_path: str) -> str:
+    return image_path.replace("/uploads/", "uploads/")
+
+
+def hash_image(file_path: str) -> str:
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(64 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def extract_text(file_path: str) -> str:
+    """Resimden OCR ile metin çıkarır"""
+    with Image.open(file_path) as image:
+        # Süre aşımında pytesseract tesseract process'ini öldürüp RuntimeError fırlatır, worker serbest kalır
+        extracted_text = pytesseract.image_to_string(image, lang=OCR_LANG, timeout=OCR_IMAGE_TIMEOUT)
+    return extracted_text.strip() or EMPTY_TEXT
+
+
+def _init_worker(tesseract_cmd: str):
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def _ocr_file(file_path: str) -> tuple:
+    """Worker process içinde çalışır: resmin hash'ini ve metnini döndürür"""
+    return hash_image(file_path), extract_text(file_path)
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # fork, event loop ve havuz thread'leri çalışan process'i kilitli durumlarıyla kopyalar
+        _executor = ProcessPoolExecutor(
+            max_workers=OCR_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(pytesseract.pytesseract.tesseract_cmd,),
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _ocr_file_async(file_path: str):
+    global _in_flight
+    if _in_flight is None:
+        _in_flight = asyncio.Semaphore(OCR_MAX_IN_FLIGHT)
+
+    async with _in_flight:
+        loop = asyncio.get_running_loop()
+        # Asıl sınır worker içindeki tesseract timeout'udur, bu sadece takılan worker'a karşı bir emniyettir
+        return await asyncio.wait_for(
+            loop.run_in_executor(get_executor(), _ocr_file, file_path),
+            timeout=OCR_IMAGE_TIMEOUT + OCR_WAIT_GRACE,
+        )
+
+
+async def ocr_files(file_paths: list) -> list:
+    """Resimleri process havuzunda paralel işler, sonuçları girdi sırasıyla döndürür.
+
+    Her eleman (image_hash, text) ya da hata durumunda yakalanan exception'dır.
+    """
+    return await asyncio.gather(
+        *(_ocr_file_async(file_path) for file_path in file_paths),
+        return_exceptions=True,
+    )
+
+
+async def ocr_questions(questions: list) -> list:
+    """Soruların metnini paralel çıkarıp nesnelere yazar, metni çıkarılan soruları döndürür"""
+    existing = await run_in_threadpool(existing_questions, questions)
+    results = await ocr_files([image_file_path(question.image_path) for question in existing])
+
+    updated = []
+    for question, result in zip(existing, results):
+        if isinstance(result, asyncio.TimeoutError):
+            print(f"OCR süre aşımı (question {question.id})")
+            continue
+        if isinstance(result, Exception):
+            print(f"OCR başarısız (question {question.id}): {result}")
+            continue
+        question.image_hash, question.ocr_text = result
+        question.ocr_engine_version = get_engine_version()
+        updated.append(question)
+    return updated
+
+
+# Core UPDATE satır sayısını kontrol etmez; OCR sürerken silinen soru yazmayı bozmaz
+SAVE_OCR_RESULT = update(Question.__table__).where(Question.__table__.c.id == bindparam("question_id")).values(
+    ocr_text=bindparam("new_ocr_text"),
+    image_hash=bindparam("new_image_hash"),
+    ocr_engine_version=bindparam("new_engine_version"),
+)
+
+
+async def release_connection(db: AsyncSession, questions: list):
+    """Soruları oturumdan ayırıp okuma transaction'ını bitirir, bağlantı OCR boyunca havuzda kalır"""
+    for question in questions:
+        db.expunge(question)
+    await db.commit()
+
+
+async def save_ocr_results(db: AsyncSession, questions: list):
+    """OCR sonuçlarını kısa bir transaction'da yazar"""
+    if not questions:
+        return
+    await db.execute(SAVE_OCR_RESULT, [
+        {
+            "question_id": question.id,
+            "new_ocr_text": question.ocr_text,
+            "new_image_hash": question.image_hash,
+            "new_engine_version": question.ocr_engine_version,
+        }
+        for question in questions
+    ])
+    await db.commit()
+
+
+async def ocr_and_save(db: AsyncSession, questions: list) -> list:
+    """Resim başına OCR_IMAGE_TIMEOUT'a kadar sürebilen OCR'ı bağlantı tutmadan çalıştırır"""
+    await release_connection(db, questions)
+    updated = await ocr_questions(questions)
+    await save_ocr_results(db, updated)
+    return updated
+
+
+def existing_questions(questions: list) -> list:
+    return [question for question in questions if os.path.exists(image_file_path(question.image_path))]
+
+
+def is_up_to_date(question: Question, image_hash: str) -> bool:
+    return (
+        question.ocr_text is not None
+        and question.image_hash == image_hash
+        and question.ocr_engine_version == get_engine_version()
+    )
+
+
+async def ocr_question(question: Question) -> bool:
+    """Sorunun metnini gerekiyorsa process havuzunda yeniden çıkarıp nesneye yazar, yazdıysa True döner"""
+    file_path = image_file_path(question.image_path)
+    if not await run_in_threadpool(os.path.exists, file_path):
+        return False
+
+    image_hash = await run_in_threadpool(hash_image, file_path)
+    if is_up_to_date(question, image_hash):
+        return False
+
+    question.image_hash, question.ocr_text = await _ocr_file_async(file_path)
+    question.ocr_engine_version = get_engine_version()
+    return True
+
+
+async def process_question(question_id: int):
+    """/questions/create sonrası arka planda çalışan OCR görevi"""
+    async with AsyncSessionLocal() as db:
+        try:
+            question = await db.scalar(select(Question).where(Question.id == question_id))
+            if question is None:
+                return
+            await release_connection(db, [question])
+            if await ocr_question(question):
+                await save_ocr_results(db, [question])
+        except Exception as e:
+            await db.rollback()
+            print(f"OCR başarısız (question {question_id}): {e}")
+
+
+async def process_questions(question_ids: list):
+    """/questions/bulk sonrası arka planda çalışan toplu OCR görevi"""
+    async with AsyncSessionLocal() as db:
+        try:
+            questions = (await db.scalars(select(Question).where(Question.id.in_(question_ids)))).all()
+            await ocr_and_save(db, questions)
+        except Exception as e:
+            await db.rollback()
+            print(f"Toplu OCR başarısız ({len(question_ids)} soru): {e}")
+
+
+def backfill(batch_size: int = 100) -> int:
+    """Metni olmayan ya da eski motorla çıkarılmış soruları toplu halde işler"""
+    processed = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            questions = db.query(Question).filter(
+                Question.id > last_id,
+                (Question.ocr_text.is_(None)) | (Question.ocr_engine_version != get_engine_version())
+            ).order_by(Question.id).limit(batch_size).all()
+            if not questions:
+                break
+
+            existing = existing_questions(questions)
+            file_paths = [image_file_path(question.image_path) for question in existing]
+            futures = [get_executor().submit(_ocr_file, file_path) for file_path in file_paths]
+
+            # Sonuçlar sırayla toplanır, her resim kendi süre sınırıyla beklenir
+            for question, future in zip(existing, futures):
+                try:
+                    question.image_hash, question.ocr_text = future.result(timeout=OCR_IMAGE_TIMEOUT + OCR_WAIT_GRACE)
+                    question.ocr_engine_version = get_engine_version()
+                    processed += 1
+                except Exception as e:
+                    print(f"OCR başarısız (question {question.id}): {e}")
+            last_id = questions[-1].id
+            db.commit()
+            print(f"OCR backfill: {processed} soru işlendi")
+    finally:
+        db.close()
+        shutdown_executor()
+    return processed
+
+
+if __name__ == "__main__":
+    # Kullanım: python ocr.py [batch_size]
+    backfill(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,56 @@
+import os
+from typing import List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """Virgülle ayrılmış alan listesini doğrular; id cursor için her zaman döner"""
+    if not fields:
+        return list(allowed)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Bilinmeyen alan(lar): {', '.join(sorted(unknown))}"
+        )
+    return [field for field in allowed if field == "id" or field in requested]
+
+
+async def keyset_page(db: AsyncSession, model, selected: List[str], criteria: list, after: Optional[int], limit: int,
+                constants: Optional[dict] = None, descending: bool = False,
+                expressions: Optional[dict] = None) -> dict:
+    """id sırasına göre after'dan sonraki limit kadar satırı döndürür.
+
+    OFFSET yerine id > after koşulu kullanıldığı için her sayfa (filtre, id)
+    index'inde tek aralık taramasıdır ve araya eklenen kayıtlar sayfaları kaydırmaz.
+    Sadece seçilen kolonlar okunur; constants satırdan gelmeyen sabit alanlardır,
+    expressions ise kolon yerine veritabanında hesaplanan alanlardır (örn. içerik önizlemesi).
+    descending verilirse en büyük id'den başlanır ve after'dan küçük id'ler döner.
+    """
+    constants = constants or {}
+    expressions = expressions or {}
+    columns = [
+        expressions[field].label(field) if field in expressions else getattr(model, field)
+        for field in selected if field not in constants
+    ]
+    query = select(*columns).where(*criteria)
+    if after is not None:
+        query = query.where(model.id < after if descending else model.id > after)
+    order = model.id.desc() if descending else model.id
+    # Bir fazla satır okumak sonraki sayfanın varlığını ayrı COUNT sorgusu olmadan gösterir
+    rows = (await db.execute(query.order_by(order).limit(limit + 1))).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+
+    items = [
+        {field: constants[field] if field in constants else getattr(row, field) for field in selected}
+        for row in rows[:limit]
+    ]
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,117 @@
+import asyncio
+import math
+import os
+from typing import List
+
+from ai_cache import cached_generate
+from ai_gateway import generate
+
+# Final quiz prompt'una girecek içerik için token bütçesi
+QUIZ_PROMPT_TOKEN_BUDGET = int(os.getenv("QUIZ_PROMPT_TOKEN_BUDGET", "6000"))
+# Özetleme aşamasında her parçanın en fazla token sayısı
+QUIZ_CHUNK_TOKENS = int(os.getenv("QUIZ_CHUNK_TOKENS", "4000"))
+# Aynı anda Gemini'ye giden özetleme isteği sayısı
+QUIZ_CONDENSE_CONCURRENCY = int(os.getenv("QUIZ_CONDENSE_CONCURRENCY", "4"))
+# Özetler hâlâ bütçeyi aşıyorsa tekrar özetleme tur sayısı
+MAX_REDUCE_ROUNDS = 3
+
+# Gemini tokenizer'ına yakın kaba bir tahmin: ortalama 4 karakter = 1 token
+CHARS_PER_TOKEN = 4
+
+CONDENSE_PROMPT_VERSION = "1"
+
+CONDENSE_INSTRUCTIONS = {
+    "note": "Aşağıdaki not parçasından quiz sorusu hazırlamak için gereken önemli bilgileri, tanımları, "
+            "tarihleri, formülleri ve sonuçları madde madde çıkar.",
+    "question": "Aşağıdaki soru metinlerinin konularını, soru tarzlarını ve ölçtükleri bilgileri "
+                "madde madde özetle, tipik birkaç soru kalıbını koru.",
+}
+
+
+def count_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _split_text(text: str, max_tokens: int) -> List[str]:
+    """Tek başına parçaya sığmayan metni paragraf, gerekirse karakter sınırından böler"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    current = ""
+    for paragraph in text.split("\n"):
+        while len(paragraph) > max_chars:
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if len(current) + len(paragraph) + 1 > max_chars and current:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(contents: List[str], max_tokens: int = QUIZ_CHUNK_TOKENS) -> List[str]:
+    """İçerikleri sırayı koruyarak token sınırını aşmayan parçalara toplar"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for content in contents:
+        for piece in _split_text(content, max_tokens):
+            piece_tokens = count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+async def condense_chunk(chunk: str, quiz_type: str, target_tokens: int, api_key: str) -> str:
+    target_words = max(50, int(target_tokens * 0.75))
+    prompt = f"""{CONDENSE_INSTRUCTIONS[quiz_type]}
+
+    En fazla {target_words} kelime kullan. Sadece maddeleri döndür, ek açıklama ekleme.
+
+    METİN:
+    {chunk}
+    """
+    return await cached_generate(
+        "quiz_condense",
+        CONDENSE_PROMPT_VERSION,
+        [quiz_type, target_words, chunk],
+        lambda: generate(prompt, api_key),
+    )
+
+
+async def build_quiz_content(contents: List[str], quiz_type: str, api_key: str,
+                             budget: int = QUIZ_PROMPT_TOKEN_BUDGET) -> str:
+    """Quiz prompt'una girecek içeriği token bütçesine sığdırır.
+
+    Bütçeye sığan içerik olduğu gibi birleştirilir. Sığmayan içerik parçalara
+    bölünür, her parça paralel olarak özetlenir (map) ve özetler birleştirilir
+    (reduce). Sonuç hâlâ büyükse aynı işlem özetler üzerinde tekrarlanır.
+    """
+    content_text = "\n\n".join(contents)
+    if count_tokens(content_text) <= budget:
+        return content_text
+
+    semaphore = asyncio.Semaphore(QUIZ_CONDENSE_CONCURRENCY)
+
+    async def condense(chunk: str, target_tokens: int) -> str:
+        async with semaphore:
+            return await condense_chunk(chunk, quiz_type, target_tokens, api_key)
+
+    parts = contents
+    for _ in range(MAX_REDUCE_ROUNDS):
+        chunks = split_into_chunks(parts)
+        target_tokens = max(budget // len(chunks), 1)
+        parts = await asyncio.gather(*(condense(chunk, target_tokens) for chunk in chunks))
+        content_text = "\n\n".join(part for part in parts if part)
+        if count_tokens(content_text) <= budget:
+            return content_text
+
+    # Model hedefe uymadıysa bütçeyi kesin olarak uygula
+    return content_text[:budget * CHARS_PER_TOKEN]
@@ -0,0 +1,67 @@
+import json
+from typing import List
+
+
+class QuizStreamParser:
+    """Parça parça gelen quiz JSON'ından tamamlanan soru objelerini çıkarır.
+
+    Yanıtın {"questions": [ {...}, {...} ]} ya da doğrudan [ {...} ] şeklinde
+    olduğu varsayılır. Baştaki ```json işaretleri gibi JSON dışı karakterler,
+    ilk '{' ya da '[' görülene kadar atlanır.
+    """
+
+    def __init__(self):
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self._item_depth = None
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> List[dict]:
+        completed = []
+        offset = len(self._buffer)
+        self._buffer += chunk
+
+        for i in range(offset, len(self._buffer)):
+            ch = self._buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                if self._stack:
+                    self._in_string = True
+            elif ch in "{[":
+                # Soru objesi: bir dizinin içinde, en fazla ikinci seviyede açılan obje
+                if ch == "{" and self._item_start is None and self._stack and self._stack[-1] == "[" \
+                        and len(self._stack) <= 2:
+                    self._item_start = i
+                    self._item_depth = len(self._stack)
+                self._stack.append(ch)
+            elif ch in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if ch == "}" and self._item_start is not None and len(self._stack) == self._item_depth:
+                    try:
+                        completed.append(json.loads(self._buffer[self._item_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+                    self._item_depth = None
+
+        # Tamamlanan objeleri tampondan at, sadece yarım kalan objeyi tut
+        if self._item_start is not None:
+            self._buffer = self._buffer[self._item_start:]
+            self._item_start = 0
+        else:
+            self._buffer = ""
+
+        return completed
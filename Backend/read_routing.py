@@ -0,0 +1,247 @@
+"""Salt okunur endpoint'lerin okuma replikalarına yönlendirilmesi.
+
+@read_only ile işaretlenen endpoint'lerin oturumu (ve aynı isteğin sahiplik
+dependency'leri) sağlıklı bir replikadan açılır, diğer her şey primary'ye gider.
+Kullanıcı kısa süre önce yazdıysa kendi yazdığını görebilmesi için okumalar da
+primary'den yapılır. Yazma yapan isteğin yanıtına imzalı son yazma zamanı
+(X-Last-Write) eklenir; istemci bunu sonraki isteklerde geri gönderirse karar
+primary'ye sorulmadan verilir. Göndermeyen istemciler için yazma zamanı
+user_write_marks tablosundan okunur, böylece yazmayı başka bir worker process'i
+yapmış olsa da geçerlidir. Gecikmesi REPLICA_MAX_LAG_SECONDS'u aşan ya da
+ölçülemeyen replika kullanılmaz; hiç replika yoksa davranış tek veritabanıyla aynıdır.
+"""
+import asyncio
+import hashlib
+import hmac
+import itertools
+import os
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database import AsyncSessionLocal, ReplicaSessionLocals, async_engine, replica_engines
+from models import UserWriteMark
+from routers.auth import SECRET_KEY
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+# Yazma sonrası kullanıcının okumalarının primary'de kalacağı süre (saniye)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+# Primary'den "yakın zamanda yazma yok" cevabı alınan kullanıcı bu süre tekrar sorulmaz (saniye)
+READ_YOUR_WRITES_NEGATIVE_CACHE_SECONDS = float(os.getenv("READ_YOUR_WRITES_NEGATIVE_CACHE_SECONDS", "1"))
+
+WRITE_TOKEN_HEADER = "X-Last-Write"
+
+# Replika tüm WAL'i uyguladıysa gecikme 0, değilse son uygulanan işlemden beri geçen süre
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+# Henüz ölçülmemiş replika kullanılmaz
+_replica_lag = [float("inf")] * len(replica_engines)
+# user_id -> son commit zamanı; bu worker'ın gördüğü yazmalar için primary'ye sormadan karar verilir
+_last_write: Dict[int, float] = {}
+# user_id -> "yazma yok" cevabının geçerli olduğu son an
+_no_recent_write: Dict[int, float] = {}
+# İşlenen isteğin commit ettiği yazma; WriteTokenMiddleware yanıta ekler
+_request_write: ContextVar[Optional[dict]] = ContextVar("request_write", default=None)
+_round_robin = itertools.count()
+
+
+def read_only(endpoint: Callable) -> Callable:
+    """Endpoint'i salt okunur işaretler, oturumu replikadan açılabilir"""
+    endpoint.read_only = True
+    return endpoint
+
+
+def is_read_only(endpoint: Optional[Callable]) -> bool:
+    return getattr(endpoint, "read_only", False)
+
+
+def record_write(user_id: int):
+    _last_write[user_id] = time.monotonic()
+    _no_recent_write.pop(user_id, None)
+
+
+def recently_wrote(user_id: int) -> bool:
+    wrote_at = _last_write.get(user_id)
+    return wrote_at is not None and time.monotonic() - wrote_at < READ_YOUR_WRITES_SECONDS
+
+
+def prune_writes():
+    cutoff = time.monotonic() - READ_YOUR_WRITES_SECONDS
+    for user_id in [user_id for user_id, wrote_at in _last_write.items() if wrote_at < cutoff]:
+        _last_write.pop(user_id, None)
+    now = time.monotonic()
+    for user_id in [user_id for user_id, until in _no_recent_write.items() if until < now]:
+        _no_recent_write.pop(user_id, None)
+
+
+def sign_write(user_id: int, written_at: float) -> str:
+    payload = f"{user_id}:{written_at:.3f}"
+    signature = hmac.new(SECRET_KEY.encode(), payload.encode(), hashlib.sha256).hexdigest()
+    return f"{payload}:{signature}"
+
+
+def written_at_from_token(token: str, user_id: int) -> Optional[float]:
+    """İmzası doğru ve bu kullanıcıya aitse token'daki yazma zamanını döndürür"""
+    try:
+        token_user_id, written_at, signature = token.split(":")
+        expected = sign_write(int(token_user_id), float(written_at)).rsplit(":", 1)[1]
+        if int(token_user_id) != user_id or not hmac.compare_digest(signature, expected):
+            return None
+        return float(written_at)
+    except ValueError:
+        return None
+
+
+def healthy_replicas() -> list:
+    return [index for index, lag in enumerate(_replica_lag) if lag <= REPLICA_MAX_LAG_SECONDS]
+
+
+async def recently_wrote_anywhere(user_id: int) -> bool:
+    """Kullanıcının herhangi bir worker'da yakın zamanda yazıp yazmadığını primary'den sorar"""
+    if recently_wrote(user_id):
+        return True
+    if _no_recent_write.get(user_id, 0) > time.monotonic():
+        return False
+    try:
+        async with async_engine.connect() as conn:
+            # Karşılaştırma primary'nin saatiyle yapılır, worker saatleri arasındaki fark önemsizdir
+            wrote = await conn.scalar(select(UserWriteMark.user_id).where(
+                UserWriteMark.user_id == user_id,
+                UserWriteMark.written_at > func.now() - timedelta(seconds=READ_YOUR_WRITES_SECONDS)
+            )) is not None
+    except Exception as e:
+        print(f"Son yazma zamanı okunamadı (user {user_id}): {e}")
+        return True
+    if not wrote:
+        _no_recent_write[user_id] = time.monotonic() + READ_YOUR_WRITES_NEGATIVE_CACHE_SECONDS
+    return wrote
+
+
+async def session_factory(read: bool, user_id: Optional[int], write_token: Optional[str] = None):
+    """İstek için kullanılacak sessionmaker'ı seçer"""
+    if not read or not ReplicaSessionLocals:
+        return AsyncSessionLocal
+    healthy = healthy_replicas()
+    if not healthy:
+        return AsyncSessionLocal
+    if user_id is not None:
+        written_at = written_at_from_token(write_token, user_id) if write_token else None
+        if written_at is not None:
+            # İstemci son yazma zamanını taşıyor, primary'ye sormaya gerek yok
+            if recently_wrote(user_id) or time.time() - written_at < READ_YOUR_WRITES_SECONDS:
+                return AsyncSessionLocal
+        elif await recently_wrote_anywhere(user_id):
+            return AsyncSessionLocal
+    return ReplicaSessionLocals[healthy[next(_round_robin) % len(healthy)]]
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_flushed_changes(session: Session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_write_statements(orm_execute_state):
+    # insert()/update()/delete() ifadeleri flush'tan geçmez
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _mark_write(session: Session):
+    # Sadece primary oturumlarında write_user_id bulunur
+    user_id = session.info.get("write_user_id")
+    if user_id is None:
+        return
+    # Bekleyen değişiklikler de sayılsın diye flush commit'ten önce burada yapılır
+    session.flush()
+    if not session.info.pop("wrote", False):
+        # Sadece transaction'ı bitiren commit kullanıcıyı primary'ye bağlamaz
+        return
+    session.info["committed_write"] = True
+    if ReplicaSessionLocals:
+        # İşaret yazmayla aynı transaction'da commit edilir, diğer worker'lar da görür
+        session.execute(insert(UserWriteMark).values(user_id=user_id, written_at=func.now()).on_conflict_do_update(
+            index_elements=[UserWriteMark.user_id],
+            set_={"written_at": func.now()}
+        ))
+        session.info.pop("wrote", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_write(session: Session):
+    # write_user_id olmayan oturumlarda bayrak commit içindeki flush'ta kalmış olabilir
+    session.info.pop("wrote", None)
+    user_id = session.info.get("write_user_id")
+    if session.info.pop("committed_write", False) and user_id is not None:
+        record_write(user_id)
+        request_write = _request_write.get()
+        if request_write is not None:
+            request_write.update(user_id=user_id, written_at=time.time())
+
+
+class WriteTokenMiddleware:
+    """Yazma commit eden isteklerin yanıtına imzalı son yazma zamanını ekleyen ASGI middleware'i"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_write = {}
+        token = _request_write.set(request_write)
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and request_write:
+                value = sign_write(request_write["user_id"], request_write["written_at"])
+                message = {**message, "headers": [
+                    *message.get("headers", []), (WRITE_TOKEN_HEADER.lower().encode(), value.encode())
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            _request_write.reset(token)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_write(session: Session):
+    session.info.pop("wrote", None)
+    session.info.pop("committed_write", None)
+
+
+async def check_replica_lag():
+    for index, replica in enumerate(replica_engines):
+        try:
+            async with replica.connect() as conn:
+                _replica_lag[index] = float(await conn.scalar(LAG_QUERY))
+        except Exception as e:
+            _replica_lag[index] = float("inf")
+            print(f"Replika gecikmesi ölçülemedi ({replica.url.host}): {e}")
+
+
+async def run_lag_monitor():
+    """Replika gecikmelerini periyodik olarak ölçen arka plan görevi"""
+    while True:
+        await check_replica_lag()
+        prune_writes()
+        await asyncio.sleep(REPLICA_LAG_CHECK_INTERVAL)
+
+
+async def dispose_replicas():
+    for replica in replica_engines:
+        await replica.dispose()
@@ -1,15 +1,29 @@
 from typing import List, Optional, Annotated
 import json
 from fastapi import HTTPException, APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from starlette import status
-import pytesseract
-from PIL import Image
+from starlette.concurrency import run_in_threadpool
 import os
-import requests
-from database import SessionLocal
-from models import User, QuestionLesson, QuestionTerm, NoteLesson, NoteTerm
+from ai_cache import cached_generate, lookup as cache_lookup, store as cache_store, get_stats as get_cache_stats
+from ai_client import clean_ai_json, AIServiceError
+from ai_gateway import generate, stream, to_http_exception, has_api_key
+from cultural_pool import read_pool_slice
+from jobs import JobFailed
+from prompt_builder import build_quiz_content
+from quiz_stream import QuizStreamParser
+import jobs
+import ocr
+from database import AsyncSessionLocal
+from read_routing import read_only
+from dependencies import (
+    async_db_dependency, user_id_dependency, admin_user_id_dependency, load_note_term, load_question_term
+)
+from models import Note, Question
 from routers.auth import get_current_user
 
 router = APIRouter(
@@ -17,14 +31,6 @@ router = APIRouter(
     tags=["API"]
 )
 
-def get_db():
-    db=SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-db_dependency=Annotated[Session,Depends(get_db)]
 user_dependency=Annotated[dict,Depends(get_current_user)]
 
 # Response modeli
@@ -65,14 +71,18 @@ class TesseractResponse(BaseModel):
     path: Optional[str] = None
     error: Optional[str] = None
 
-def createQuiz(contents, difficulty, count, quiz_type):
-    google_api_key = os.getenv("GOOGLE_API_KEY")
-    if not google_api_key:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="AI API key bulunamadı")
+# Prompt şablonu değiştiğinde versiyonu artır, eski önbellek kayıtları kullanılmaz
+QUIZ_PROMPT_VERSIONS = {"note": "1", "question": "1"}
+
+
+def is_valid_quiz_json(ai_response: str) -> bool:
+    try:
+        return bool(json.loads(clean_ai_json(ai_response)).get("questions"))
+    except (json.JSONDecodeError, AttributeError):
+        return False
 
-    # İçerikleri birleştir
-    content_text = "\n\n".join(contents)
 
+def build_quiz_prompt(content_text, difficulty, count, quiz_type):
     if quiz_type == "note":
         # Notlar için özel prompt
         prompt = f"""Sen bir quiz oluşturma uzmanısın. Aşağıdaki not içeriklerine dayalı olarak {count} adet çoktan seçmeli soru oluştur.
@@ -143,43 +153,38 @@ def createQuiz(contents, difficulty, count, quiz_type):
 
         }}"""
 
+    return prompt
 
-    try:
-        # Google AI API'ye istek gönder
-        url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-
-        headers = {
-            "Content-Type": "application/json"
-        }
-
-        data = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "text": prompt
-                        }
-                    ]
-                }
-            ]
-        }
 
-        response = requests.post(
-            f"{url}?key={google_api_key}",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
+def to_quiz_question(q: dict) -> QuizQuestion:
+    return QuizQuestion(
+        question=q.get("question", ""),
+        options=q.get("options", []),
+        correct_answer=q.get("correct_answer", ""),
+        explanation=q.get("explanation"),
+        hint=q.get("hint")
+    )
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="AI servisi ile iletişim kurulamadı"
-            )
 
-        # AI yanıtını parse et
-        response_data = response.json()
-        ai_response = response_data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+async def createQuiz(contents, difficulty, count, quiz_type):
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    # Tanımlı değilse gateway diğer anahtarlara düşer
+    if not has_api_key():
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="AI API key bulunamadı")
+
+    try:
+        # İçerikleri birleştir, token bütçesini aşıyorsa önce parçalar halinde özetle
+        content_text = await build_quiz_content(contents, quiz_type, google_api_key)
+        prompt = build_quiz_prompt(content_text, difficulty, count, quiz_type)
+
+        # Google AI API'ye istek gönder (aynı içerik için önbellekten döner)
+        ai_response = await cached_generate(
+            f"{quiz_type}_quiz",
+            QUIZ_PROMPT_VERSIONS[quiz_type],
+            [content_text, difficulty, count],
+            lambda: generate(prompt, google_api_key),
+            validate=is_valid_quiz_json,
+        )
 
         # Debug için AI yanıtını logla
         print(f"AI Response Length: {len(ai_response)}")
@@ -187,15 +192,7 @@ def createQuiz(contents, difficulty, count, quiz_type):
         print(f"AI Response Type: {type(ai_response)}")
 
         # AI yanıtını temizle (```json ve ``` işaretlerini kaldır)
-        ai_response = ai_response.strip()
-        if ai_response.startswith("```json"):
-            ai_response = ai_response[7:]  # ```json kısmını kaldır
-        if ai_response.startswith("```"):
-            ai_response = ai_response[3:]  # ``` kısmını kaldır
-        if ai_response.endswith("```"):
-            ai_response = ai_response[:-3]  # Sondaki ``` kısmını kaldır
-
-        ai_response = ai_response.strip()
+        ai_response = clean_ai_json(ai_response)
         print(f"Cleaned AI Response: {ai_response[:200]}...")
 
         try:
@@ -204,15 +201,7 @@ def createQuiz(contents, difficulty, count, quiz_type):
             questions = quiz_data.get("questions", [])
 
             # QuizQuestion objelerine dönüştür
-            quiz_questions = []
-            for q in questions:
-                quiz_questions.append(QuizQuestion(
-                    question=q.get("question", ""),
-                    options=q.get("options", []),
-                    correct_answer=q.get("correct_answer", ""),
-                    explanation=q.get("explanation"),
-                    hint=q.get("hint")
-                ))
+            quiz_questions = [to_quiz_question(q) for q in questions]
 
             return QuizResponse(
                 questions=quiz_questions,
@@ -250,11 +239,8 @@ def createQuiz(contents, difficulty, count, quiz_type):
                 type=quiz_type
             )
 
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"AI servisi hatası: {str(e)}"
-        )
+    except AIServiceError as e:
+        raise to_http_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -262,36 +248,105 @@ def createQuiz(contents, difficulty, count, quiz_type):
         )
 
 
-@router.get("/createNoteQuiz/{lesson_id}/{term_id}/{difficulty}/{count}")
-def create_note_quiz(lesson_id: int, term_id: int, difficulty: int, count: int, user: user_dependency, db: db_dependency):
-    """Notlardan quiz oluşturur"""
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+def ndjson_line(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+async def replay(text: str):
+    yield text
+
 
-    user_obj = db.query(User).filter(User.id == user.get("id")).first()
-    if not user_obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+def streamQuiz(contents, difficulty, count, quiz_type):
+    """Quiz sorularını Gemini'den stream ederek her biri tamamlandığında NDJSON satırı olarak gönderir.
 
-    noteLesson = db.query(NoteLesson).filter(NoteLesson.id == lesson_id, NoteLesson.user_id == user_obj.id).first()
-    noteTerm = db.query(NoteTerm).filter(NoteTerm.id == term_id, NoteTerm.n_lesson_id == lesson_id).first()
+    Satır tipleri: {"type": "question", ...}, {"type": "error", ...} ve en sonda {"type": "done", ...}
+    """
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    # Tanımlı değilse gateway diğer anahtarlara düşer
+    if not has_api_key():
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="AI API key bulunamadı")
+
+    cache_kind = f"{quiz_type}_quiz"
+
+    async def events():
+        parser = QuizStreamParser()
+        sent = 0
+        received = []
+        try:
+            # Büyük içerik önce token bütçesine sığacak şekilde özetlenir
+            content_text = await build_quiz_content(contents, quiz_type, google_api_key)
+            prompt = build_quiz_prompt(content_text, difficulty, count, quiz_type)
+            cache_inputs = [content_text, difficulty, count]
+
+            cached = await cache_lookup(cache_kind, QUIZ_PROMPT_VERSIONS[quiz_type], cache_inputs)
+            if cached is not None:
+                chunks = replay(cached)
+            else:
+                chunks = stream(prompt, google_api_key)
+
+            async for chunk in chunks:
+                received.append(chunk)
+                for q in parser.feed(chunk):
+                    yield ndjson_line({"type": "question", "index": sent, **to_quiz_question(q).model_dump()})
+                    sent += 1
+        except AIServiceError as e:
+            yield ndjson_line({"type": "error", "detail": str(e)})
+            return
+
+        full_response = "".join(received)
+        if cached is None and is_valid_quiz_json(full_response):
+            await cache_store(cache_kind, QUIZ_PROMPT_VERSIONS[quiz_type], cache_inputs, full_response)
+
+        yield ndjson_line({
+            "type": "done",
+            "count": sent,
+            "total_time": sent * 2,  # Her soru için 2 dakika
+            "difficulty": difficulty,
+            "quiz_type": quiz_type,
+        })
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def get_note_quiz_contents(lesson_id: int, term_id: int, difficulty: int, user: dict, db: AsyncSession):
+    """Quiz'e girecek not içeriklerini sahiplik kontrolü yaparak döndürür"""
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-    if not noteLesson:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
-    if not noteTerm:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term not found")
     if difficulty not in [1, 2, 3]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Difficulty must be 1, 2, or 3")
 
-    notes = [note.content for note in noteTerm.notes]
+    noteLesson, noteTerm = await load_note_term(db, user.get("id"), lesson_id, term_id)
+
+    notes = (await db.scalars(select(Note.content).where(Note.term_id == noteTerm.id).order_by(Note.id))).all()
     if not notes:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No notes found for this term")
+    return notes
+
+
+@router.get("/createNoteQuiz/{lesson_id}/{term_id}/{difficulty}/{count}")
+async def create_note_quiz(lesson_id: int, term_id: int, difficulty: int, count: int, user: user_dependency, db: async_db_dependency):
+    """Notlardan quiz oluşturur"""
+    notes = await get_note_quiz_contents(lesson_id, term_id, difficulty, user, db)
+    # Bağlantı havuza döner, Gemini yanıtı beklenirken tutulmaz
+    await db.close()
+    return await createQuiz(notes, difficulty, count, "note")
+
 
-    return createQuiz(notes, difficulty, count, "note")
+@router.get("/createNoteQuizStream/{lesson_id}/{term_id}/{difficulty}/{count}")
+async def create_note_quiz_stream(lesson_id: int, term_id: int, difficulty: int, count: int, user: user_dependency, db: async_db_dependency):
+    """Notlardan quiz oluşturur, her soruyu hazır olur olmaz NDJSON satırı olarak gönderir"""
+    notes = await get_note_quiz_contents(lesson_id, term_id, difficulty, user, db)
+    # Bağlantı havuza döner, Gemini yanıtı beklenirken tutulmaz
+    await db.close()
+    return streamQuiz(notes, difficulty, count, "note")
 
 
-def parse_questions(questions):
+async def parse_questions(db: AsyncSession, questions):
+    """Metni henüz kaydedilmemiş sorular için OCR'ı process havuzunda paralel çalıştırır ve sonucu kayda yazar"""
     try:
-        print(f"Tesseract version: {pytesseract.get_tesseract_version()}")
+        version = await run_in_threadpool(ocr.get_engine_version)
+        print(f"Tesseract version: {version}")
     except Exception as e:
         print(f"Tesseract version check failed: {e}")
         raise HTTPException(
@@ -299,205 +354,194 @@ def parse_questions(questions):
             detail="Tesseract OCR çalışmıyor. Lütfen kurulumu kontrol edin."
         )
 
-    parsed_texts = []
+    # OCR sürerken istek bağlantıyı tutmaz, sonuçlar kısa bir transaction'da yazılır
+    await ocr.ocr_and_save(db, questions)
 
-    for image_path in questions:
-        try:
-            # Resim dosyasını oku
-            file_path = image_path.replace("/uploads/", "uploads/")
-            if not os.path.exists(file_path):
-                continue
 
-            # PIL ile resmi aç
-            image = Image.open(file_path)
 
-            # OCR ile metin çıkar
-            extracted_text = pytesseract.image_to_string(image, lang='tur')
+async def get_question_quiz_contents(lesson_id: int, term_id: int, difficulty: int, user: dict, db: AsyncSession):
+    """Quiz'e girecek soru metinlerini sahiplik kontrolü yaparak OCR ile çıkarır"""
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-            if extracted_text.strip():
-                parsed_texts.append(extracted_text.strip())
-            else:
-                parsed_texts.append("Metin çıkarılamadı")
+    if difficulty not in [1, 2, 3]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Difficulty must be 1, 2, or 3")
 
-        except Exception as e:
-            parsed_texts.append(f"İşlem hatası: {str(e)}")
+    questionLesson, questionTerm = await load_question_term(db, user.get("id"), lesson_id, term_id)
 
-    return parsed_texts
+    # Sadece OCR'ın okuyup yazdığı kolonlar yüklenir, diğerlerine erişim hata verir
+    questions = (await db.scalars(
+        select(Question).options(load_only(
+            Question.id, Question.image_path, Question.ocr_text, Question.image_hash, Question.ocr_engine_version,
+            raiseload=True
+        )).where(Question.term_id == questionTerm.id).order_by(Question.id)
+    )).all()
+    if not questions:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No questions found for this term")
 
+    # Metinler yükleme sırasında kaydediliyor, sadece henüz işlenmemiş olanlar için OCR çalıştır
+    missing = [question for question in questions if question.ocr_text is None]
+    if missing:
+        await parse_questions(db, missing)
+
+    return [question.ocr_text for question in questions if question.ocr_text is not None]
 
 
 @router.get("/createQuestionQuiz/{lesson_id}/{term_id}/{difficulty}/{count}")
-def create_question_quiz(lesson_id: int, term_id: int, difficulty: int, count: int, user: user_dependency, db: db_dependency):
+async def create_question_quiz(lesson_id: int, term_id: int, difficulty: int, count: int, user: user_dependency, db: async_db_dependency):
     """Soru resimlerinden quiz oluşturur"""
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    parsed_questions = await get_question_quiz_contents(lesson_id, term_id, difficulty, user, db)
+    # Bağlantı havuza döner, Gemini yanıtı beklenirken tutulmaz
+    await db.close()
+    return await createQuiz(parsed_questions, difficulty, count, "question")
 
-    user_obj = db.query(User).filter(User.id == user.get("id")).first()
-    if not user_obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    questionLesson = db.query(QuestionLesson).filter(QuestionLesson.id == lesson_id, QuestionLesson.user_id == user_obj.id).first()
-    questionTerm = db.query(QuestionTerm).filter(QuestionTerm.id == term_id, QuestionTerm.q_lesson_id == lesson_id).first()
+@router.get("/createQuestionQuizStream/{lesson_id}/{term_id}/{difficulty}/{count}")
+async def create_question_quiz_stream(lesson_id: int, term_id: int, difficulty: int, count: int, user: user_dependency, db: async_db_dependency):
+    """Soru resimlerinden quiz oluşturur, her soruyu hazır olur olmaz NDJSON satırı olarak gönderir"""
+    parsed_questions = await get_question_quiz_contents(lesson_id, term_id, difficulty, user, db)
+    # Bağlantı havuza döner, Gemini yanıtı beklenirken tutulmaz
+    await db.close()
+    return streamQuiz(parsed_questions, difficulty, count, "question")
 
-    if not questionLesson:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
-    if not questionTerm:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term not found")
-    if difficulty not in [1, 2, 3]:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Difficulty must be 1, 2, or 3")
 
-    questions = [question.image_path for question in questionTerm.questions]
-    if not questions:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No questions found for this term")
+# ===== ARKA PLAN QUIZ İŞLERİ =====
 
-    parsed_questions = parse_questions(questions)
-    return createQuiz(parsed_questions, difficulty, count, "question")
+class QuizJobRequest(BaseModel):
+    lesson_id: int
+    term_id: int
+    difficulty: int
+    count: int
 
 
-def get_infos():
-    api_key = os.getenv("GOOGLE_API_KEY_3")
-    if not api_key:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="AI API key bulunamadı")
+class QuizJobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    priority: int
+    result: Optional[QuizResponse] = None
+    error: Optional[str] = None
 
-    prompt="""Genel kültür alanında, tarih, coğrafya, sanat, spor, bilim ve teknoloji, matematik, biyoloji
-    fizik, kimya, astronomi, arkeoloji, edebiyat, dünya kültürleri ve gelenekleri, keşifler ve coğrafi buluşlar, 
-    dünya siyaseti, ekonomi, dinler tarihi, popüler kültür, eğlence, sinema, film ve dizi kültürü gibi farklı konulardan oluşan 10 tane açık uçlu genel kültür sorusu üret.
-
-SORULARIN ÖZELLİKLERİ:
-1. Her soru sadece tek bir doğru cevaba sahip olmalı.
-2. Sorular kısa ve bilgi içerikli (hap bilgi) olmalı.
-3. Bazı sorular ilginç ya da az bilinen bilgiler içerebilir.
-4. Tüm sorular farklı kategorilerden gelmeli (her soru farklı bir alandan).
-5. Sorular kişisel yorum gerektirmemeli, tamamen bilgiye dayalı olmalı.
-6. Sorular farklı zorluk türlerinde olmalı (bazıları kolay, bazıları orta, bazıları zor).
-7. Sorular yenilendiğinde de olabildiğince farklı ve çeşitli koulardan gelmeli.
-
-    Her soru için:
-        - Soru metni 
-        - Doğru cevap
-        
-        KURALLAR:
-        1. SADECE JSON formatında yanıt ver
-        2. Başka hiçbir açıklama ekleme
-        3. JSON dışında hiçbir metin yazma
-        4. Yanıtın tamamen geçerli JSON olması gerekiyor
 
+def to_job_response(job: dict) -> QuizJobResponse:
+    return QuizJobResponse(
+        id=job["id"],
+        kind=job["kind"],
+        status=job["status"],
+        priority=job["priority"],
+        result=job["result"],
+        error=job["error"],
+    )
 
-        YANIT FORMATI:
-        {{
-            "questions": [
-            {{
-                "question": "Açık uçlu soru metni",
-                "answer": "Cevap metni",
-            }}
-            ]
 
-        }}
-    """
+async def run_note_quiz_job(job: dict) -> dict:
+    params = job["params"]
+    async with AsyncSessionLocal() as db:
+        try:
+            notes = await get_note_quiz_contents(
+                params["lesson_id"], params["term_id"], params["difficulty"], {"id": job["user_id"]}, db
+            )
+        except HTTPException as e:
+            raise JobFailed(e.detail)
+    # Bağlantı Gemini beklenirken tutulmasın
     try:
-        # Google AI API'ye istek gönder
-        url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-
-        headers = {
-            "Content-Type": "application/json"
-        }
-
-        data = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "text": prompt
-                        }
-                    ]
-                }
-            ]
-        }
+        quiz = await createQuiz(notes, params["difficulty"], params["count"], "note")
+        return quiz.model_dump()
+    except HTTPException as e:
+        raise JobFailed(e.detail)
 
-        response = requests.post(
-            f"{url}?key={api_key}",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="AI servisi ile iletişim kurulamadı"
+async def run_question_quiz_job(job: dict) -> dict:
+    params = job["params"]
+    async with AsyncSessionLocal() as db:
+        try:
+            parsed_questions = await get_question_quiz_contents(
+                params["lesson_id"], params["term_id"], params["difficulty"], {"id": job["user_id"]}, db
             )
+        except HTTPException as e:
+            raise JobFailed(e.detail)
+    # Bağlantı Gemini beklenirken tutulmasın
+    try:
+        quiz = await createQuiz(parsed_questions, params["difficulty"], params["count"], "question")
+        return quiz.model_dump()
+    except HTTPException as e:
+        raise JobFailed(e.detail)
 
-        # AI yanıtını parse et
-        response_data = response.json()
-        ai_response = response_data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
 
-        # Debug için AI yanıtını logla
-        print(f"AI Response Length: {len(ai_response)}")
-        print(f"AI Response: {ai_response}")
-        print(f"AI Response Type: {type(ai_response)}")
+# Not quiz'i OCR beklemediği için kısa sürer, uzun soru quiz'lerinin arkasında kalmasın
+jobs.register_handler("note_quiz", run_note_quiz_job, priority=5)
+jobs.register_handler("question_quiz", run_question_quiz_job, priority=0)
 
-        # AI yanıtını temizle (```json ve ``` işaretlerini kaldır)
-        ai_response = ai_response.strip()
-        if ai_response.startswith("```json"):
-            ai_response = ai_response[7:]  # ```json kısmını kaldır
-        if ai_response.startswith("```"):
-            ai_response = ai_response[3:]  # ``` kısmını kaldır
-        if ai_response.endswith("```"):
-            ai_response = ai_response[:-3]  # Sondaki ``` kısmını kaldır
-
-        ai_response = ai_response.strip()
-        print(f"Cleaned AI Response: {ai_response[:200]}...")
 
-        try:
-            quiz_data = json.loads(ai_response)
-            questions = quiz_data.get("questions", [])
+async def submit_quiz_job(kind: str, request: QuizJobRequest, user: dict) -> QuizJobResponse:
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    if request.difficulty not in [1, 2, 3]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Difficulty must be 1, 2, or 3")
 
-            # CulturalQuestion objelerine dönüştür
-            cultural_questions = []
-            for q in questions:
-                cultural_questions.append(CulturalQuestion(
-                    question=q.get("question", ""),
-                    answer=q.get("answer", "")
-                ))
+    params = {
+        "lesson_id": request.lesson_id,
+        "term_id": request.term_id,
+        "difficulty": request.difficulty,
+        "count": request.count,
+    }
+    job = await jobs.submit(kind, user.get("id"), params)
+    return to_job_response(job)
 
-            return CulturalResponse(
-                questions=cultural_questions
-            )
-        except json.JSONDecodeError:
-            # JSON parse edilemezse basit sorular oluştur
-            cultural_questions = []
-            for i in range(5):  # 5 adet fallback soru
-                cultural_questions.append(CulturalQuestion(
-                    question=f"Genel kültür sorusu {i+1}",
-                    answer="Bu soru için cevap mevcut değil."
-                ))
 
-            return CulturalResponse(
-                questions=cultural_questions
-            )
+@router.post("/jobs/noteQuiz", status_code=status.HTTP_202_ACCEPTED)
+async def submit_note_quiz_job(request: QuizJobRequest, user: user_dependency):
+    """Not quiz'ini kuyruğa ekler ve hemen iş id'sini döndürür"""
+    return await submit_quiz_job("note_quiz", request, user)
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Beklenmeyen hata: {str(e)}"
-        )
 
+@router.post("/jobs/questionQuiz", status_code=status.HTTP_202_ACCEPTED)
+async def submit_question_quiz_job(request: QuizJobRequest, user: user_dependency):
+    """Soru quiz'ini kuyruğa ekler ve hemen iş id'sini döndürür"""
+    return await submit_quiz_job("question_quiz", request, user)
 
 
-@router.get("/getCulturalInformations")
-def get_cultural_informations(db: db_dependency, user: user_dependency):
+async def get_owned_job(job_id: str, user: dict) -> dict:
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    job = await jobs.get(job_id)
+    if job is None or job["user_id"] != user.get("id"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
 
-    user_obj = db.query(User).filter(User.id == user.get("id")).first()
-    if not user_obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    try:
-        cultural_response = get_infos()
-        return cultural_response
-    except Exception as e:
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, user: user_dependency):
+    """İşin durumunu ve bittiyse quiz sonucunu döndürür"""
+    return to_job_response(await get_owned_job(job_id, user))
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, user: user_dependency):
+    """Kuyruktaki ya da çalışan işi iptal eder"""
+    await get_owned_job(job_id, user)
+    if not await jobs.cancel(job_id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Job already finished")
+    return to_job_response(await jobs.get(job_id))
+
+
+@router.get("/getCulturalInformations")
+@read_only
+async def get_cultural_informations(db: async_db_dependency, user_id: user_id_dependency):
+    """Önceden üretilmiş havuzdan günün kültürel sorularını döndürür"""
+    rows = await read_pool_slice(db)
+    if not rows:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Kültürel bilgiler alınırken hata oluştu: {str(e)}"
-        )
\ No newline at end of file
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Kültürel soru havuzu hazırlanıyor, lütfen daha sonra tekrar deneyin"
+        )
+
+    return CulturalResponse(
+        questions=[CulturalQuestion(question=row.question, answer=row.answer) for row in rows]
+    )
+
+
+@router.get("/cacheStats")
+async def get_ai_cache_stats(admin_id: admin_user_id_dependency):
+    """AI önbelleğinin isabet/ıska sayaçlarını döndürür (sadece ADMIN_USER_IDS)"""
+    return get_cache_stats()
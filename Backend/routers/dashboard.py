@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+
+from read_routing import read_only
+from dependencies import async_db_dependency, user_id_dependency
+from stats import get_dashboard_statistics
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["Dashboard"]
+)
+
+
+@router.get("/statistics")
+@read_only
+async def get_statistics(user_id: user_id_dependency, db: async_db_dependency):
+    """Kullanıcının not ve soru istatistiklerini tek istekte döndürür"""
+    return await get_dashboard_statistics(db, user_id)
@@ -1,15 +1,22 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import exists, select, update
+from sqlalchemy.orm import aliased
 from starlette import status
-from models import User, QuestionLesson, NoteLesson
-from routers.auth import get_current_user, db_dependency
+from read_routing import read_only
+from dependencies import (
+    async_db_dependency, user_id_dependency, question_lesson_dependency, note_lesson_dependency,
+    load_question_lesson, load_note_lesson, not_found
+)
+from models import User, QuestionLesson, NoteLesson, QuestionTerm, NoteTerm
+import stats
 
 router = APIRouter(
     prefix="/lesson",
     tags=["Lesson"]
 )
-user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 class LessonResponse(BaseModel):
@@ -19,159 +26,151 @@ class LessonResponse(BaseModel):
 
 
 @router.get("/QuestionLessons")
-def get_question_lessons(user: user_dependency, db: db_dependency):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
+@read_only
+async def get_question_lessons(user_id: user_id_dependency, db: async_db_dependency):
+    q_lessons = (await db.execute(
+        select(QuestionLesson.id, QuestionLesson.lesson_title).where(
+            QuestionLesson.user_id == user_id
+        ).order_by(QuestionLesson.id)
+    )).all()
 
     return [
         {"title":q_lesson.lesson_title,"id":q_lesson.id} 
-        for q_lesson in db_user.q_lessons]
+        for q_lesson in q_lessons]
 
 
 @router.get("/NoteLessons")
-def get_note_lessons(user: user_dependency, db: db_dependency):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
+@read_only
+async def get_note_lessons(user_id: user_id_dependency, db: async_db_dependency):
+    n_lessons = (await db.execute(
+        select(NoteLesson.id, NoteLesson.lesson_title).where(
+            NoteLesson.user_id == user_id
+        ).order_by(NoteLesson.id)
+    )).all()
+
+    return [{"title":n_lesson.lesson_title,"id":n_lesson.id} for n_lesson in n_lessons]
+
+
+async def check_new_lesson(db, user_id: int, model, lesson_title: str) -> bool:
+    """Kullanıcının varlığını ve aynı başlıklı ders olup olmadığını tek sorguda kontrol eder"""
+    row = (await db.execute(
+        select(
+            User.id,
+            exists().where(model.user_id == User.id, model.lesson_title == lesson_title).label("duplicate")
+        ).where(User.id == user_id)
+    )).first()
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    return [{"title":n_lesson.lesson_title,"id":n_lesson.id} for n_lesson in db_user.n_lessons]
+    return row.duplicate
 
     
 class LessonRequest(BaseModel):
     lesson_title: str
 
 
-@router.post("/QuestionLesson/create")
-def create_question_lesson(lesson: LessonRequest, user: user_dependency, db: db_dependency):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+class LessonPatchRequest(BaseModel):
+    lesson_title: Optional[str] = None
+
+
+async def rename_lesson(db, user_id: int, model, lesson_id: int, lesson_title: str,
+                        duplicate_detail: str) -> LessonResponse:
+    """Dersi tek UPDATE ile yeniden adlandırır; term, not ve sorulara dokunulmaz.
+
+    Sahiplik ve aynı başlıklı başka ders kontrolü UPDATE'in WHERE koşulundadır,
+    ayrı sorgu sadece güncelleme olmazsa hatanın nedenini bulmak için çalışır.
+    """
+    other = aliased(model)
+    row = (await db.execute(
+        update(model).where(
+            model.id == lesson_id,
+            model.user_id == user_id,
+            ~exists().where(other.user_id == user_id, other.lesson_title == lesson_title, other.id != lesson_id)
+        ).values(lesson_title=lesson_title).returning(
+            model.id, model.lesson_title, model.user_id
+        ).execution_options(synchronize_session=False)
+    )).first()
+
+    if row is None:
+        owned = await db.scalar(select(model.id).where(model.id == lesson_id, model.user_id == user_id))
+        if owned is None:
+            raise not_found("Lesson")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=duplicate_detail)
 
-    existing_lesson = db.query(QuestionLesson).filter(
-        QuestionLesson.lesson_title == lesson.lesson_title,
-        QuestionLesson.user_id == db_user.id
-    ).first()
+    await db.commit()
+    return LessonResponse(id=row.id, lesson_title=row.lesson_title, user_id=row.user_id)
 
-    if existing_lesson:
+
+@router.post("/QuestionLesson/create")
+async def create_question_lesson(lesson: LessonRequest, user_id: user_id_dependency, db: async_db_dependency):
+    if await check_new_lesson(db, user_id, QuestionLesson, lesson.lesson_title):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="QLesson already exists")
 
-    question_lesson = QuestionLesson(lesson_title=lesson.lesson_title, user_id=db_user.id)
+    question_lesson = QuestionLesson(lesson_title=lesson.lesson_title, user_id=user_id)
     db.add(question_lesson)
-    db.commit()
-    db.refresh(question_lesson)
+    await stats.adjust(db, user_id, question_lessons=1)
+    await db.commit()
+    await db.refresh(question_lesson)
     return question_lesson
 
 
 @router.post("/NoteLesson/create")
-def create_note_lesson(lesson: LessonRequest, user: user_dependency, db: db_dependency):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    existing_note_lesson = db.query(NoteLesson).filter(
-        NoteLesson.lesson_title == lesson.lesson_title,
-        NoteLesson.user_id == db_user.id
-    ).first()
-
-    if existing_note_lesson:
+async def create_note_lesson(lesson: LessonRequest, user_id: user_id_dependency, db: async_db_dependency):
+    if await check_new_lesson(db, user_id, NoteLesson, lesson.lesson_title):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="NoteLesson already exists")
 
-    note_lesson = NoteLesson(lesson_title=lesson.lesson_title, user_id=db_user.id)
+    note_lesson = NoteLesson(lesson_title=lesson.lesson_title, user_id=user_id)
     db.add(note_lesson)
-    db.commit()
-    db.refresh(note_lesson)
+    await stats.adjust(db, user_id, note_lessons=1)
+    await db.commit()
+    await db.refresh(note_lesson)
     return note_lesson
 
 
-@router.put("/QuestionLesson/update/{q_id}")
-def update_question_lesson(db: db_dependency, user: user_dependency, lesson: LessonRequest, q_id: int):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+@router.put("/QuestionLesson/update/{lesson_id}")
+async def update_question_lesson(lesson_id: int, lesson: LessonRequest, user_id: user_id_dependency,
+                                 db: async_db_dependency):
+    return await rename_lesson(db, user_id, QuestionLesson, lesson_id, lesson.lesson_title, "QLesson already exists")
 
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    db_lesson = db.query(QuestionLesson).filter(QuestionLesson.id == q_id).first()
-    if db_lesson is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
+@router.put("/NoteLesson/update/{lesson_id}")
+async def update_note_lesson(lesson_id: int, lesson: LessonRequest, user_id: user_id_dependency,
+                             db: async_db_dependency):
+    return await rename_lesson(db, user_id, NoteLesson, lesson_id, lesson.lesson_title, "NoteLesson already exists")
 
-    db.delete(db_lesson)
-    new_lesson = QuestionLesson(
-        lesson_title=lesson.lesson_title,
-        user_id=db_user.id
-    )
-    db.add(new_lesson)
-    db.commit()
-    db.refresh(new_lesson)
-    return new_lesson
 
+@router.patch("/QuestionLesson/{lesson_id}")
+async def patch_question_lesson(lesson_id: int, changes: LessonPatchRequest, user_id: user_id_dependency,
+                                db: async_db_dependency):
+    """Sadece gönderilen alanları günceller"""
+    if changes.lesson_title is None:
+        db_lesson = await load_question_lesson(db, user_id, lesson_id)
+        return LessonResponse(id=db_lesson.id, lesson_title=db_lesson.lesson_title, user_id=db_lesson.user_id)
+    return await rename_lesson(db, user_id, QuestionLesson, lesson_id, changes.lesson_title, "QLesson already exists")
 
-@router.put("/NoteLesson/update/{n_id}")
-def update_note_lesson(db: db_dependency, user: user_dependency, lesson: LessonRequest, n_id: int):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+@router.patch("/NoteLesson/{lesson_id}")
+async def patch_note_lesson(lesson_id: int, changes: LessonPatchRequest, user_id: user_id_dependency,
+                            db: async_db_dependency):
+    """Sadece gönderilen alanları günceller"""
+    if changes.lesson_title is None:
+        db_lesson = await load_note_lesson(db, user_id, lesson_id)
+        return LessonResponse(id=db_lesson.id, lesson_title=db_lesson.lesson_title, user_id=db_lesson.user_id)
+    return await rename_lesson(db, user_id, NoteLesson, lesson_id, changes.lesson_title, "NoteLesson already exists")
 
-    db_lesson = db.query(NoteLesson).filter(NoteLesson.id == n_id).first()
-    if db_lesson is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
-
-    db.delete(db_lesson)
-    new_lesson = NoteLesson(
-        lesson_title=lesson.lesson_title,
-        user_id=db_user.id
-    )
-    db.add(new_lesson)
-    db.commit()
-    db.refresh(new_lesson)
-    return new_lesson
-
-
-@router.delete("/QuestionLesson/delete/{q_id}")
-def delete_question_lesson(db: db_dependency, user: user_dependency, q_id: int):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    lesson = db.query(QuestionLesson).filter(QuestionLesson.id == q_id).first()
-    if lesson is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
-    db.delete(lesson)
-    db.commit()
+@router.delete("/QuestionLesson/delete/{lesson_id}")
+async def delete_question_lesson(db: async_db_dependency, user_id: user_id_dependency, lesson: question_lesson_dependency):
+    await stats.adjust(db, user_id, question_lessons=-1,
+                 **(await stats.question_removal_deltas(db, QuestionTerm.q_lesson_id == lesson.id)))
+    await db.delete(lesson)
+    await db.commit()
     return {"detail": "Lesson deleted"}
 
 
-@router.delete("/NoteLesson/delete/{n_id}")
-def delete_note_lesson(db: db_dependency, user: user_dependency, n_id: int):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    lesson = db.query(NoteLesson).filter(NoteLesson.id == n_id).first()
-
-    if lesson is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
-    db.delete(lesson)
-    db.commit()
+@router.delete("/NoteLesson/delete/{lesson_id}")
+async def delete_note_lesson(db: async_db_dependency, user_id: user_id_dependency, lesson: note_lesson_dependency):
+    await stats.adjust(db, user_id, note_lessons=-1,
+                 **(await stats.note_removal_deltas(db, NoteTerm.n_lesson_id == lesson.id)))
+    await db.delete(lesson)
+    await db.commit()
     return {"detail": "Lesson deleted"}
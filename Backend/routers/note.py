@@ -1,22 +1,31 @@
 import os
 import uuid
-import requests
-from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
 from pydantic import BaseModel
+from sqlalchemy import insert, select, func
 from starlette import status
 
-from database import SessionLocal
-from models import Note, NoteTerm, NoteLesson, User
-from routers.auth import get_current_user, db_dependency
+from ai_cache import cached_generate
+from ai_client import AIServiceError
+from ai_gateway import generate, to_http_exception, has_api_key
+from bulk import BulkResponse, BulkItemResult, ensure_bulk_size, failure, build_response
+from read_routing import read_only
+from dependencies import (
+    async_db_dependency, user_id_dependency, load_note_term, load_owned_note_terms,
+    note_term_dependency, note_dependency
+)
+from models import Note, NoteTerm, NoteLesson, NOTE_SEARCH_CONFIG
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields, keyset_page
+import stats
 
 router = APIRouter(
     prefix="/notes",
     tags=["Notes"]
 )
 
-user_dependency = Annotated[dict, Depends(get_current_user)]
+# Düzenleme prompt'ları değiştiğinde artır, eski önbellek kayıtları kullanılmaz
+NOTE_PROMPT_VERSION = "1"
 
 # Response modeli
 class NoteResponse(BaseModel):
@@ -26,39 +35,52 @@ class NoteResponse(BaseModel):
     lesson_id: int
 
 
+class NotePageResponse(BaseModel):
+    items: List[dict]
+    next_cursor: Optional[int] = None
+
+
+class NoteBulkItem(BaseModel):
+    content: str
+    lesson_id: int
+    term_id: int
+
+
+class NoteBulkRequest(BaseModel):
+    items: List[NoteBulkItem]
+
+
+class NoteSearchResult(BaseModel):
+    id: int
+    term_id: int
+    term_title: Optional[str] = None
+    lesson_id: int
+    lesson_title: Optional[str] = None
+    rank: float
+    snippet: str
+
+
+NOTE_FIELDS = ("id", "content", "preview", "term_id", "lesson_id")
+
+# Liste görünümü tam içerik yerine notun başını gösterir
+NOTE_PREVIEW_LENGTH = 120
+NOTE_EXPRESSIONS = {"preview": func.left(Note.content, NOTE_PREVIEW_LENGTH)}
+
+# ts_headline işaretleri ve parça ayarları
+NOTE_SNIPPET_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
 @router.post("/create")
 async def create_note(
-    user: user_dependency,
-    db: db_dependency,
+    user_id: user_id_dependency,
+    db: async_db_dependency,
     content: str = Form(..., description="Note içeriği (zorunlu)"),
     lesson_id: int = Form(..., description="Lesson ID (zorunlu)"),
     term_id: int = Form(..., description="Term ID (zorunlu)"),
 ):
 
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    user_obj=db.query(User).filter(User.id==user.get("id")).first()
-    if user_obj is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="User not found")
-
-    # Lesson kontrolü
-    lesson = db.query(NoteLesson).filter(
-        NoteLesson.id == lesson_id,
-        NoteLesson.user_id == user_obj.id
-    ).first()
-
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson not found")
-
-    # Term kontrolü
-    term = db.query(NoteTerm).filter(
-        NoteTerm.id == term_id,
-        NoteTerm.n_lesson_id == lesson.id
-    ).first()
-
-    if term is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term not found")
+    # Lesson ve term sahiplik kontrolü
+    lesson, term = await load_note_term(db, user_id, lesson_id, term_id)
 
     # Note oluştur
     note = Note(
@@ -67,8 +89,9 @@ async def create_note(
     )
     
     db.add(note)
-    db.commit()
-    db.refresh(note)
+    await stats.adjust(db, user_id, notes=1)
+    await db.commit()
+    await db.refresh(note)
     
     return NoteResponse(
         id=note.id,
@@ -78,75 +101,105 @@ async def create_note(
     )
 
 
+@router.post("/bulk", response_model=BulkResponse)
+async def create_notes_bulk(
+    request: NoteBulkRequest,
+    user_id: user_id_dependency,
+    db: async_db_dependency,
+):
+    """Birden fazla note'u tek INSERT ile ekler, her öğe için ayrı sonuç döndürür"""
+    items = request.items
+    ensure_bulk_size(len(items))
+
+    # Sahiplik her farklı term için bir kez, tek sorguda kontrol edilir
+    owned_terms = await load_owned_note_terms(db, user_id, (item.term_id for item in items))
+
+    results = [None] * len(items)
+    rows = []
+    row_indexes = []
+    for index, item in enumerate(items):
+        if owned_terms.get(item.term_id) != item.lesson_id:
+            results[index] = failure(index, "Term bulunamadı")
+            continue
+        rows.append({"content": item.content, "term_id": item.term_id})
+        row_indexes.append(index)
+
+    if rows:
+        note_ids = (await db.scalars(insert(Note).returning(Note.id, sort_by_parameter_order=True), rows)).all()
+        await stats.adjust(db, user_id, notes=len(note_ids))
+        await db.commit()
+        for index, note_id in zip(row_indexes, note_ids):
+            results[index] = BulkItemResult(index=index, success=True, id=note_id)
+
+    return build_response(results)
+
+
+@router.get("/search", response_model=List[NoteSearchResult])
+@read_only
+async def search_notes(
+    user_id: user_id_dependency,
+    db: async_db_dependency,
+    q: str = Query(..., min_length=2, description="Aranacak kelimeler (\"tırnak\", -hariç ve or desteklenir)"),
+    lesson_id: Optional[int] = Query(None, description="Sadece bu lesson içinde ara"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="En fazla sonuç sayısı"),
+):
+    """Kullanıcının notlarında tam metin araması yapar, sonuçları alakaya göre sıralar"""
+    query = func.websearch_to_tsquery(NOTE_SEARCH_CONFIG, q)
+    rank = func.ts_rank(Note.content_tsv, query)
+
+    criteria = [NoteLesson.user_id == user_id, Note.content_tsv.bool_op("@@")(query)]
+    if lesson_id is not None:
+        criteria.append(NoteLesson.id == lesson_id)
+
+    # Önce GIN index ile eşleşmeler sıralanıp kesilir, pahalı ts_headline sadece dönen satırlarda çalışır
+    matches = select(
+        Note.id, Note.content, Note.term_id, NoteTerm.term_title,
+        NoteLesson.id.label("lesson_id"), NoteLesson.lesson_title, rank.label("rank"),
+    ).join(Note.term).join(NoteTerm.n_lesson).where(*criteria).order_by(
+        rank.desc(), Note.id
+    ).limit(limit).subquery()
+
+    rows = await db.execute(
+        select(
+            matches.c.id, matches.c.term_id, matches.c.term_title,
+            matches.c.lesson_id, matches.c.lesson_title, matches.c.rank,
+            func.ts_headline(NOTE_SEARCH_CONFIG, matches.c.content, query, NOTE_SNIPPET_OPTIONS).label("snippet"),
+        ).order_by(matches.c.rank.desc(), matches.c.id)
+    )
+    return [NoteSearchResult(**row) for row in rows.mappings()]
+
+
 @router.get("/{lesson_id}/{term_id}")
+@read_only
 async def get_notes_by_lesson_term(
-    lesson_id: int,
-    term_id: int,
-    user: Annotated[dict, Depends(get_current_user)] = None,
-    db: db_dependency = None
+    owned: note_term_dependency,
+    db: async_db_dependency,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Sayfa boyutu"),
+    after: Optional[int] = Query(None, description="Önceki sayfanın next_cursor değeri"),
+    fields: Optional[str] = Query(None, description="Döndürülecek alanlar, örn. id,preview (liste görünümü için content yerine preview yeter)"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="id sırası, desc ile en yeni notlar önce gelir"),
 ):
-    """Belirli lesson ve term'e ait note'ları getirir"""
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    # Lesson kontrolü
-    lesson = db.query(NoteLesson).filter(
-        NoteLesson.id == lesson_id,
-        NoteLesson.user_id == user.get("id")
-    ).first()
-    
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson bulunamadı")
-    
-    # Term kontrolü
-    term = db.query(NoteTerm).filter(
-        NoteTerm.id == term_id,
-        NoteTerm.n_lesson_id == lesson.id
-    ).first()
-    
-    if not term:
-        raise HTTPException(status_code=404, detail="Term bulunamadı")
-    
-    # Note'ları getir ve sırala
-    notes = db.query(Note).filter(Note.term_id == term_id).order_by(Note.id).all()
-    
-    return [
-        NoteResponse(
-            id=n.id,
-            content=n.content,
-            term_id=n.term_id,
-            lesson_id=lesson.id
-        ) for n in notes
-    ]
+    """Belirli lesson ve term'e ait note'ları id sırasıyla sayfa sayfa getirir"""
+    lesson, term = owned
+    selected = parse_fields(fields, NOTE_FIELDS)
+
+    return NotePageResponse(**(await keyset_page(
+        db, Note, selected, [Note.term_id == term.id], after, limit,
+        constants={"lesson_id": lesson.id},
+        descending=order == "desc",
+        expressions=NOTE_EXPRESSIONS,
+    )))
 
 
 @router.put("/{note_id}")
 async def update_note(
-    note_id: int,
-    user: user_dependency,
-    db: db_dependency,
+    note: note_dependency,
+    db: async_db_dependency,
     content: str = Form(..., description="Yeni note içeriği"),
 ):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    db_user=db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    note = db.query(Note).join(NoteTerm).join(NoteLesson).filter(
-        Note.id == note_id,
-        NoteLesson.user_id == db_user.id
-    ).first()
-    
-    if not note:
-        raise HTTPException(status_code=404, detail="Note bulunamadı")
-    
-
     note.content = content
     
-    db.commit()
-    db.refresh(note)
+    await db.commit()
     
     return NoteResponse(
         id=note.id,
@@ -157,77 +210,36 @@ async def update_note(
 
 @router.delete("/{note_id}")
 async def delete_note(
-    note_id: int,
-    user: Annotated[dict, Depends(get_current_user)] = None,
-    db: db_dependency = None
+    note: note_dependency,
+    user_id: user_id_dependency,
+    db: async_db_dependency
 ):
-
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-
-    note = db.query(Note).join(NoteTerm).join(NoteLesson).filter(
-        Note.id == note_id,
-        NoteLesson.user_id == user.get("id")
-    ).first()
-    
-    if not note:
-        raise HTTPException(status_code=404, detail="Note bulunamadı")
-    
-    db.delete(note)
-    db.commit()
+    await db.delete(note)
+    await stats.adjust(db, user_id, notes=-1)
+    await db.commit()
     
     return {"message": "Note başarıyla silindi"}
 
 @router.get("/statistics")
+@read_only
 async def get_note_statistics(
-    user: Annotated[dict, Depends(get_current_user)] = None,
-    db: db_dependency = None
+    user_id: user_id_dependency,
+    db: async_db_dependency
 ):
     """Kullanıcının note istatistiklerini döndürür"""
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    # Kullanıcının lesson'larını al
-    user_lessons = db.query(NoteLesson).filter(
-        NoteLesson.user_id == user.get("id")
-    ).all()
-    
-    lesson_ids = [lesson.id for lesson in user_lessons]
-    
-    # Bu lesson'lara ait term'leri al
-    terms = db.query(NoteTerm).filter(NoteTerm.n_lesson_id.in_(lesson_ids)).all()
-    term_ids = [term.id for term in terms]
-    
-    # İstatistikleri hesapla
-    total_notes = db.query(Note).filter(Note.term_id.in_(term_ids)).count()
-    
-    return {
-        "total_notes": total_notes,
-        "total_lessons": len(user_lessons),
-        "total_terms": len(terms)
-    }
+    return await stats.get_note_statistics(db, user_id)
 
 @router.post("/ai_checking")
 async def design_note(
-    db: db_dependency,
-    user: user_dependency,
+    user_id: user_id_dependency,
     content: str = Form(..., description="Note içeriği")
 ):
     """AI ile note içeriğini düzenler ve iyileştirir"""
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authorized")
-    
-    user_obj = db.query(User).filter(User.id == user.get("id")).first()
-    if not user_obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     # Google AI API key'ini al
     google_api_key = os.getenv("GOOGLE_API_KEY")
-    if not google_api_key:
+    # Tanımlı değilse gateway diğer anahtarlara düşer
+    if not has_api_key():
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="AI API key bulunamadı")
 
     # AI prompt'u hazırla
@@ -249,44 +261,16 @@ async def design_note(
     """
 
     try:
-        # Google AI API'ye istek gönder
-        url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "text": prompt
-                        }
-                    ]
-                }
-            ]
-        }
-        
-        response = requests.post(
-            f"{url}?key={google_api_key}",
-            headers=headers,
-            json=data,
-            timeout=30
+        # Google AI API'ye istek gönder (aynı içerik için önbellekten döner)
+        ai_content = await cached_generate(
+            "note_check",
+            NOTE_PROMPT_VERSION,
+            [content],
+            lambda: generate(prompt, google_api_key),
         )
         
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="AI servisi ile iletişim kurulamadı"
-            )
-        
-        result = response.json()
-        
         # AI yanıtını al
-        if "candidates" in result and len(result["candidates"]) > 0:
-            ai_content = result["candidates"][0]["content"]["parts"][0]["text"]
-        else:
+        if not ai_content:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="AI'dan geçerli yanıt alınamadı"
@@ -298,11 +282,10 @@ async def design_note(
             "message": "Not başarıyla AI tarafından düzenlendi"
         }
         
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"AI servisi hatası: {str(e)}"
-        )
+    except HTTPException:
+        raise
+    except AIServiceError as e:
+        raise to_http_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -311,31 +294,15 @@ async def design_note(
 
 @router.post("/{note_id}/ai_edit")
 async def edit_note_with_ai(
-    note_id: int,
-    db: db_dependency,
-    user: user_dependency
+    note: note_dependency,
+    db: async_db_dependency
 ):
     """Mevcut bir notu AI ile düzenler"""
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authorized")
-    
-    user_obj = db.query(User).filter(User.id == user.get("id")).first()
-    if not user_obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    # Notu bul
-    note = db.query(Note).join(NoteTerm).join(NoteLesson).filter(
-        Note.id == note_id,
-        NoteLesson.user_id == user_obj.id
-    ).first()
-    
-    if not note:
-        raise HTTPException(status_code=404, detail="Note bulunamadı")
 
     # Google AI API key'ini al
     google_api_key = os.getenv("GOOGLE_API_KEY")
-    if not google_api_key:
+    # Tanımlı değilse gateway diğer anahtarlara düşer
+    if not has_api_key():
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="AI API key bulunamadı")
 
     # AI prompt'u hazırla
@@ -356,55 +323,29 @@ async def edit_note_with_ai(
     """
 
     try:
-        # Google AI API'ye istek gönder
-        url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "text": prompt
-                        }
-                    ]
-                }
-            ]
-        }
-        
-        response = requests.post(
-            f"{url}?key={google_api_key}",
-            headers=headers,
-            json=data,
-            timeout=30
+        # Google AI API'ye istek gönder (aynı içerik için önbellekten döner)
+        original_content = note.content
+        # Okuma işlemi bitirilir, bağlantı Gemini yanıtı beklenirken havuzda kalır;
+        # expire_on_commit=False olduğundan not nesnesi oturumda kullanılmaya devam eder
+        await db.commit()
+        ai_content = await cached_generate(
+            "note_edit",
+            NOTE_PROMPT_VERSION,
+            [original_content],
+            lambda: generate(prompt, google_api_key),
         )
         
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="AI servisi ile iletişim kurulamadı"
-            )
-        
-        result = response.json()
-        
         # AI yanıtını al
-        if "candidates" in result and len(result["candidates"]) > 0:
-            ai_content = result["candidates"][0]["content"]["parts"][0]["text"]
-        else:
+        if not ai_content:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="AI'dan geçerli yanıt alınamadı"
             )
         
         # Notu güncelle
-        original_content = note.content
         note.content = ai_content
         
-        db.commit()
-        db.refresh(note)
+        await db.commit()
         
         return {
             "id": note.id,
@@ -415,15 +356,25 @@ async def edit_note_with_ai(
             "message": "Not başarıyla AI tarafından düzenlendi ve kaydedildi"
         }
         
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"AI servisi hatası: {str(e)}"
-        )
+    except HTTPException:
+        raise
+    except AIServiceError as e:
+        raise to_http_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Beklenmeyen hata: {str(e)}"
         )
 
-    
+
+# /search ve /statistics'ten sonra tanımlı olmalı, yoksa onları da yakalar
+@router.get("/{note_id}", response_model=NoteResponse)
+@read_only
+async def get_note(note: note_dependency):
+    """Tek bir notu içeriğiyle döndürür; liste content olmadan çekildiğinde açılan not için"""
+    return NoteResponse(
+        id=note.id,
+        content=note.content,
+        term_id=note.term_id,
+        lesson_id=note.term.n_lesson_id
+    )
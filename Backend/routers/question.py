@@ -1,37 +1,25 @@
 import os
 import uuid
 import json
-from typing import Annotated, Optional, List
+import asyncio
+from collections import Counter
+from typing import Optional, List
 
-import requests
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks, Query
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import insert, select, func
 from starlette import status
-from models import Question, QuestionTerm, QuestionLesson, User, NoteLesson, NoteTerm
-from routers.auth import get_current_user,db_dependency
-import pytesseract
-from PIL import Image
-
-# Tesseract path'ini ayarla
-import os
-tesseract_paths = [
-    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-    r"C:\Users\USER\AppData\Local\Programs\Tesseract-OCR\tesseract.exe"
-]
-
-tesseract_found = False
-for path in tesseract_paths:
-    if os.path.exists(path):
-        pytesseract.pytesseract.tesseract_cmd = path
-        tesseract_found = True
-        print(f"Tesseract found at: {path}")
-        break
-
-if not tesseract_found:
-    print("Tesseract not found in common paths. Please install Tesseract OCR.")
-    print("Download from: https://github.com/UB-Mannheim/tesseract/wiki")
-
+from starlette.concurrency import run_in_threadpool
+from bulk import BulkResponse, BulkItemResult, ensure_bulk_size, failure, build_response
+from read_routing import read_only
+from dependencies import (
+    async_db_dependency, user_id_dependency, load_question_term, load_owned_question_terms,
+    question_term_dependency, question_dependency
+)
+from models import Question, QuestionTerm, QuestionLesson
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields, keyset_page
+import stats
+import ocr
 
 
 router = APIRouter(
@@ -39,8 +27,6 @@ router = APIRouter(
     tags=["Questions"]
 )
 
-user_dependency=Annotated[dict,Depends(get_current_user)]
-
 # Response modeli
 class QuestionResponse(BaseModel):
     id: int
@@ -50,6 +36,38 @@ class QuestionResponse(BaseModel):
     lesson_id:int
     term_id: int
 
+
+class QuestionPageResponse(BaseModel):
+    items: List[dict]
+    next_cursor: Optional[int] = None
+
+
+class QuestionBulkItem(BaseModel):
+    lesson_id: int
+    term_id: int
+    difficulty_category: int
+    note: Optional[str] = None
+
+
+QUESTION_BULK_ITEMS = TypeAdapter(List[QuestionBulkItem])
+
+class QuestionSearchResult(BaseModel):
+    id: int
+    image_path: str
+    note: Optional[str] = None
+    difficulty_category: int
+    term_id: int
+    term_title: Optional[str] = None
+    lesson_id: int
+    lesson_title: Optional[str] = None
+    similarity: float
+
+
+QUESTION_FIELDS = ("id", "image_path", "note", "difficulty_category", "term_id", "lesson_id")
+
+# OCR metni gürültülü olduğundan aramada kabul edilen varsayılan en düşük kelime benzerliği
+QUESTION_SEARCH_THRESHOLD = float(os.getenv("QUESTION_SEARCH_THRESHOLD", "0.4"))
+
 # Quiz response models
 class QuizQuestion(BaseModel):
     question: str
@@ -74,8 +92,9 @@ class TesseractResponse(BaseModel):
 # ===== QUESTION OLUŞTURMA =====
 @router.post("/create")
 async def create_question(
-    user: user_dependency,
-    db: db_dependency,
+    user_id: user_id_dependency,
+    db: async_db_dependency,
+    background_tasks: BackgroundTasks,
     image: UploadFile = File(..., description="Question fotoğrafı (zorunlu)"),
     difficulty_category: int = Form(..., description="Zorluk kategorisi: 1=Kolay, 2=Orta, 3=Zor"),
     note: Optional[str] = Form(None, description="Kullanıcının notu (opsiyonel)"),
@@ -84,32 +103,14 @@ async def create_question(
 ):
     
 
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-
     if difficulty_category not in [1, 2, 3]:
         raise HTTPException(
             status_code=400, 
             detail="Kategori 1 (Kolay), 2 (Orta) veya 3 (Zor) olmalıdır"
         )
     
-
-    lesson = db.query(QuestionLesson).filter(
-        QuestionLesson.id == lesson_id,
-        QuestionLesson.user_id == user.get("id")
-    ).first()
-
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson bulunamadı")
-
-    term = db.query(QuestionTerm).filter(
-        QuestionTerm.id == term_id,
-        QuestionTerm.q_lesson_id == lesson.id
-    ).first()
-
-    if term is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term not found")
+    # Lesson ve term sahiplik kontrolü
+    lesson, term = await load_question_term(db, user_id, lesson_id, term_id)
 
 
     image_path = await save_uploaded_image(image)
@@ -122,8 +123,12 @@ async def create_question(
     )
     
     db.add(question)
-    db.commit()
-    db.refresh(question)
+    await stats.adjust(db, user_id, **{"questions": 1, stats.difficulty_column(difficulty_category): 1})
+    await db.commit()
+    await db.refresh(question)
+
+    # OCR metnini istek yolunu bekletmeden arka planda çıkar ve kaydet
+    background_tasks.add_task(ocr.process_question, question.id)
     
     return QuestionResponse(
         id=question.id,
@@ -134,73 +139,148 @@ async def create_question(
         lesson_id=term.q_lesson_id,
     )
 
+@router.post("/bulk", response_model=BulkResponse)
+async def create_questions_bulk(
+    user_id: user_id_dependency,
+    db: async_db_dependency,
+    background_tasks: BackgroundTasks,
+    images: List[UploadFile] = File(..., description="Question fotoğrafları, items ile aynı sırada"),
+    items: str = Form(..., description='JSON liste: [{"lesson_id", "term_id", "difficulty_category", "note"}]'),
+):
+    """Birden fazla soruyu tek INSERT ile ekler, her öğe için ayrı sonuç döndürür"""
+    try:
+        parsed_items = QUESTION_BULK_ITEMS.validate_python(json.loads(items))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="items geçerli bir JSON listesi olmalıdır")
+
+    ensure_bulk_size(len(parsed_items))
+    if len(images) != len(parsed_items):
+        raise HTTPException(status_code=400, detail="Her öğe için bir fotoğraf gönderilmelidir")
+
+    # Sahiplik her farklı term için bir kez, tek sorguda kontrol edilir
+    owned_terms = await load_owned_question_terms(db, user_id, (item.term_id for item in parsed_items))
+
+    results = [None] * len(parsed_items)
+    valid_indexes = []
+    for index, item in enumerate(parsed_items):
+        if item.difficulty_category not in [1, 2, 3]:
+            results[index] = failure(index, "Kategori 1 (Kolay), 2 (Orta) veya 3 (Zor) olmalıdır")
+        elif owned_terms.get(item.term_id) != item.lesson_id:
+            results[index] = failure(index, "Term bulunamadı")
+        else:
+            valid_indexes.append(index)
+
+    # Fotoğraflar aynı anda yazılır, biri başarısız olursa sadece o öğe düşer
+    saved_paths = await asyncio.gather(
+        *(save_uploaded_image(images[index]) for index in valid_indexes),
+        return_exceptions=True,
+    )
+
+    rows = []
+    row_indexes = []
+    for index, image_path in zip(valid_indexes, saved_paths):
+        if isinstance(image_path, HTTPException):
+            results[index] = failure(index, image_path.detail)
+            continue
+        if isinstance(image_path, BaseException):
+            raise image_path
+        item = parsed_items[index]
+        rows.append({
+            "image_path": image_path,
+            "note": item.note,
+            "difficulty_category": item.difficulty_category,
+            "term_id": item.term_id,
+        })
+        row_indexes.append(index)
+
+    if rows:
+        difficulty_counts = Counter(row["difficulty_category"] for row in rows)
+        try:
+            question_ids = (await db.scalars(
+                insert(Question).returning(Question.id, sort_by_parameter_order=True), rows
+            )).all()
+            await stats.adjust(db, user_id, questions=len(rows), **{
+                stats.difficulty_column(difficulty): count for difficulty, count in difficulty_counts.items()
+            })
+            await db.commit()
+        except Exception:
+            # Kayıtlar yazılamadıysa diske yazılan fotoğraflar sahipsiz kalmasın
+            await asyncio.gather(*(run_in_threadpool(delete_image_file, row["image_path"]) for row in rows))
+            raise
+
+        for index, question_id in zip(row_indexes, question_ids):
+            results[index] = BulkItemResult(index=index, success=True, id=question_id)
+
+        background_tasks.add_task(ocr.process_questions, question_ids)
+
+    return build_response(results)
+
+@router.get("/search", response_model=List[QuestionSearchResult])
+@read_only
+async def search_questions(
+    user_id: user_id_dependency,
+    db: async_db_dependency,
+    q: str = Query(..., min_length=3, description="Soru metninde aranacak ifade"),
+    lesson_id: Optional[int] = Query(None, description="Sadece bu lesson içinde ara"),
+    difficulty: Optional[int] = Query(None, ge=1, le=3, description="1=Kolay, 2=Orta, 3=Zor"),
+    min_similarity: float = Query(QUESTION_SEARCH_THRESHOLD, gt=0, le=1, description="En düşük benzerlik (0-1)"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="En fazla sonuç sayısı"),
+):
+    """OCR metni üzerinde bulanık arama yapar, sonuçları benzerliğe göre sıralar"""
+    # %> operatörü eşiği bu ayardan okur; ayar sadece bu transaction için geçerli
+    await db.execute(
+        select(func.set_config("pg_trgm.word_similarity_threshold", str(min_similarity), True))
+    )
+
+    similarity = func.word_similarity(q, Question.ocr_text)
+    criteria = [QuestionLesson.user_id == user_id, Question.ocr_text.bool_op("%>")(q)]
+    if lesson_id is not None:
+        criteria.append(QuestionLesson.id == lesson_id)
+    if difficulty is not None:
+        criteria.append(Question.difficulty_category == difficulty)
+
+    rows = await db.execute(
+        select(
+            Question.id, Question.image_path, Question.note, Question.difficulty_category,
+            Question.term_id, QuestionTerm.term_title,
+            QuestionLesson.id.label("lesson_id"), QuestionLesson.lesson_title,
+            similarity.label("similarity"),
+        ).join(Question.term).join(QuestionTerm.q_lesson).where(*criteria).order_by(
+            similarity.desc(), Question.id
+        ).limit(limit)
+    )
+    return [QuestionSearchResult(**row) for row in rows.mappings()]
+
 @router.get("/{lesson_id}/{difficulty_id}/{term_id}")
+@read_only
 async def get_questions_by_term(
-    term_id: int,
-    lesson_id: int,
     difficulty_id: int,
-    user: Annotated[dict, Depends(get_current_user)] = None,
-    db: db_dependency = None
+    owned: question_term_dependency,
+    db: async_db_dependency,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Sayfa boyutu"),
+    after: Optional[int] = Query(None, description="Önceki sayfanın next_cursor değeri"),
+    fields: Optional[str] = Query(None, description="Döndürülecek alanlar, örn. id,image_path"),
 ):
+    """Term'e ait belirli zorluktaki soruları id sırasıyla sayfa sayfa getirir"""
+    lesson, term = owned
+    selected = parse_fields(fields, QUESTION_FIELDS)
 
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    
-    user_obj = db.query(User).filter(User.id == user.get("id")).first()
-    if user_obj is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    lesson = db.query(QuestionLesson).filter(QuestionLesson.id == lesson_id,QuestionLesson.user_id==user_obj.id).first()
-    if not lesson:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
-
-    term = db.query(QuestionTerm).filter(
-        QuestionTerm.id == term_id,
-        QuestionTerm.q_lesson_id == lesson.id
-    ).first()
-    
-    if not term:
-        raise HTTPException(status_code=404, detail="Term bulunamadı")
-
-    questions = db.query(Question).filter(
-        Question.term_id == term_id,
-        Question.difficulty_category == difficulty_id
-    ).order_by(Question.id).all()
-
-    return [
-        QuestionResponse(
-            id=q.id,
-            image_path=q.image_path,
-            note=q.note,
-            difficulty_category=q.difficulty_category,
-            term_id=q.term_id,
-            lesson_id=lesson.id
-        ) for q in questions
-    ]
+    return QuestionPageResponse(**(await keyset_page(
+        db, Question, selected,
+        [Question.term_id == term.id, Question.difficulty_category == difficulty_id],
+        after, limit,
+        constants={"lesson_id": lesson.id},
+    )))
 
 @router.put("/{question_id}/{difficulty_category}")
 async def update_question(
-user: user_dependency,
-    db: db_dependency,
-    question_id: int,
+    user_id: user_id_dependency,
+    db: async_db_dependency,
+    question: question_dependency,
     difficulty_category: int,
     note: Optional[str] = Form(None, description="Yeni not"),
 ):
 
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    # Question'ı bul ve kullanıcının sahip olduğu term'e ait olduğunu kontrol et
-    question = db.query(Question).join(QuestionTerm).join(QuestionLesson).filter(
-        Question.id == question_id,
-        QuestionLesson.user_id == user.get("id")
-    ).first()
-    
-    if not question:
-        raise HTTPException(status_code=404, detail="Question bulunamadı")
-    
     # Kategori kontrolü
     if difficulty_category is not None and difficulty_category not in [1, 2, 3]:
         raise HTTPException(
@@ -211,11 +291,14 @@ user: user_dependency,
     # Güncelle
     if note is not None:
         question.note = note
-    if difficulty_category is not None:
+    if difficulty_category is not None and difficulty_category != question.difficulty_category:
+        await stats.adjust(db, user_id, **{
+            stats.difficulty_column(question.difficulty_category): -1,
+            stats.difficulty_column(difficulty_category): 1,
+        })
         question.difficulty_category = difficulty_category
     
-    db.commit()
-    db.refresh(question)
+    await db.commit()
     
     return QuestionResponse(
         id=question.id,
@@ -229,78 +312,28 @@ user: user_dependency,
 
 @router.delete("/{question_id}")
 async def delete_question(
-    question_id: int,
-    user: Annotated[dict, Depends(get_current_user)] = None,
-    db: db_dependency = None
+    question: question_dependency,
+    user_id: user_id_dependency,
+    db: async_db_dependency
 ):
 
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
+    await db.delete(question)
+    await stats.adjust(db, user_id, **{"questions": -1, stats.difficulty_column(question.difficulty_category): -1})
+    await db.commit()
 
-    question = db.query(Question).join(QuestionTerm).join(QuestionLesson).filter(
-        Question.id == question_id,
-        QuestionLesson.user_id == user.get("id")
-    ).first()
-    
-    if not question:
-        raise HTTPException(status_code=404, detail="Question bulunamadı")
-    
-    # Fotoğrafı sil
-    delete_image_file(question.image_path)
-    
-    db.delete(question)
-    db.commit()
+    # Fotoğraf kayıt silindikten sonra, event loop'u bekletmeden silinir
+    await run_in_threadpool(delete_image_file, question.image_path)
     
     return {"message": "Question başarıyla silindi"}
 
 @router.get("/statistics")
+@read_only
 async def get_question_statistics(
-    user: user_dependency,
-    db: db_dependency
+    user_id: user_id_dependency,
+    db: async_db_dependency
 ):
     """Kullanıcının question istatistiklerini döndürür"""
-    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    # Kullanıcının lesson'larını al
-    user_lessons = db.query(QuestionLesson).filter(
-        QuestionLesson.user_id == user.get("id")
-    ).all()
-    
-    lesson_ids = [lesson.id for lesson in user_lessons]
-    
-    # Bu lesson'lara ait term'leri al
-    terms = db.query(QuestionTerm).filter(QuestionTerm.q_lesson_id.in_(lesson_ids)).all()
-    term_ids = [term.id for term in terms]
-    
-    # İstatistikleri hesapla
-    total_questions = db.query(Question).filter(Question.term_id.in_(term_ids)).count()
-    easy_questions = db.query(Question).filter(
-        Question.term_id.in_(term_ids),
-        Question.difficulty_category == 1
-    ).count()
-    medium_questions = db.query(Question).filter(
-        Question.term_id.in_(term_ids),
-        Question.difficulty_category == 2
-    ).count()
-    hard_questions = db.query(Question).filter(
-        Question.term_id.in_(term_ids),
-        Question.difficulty_category == 3
-    ).count()
-    
-    return {
-        "total_questions": total_questions,
-        "by_difficulty": {
-            "easy": easy_questions,
-            "medium": medium_questions,
-            "hard": hard_questions
-        },
-        "total_lessons": len(user_lessons),
-        "total_terms": len(terms)
-    }
+    return await stats.get_question_statistics(db, user_id)
 
 async def save_uploaded_image(image: UploadFile) -> str:
 
@@ -318,13 +351,17 @@ async def save_uploaded_image(image: UploadFile) -> str:
     
 
     try:
-        with open(file_path, "wb") as buffer:
-            content = await image.read()
-            buffer.write(content)
+        content = await image.read()
+        # Disk yazımı event loop'u bekletmesin, toplu yüklemede dosyalar paralel yazılır
+        await run_in_threadpool(write_image_file, file_path, content)
         return f"/uploads/{unique_filename}"
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Dosya yüklenemedi: {str(e)}")
 
+def write_image_file(file_path: str, content: bytes):
+    with open(file_path, "wb") as buffer:
+        buffer.write(content)
+
 def delete_image_file(image_path: str):
 
     try:
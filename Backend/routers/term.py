@@ -1,299 +1,237 @@
 import os
-import requests
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import exists, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 from pydantic import BaseModel
 from starlette import status
-from models import User, QuestionTerm, NoteTerm, QuestionLesson, NoteLesson
-from routers.auth import get_current_user, db_dependency
+from ai_client import AIServiceError
+from ai_gateway import generate, to_http_exception, has_api_key
+from read_routing import read_only
+from dependencies import (
+    async_db_dependency, user_id_dependency, question_lesson_dependency, note_lesson_dependency,
+    question_term_by_id_dependency, note_term_by_id_dependency, not_found
+)
+from models import QuestionTerm, NoteTerm, QuestionLesson, NoteLesson
+import stats
 
 router = APIRouter(
     prefix="/term",
     tags=["Term"]
 )
 
-user_dependency = Annotated[dict, Depends(get_current_user)]
-
 # ===== QUESTION TERM ENDPOINT'LERİ =====
 
 @router.get("/QuestionTerms/{lesson_id}")
-def get_question_terms(lesson_id: int, user: user_dependency, db: db_dependency):
+@read_only
+async def get_question_terms(lesson: question_lesson_dependency, db: async_db_dependency):
     """Belirli bir lesson'a ait question term'lerini getirir"""
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
-
-    # Lesson'ın kullanıcıya ait olduğunu kontrol et
-    lesson = db.query(QuestionLesson).filter(
-        QuestionLesson.id == lesson_id,
-        QuestionLesson.user_id == db_user.id
-    ).first()
-    
-    if not lesson:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson bulunamadı")
+    terms = (await db.execute(
+        select(QuestionTerm.id, QuestionTerm.term_title).where(
+            QuestionTerm.q_lesson_id == lesson.id
+        ).order_by(QuestionTerm.id)
+    )).all()
 
-    return [{"id": term.id, "title": term.term_title} for term in lesson.q_terms]
+    return [{"id": term.id, "title": term.term_title} for term in terms]
 
 @router.get("/NoteTerms/{lesson_id}")
-def get_note_terms(lesson_id: int, user: user_dependency, db: db_dependency):
+@read_only
+async def get_note_terms(lesson: note_lesson_dependency, db: async_db_dependency):
     """Belirli bir lesson'a ait note term'lerini getirir"""
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
-
-    # Lesson'ın kullanıcıya ait olduğunu kontrol et
-    lesson = db.query(NoteLesson).filter(
-        NoteLesson.id == lesson_id,
-        NoteLesson.user_id == db_user.id
-    ).first()
-    
-    if not lesson:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson bulunamadı")
+    terms = (await db.execute(
+        select(NoteTerm.id, NoteTerm.term_title).where(
+            NoteTerm.n_lesson_id == lesson.id
+        ).order_by(NoteTerm.id)
+    )).all()
 
-    return [{"id": term.id, "title": term.term_title} for term in lesson.n_terms]
+    return [{"id": term.id, "title": term.term_title} for term in terms]
 
 # ===== REQUEST MODELLERİ =====
 
 class TermRequest(BaseModel):
     term_title: str
 
+class TermPatchRequest(BaseModel):
+    term_title: Optional[str] = None
+    lesson_id: Optional[int] = None
+
 class TermResponse(BaseModel):
     id: int
     term_title: str
     lesson_id: int
 
 
+async def patch_term(db, user_id: int, term_model, lesson_model, lesson_key: str, term_id: int,
+                     changes: TermPatchRequest) -> TermResponse:
+    """Term'i tek UPDATE ile günceller, lesson_id verilirse kullanıcının başka dersine taşır.
+
+    Term'in ve hedef dersin sahipliği UPDATE'in WHERE koşulunda kontrol edilir,
+    not ve sorular yerinde kalır.
+    """
+    lesson_column = getattr(term_model, lesson_key)
+    criteria = [term_model.id == term_id, lesson_column == lesson_model.id, lesson_model.user_id == user_id]
+    values = {}
+    if changes.term_title is not None:
+        values["term_title"] = changes.term_title
+    if changes.lesson_id is not None:
+        target = aliased(lesson_model)
+        criteria.append(exists().where(target.id == changes.lesson_id, target.user_id == user_id))
+        values[lesson_key] = changes.lesson_id
+
+    columns = (term_model.id, term_model.term_title, lesson_column.label("lesson_id"))
+    if values:
+        statement = update(term_model).where(*criteria).values(**values).returning(
+            *columns
+        ).execution_options(synchronize_session=False)
+    else:
+        statement = select(*columns).where(*criteria)
+    try:
+        row = (await db.execute(statement)).first()
+    except IntegrityError:
+        # Hedef derste aynı başlıklı term var (lesson + başlık unique index'i)
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{term_model.__name__} is already exist")
 
-@router.post("/QuestionTerm/create/{lesson_id}")
-def create_question_term(
-    lesson_id: int, 
-    term: TermRequest,
-    user: user_dependency, 
-    db: db_dependency
-):
-
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
+    if row is None:
+        if changes.lesson_id is not None:
+            target_owned = await db.scalar(select(lesson_model.id).where(
+                lesson_model.id == changes.lesson_id, lesson_model.user_id == user_id
+            ))
+            if target_owned is None:
+                raise not_found("Lesson")
+        raise not_found("Term")
 
+    if values:
+        await db.commit()
+    return TermResponse(id=row.id, term_title=row.term_title, lesson_id=row.lesson_id)
 
-    lesson = db.query(QuestionLesson).filter(
-        QuestionLesson.id == lesson_id,
-        QuestionLesson.user_id == db_user.id
-    ).first()
-    
-    if not lesson:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson bulunamadı")
 
-    db_term = db.query(QuestionTerm).filter(term.term_title == QuestionTerm.term_title).first()
-    if db_term:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="QuestionTerm is already exist")
 
-    question_term = QuestionTerm(
-        term_title=term.term_title,
-        q_lesson_id=lesson.id
+@router.post("/QuestionTerm/create/{lesson_id}")
+async def create_question_term(
+    term: TermRequest,
+    lesson: question_lesson_dependency,
+    user_id: user_id_dependency,
+    db: async_db_dependency
+):
+    # Aynı derste aynı başlık varsa unique index sayesinde satır eklenmez ve id dönmez
+    term_id = await db.scalar(
+        insert(QuestionTerm).values(term_title=term.term_title, q_lesson_id=lesson.id).on_conflict_do_nothing(
+            index_elements=[QuestionTerm.q_lesson_id, QuestionTerm.term_title]
+        ).returning(QuestionTerm.id)
     )
+    if term_id is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="QuestionTerm is already exist")
 
-    db.add(question_term)
-    db.commit()
-    db.refresh(question_term)
+    await stats.adjust(db, user_id, question_terms=1)
+    await db.commit()
     
     return TermResponse(
-        id=question_term.id,
-        term_title=question_term.term_title,
+        id=term_id,
+        term_title=term.term_title,
         lesson_id=lesson.id
     )
 
 
 @router.post("/NoteTerm/create/{lesson_id}")
-def create_note_term(
-        lesson_id: int,
+async def create_note_term(
         term: TermRequest,
-        user: user_dependency,
-        db: db_dependency
+        lesson: note_lesson_dependency,
+        user_id: user_id_dependency,
+        db: async_db_dependency
 ):
     """Note term oluşturur"""
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
-
-    # Lesson'ın kullanıcıya ait olduğunu kontrol et
-    lesson = db.query(NoteLesson).filter(
-        NoteLesson.id == lesson_id,
-        NoteLesson.user_id == db_user.id
-    ).first()
-
-    if not lesson:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson bulunamadı")
-
-    note_term = NoteTerm(
-        term_title=term.term_title,
-        n_lesson_id=lesson.id
+    term_id = await db.scalar(
+        insert(NoteTerm).values(term_title=term.term_title, n_lesson_id=lesson.id).on_conflict_do_nothing(
+            index_elements=[NoteTerm.n_lesson_id, NoteTerm.term_title]
+        ).returning(NoteTerm.id)
     )
-    db.add(note_term)
-    db.commit()
-    db.refresh(note_term)
+    if term_id is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="NoteTerm is already exist")
+
+    await stats.adjust(db, user_id, note_terms=1)
+    await db.commit()
 
     return TermResponse(
-        id=note_term.id,
-        term_title=note_term.term_title,
+        id=term_id,
+        term_title=term.term_title,
         lesson_id=lesson.id
     )
 # ===== QUESTION TERM GÜNCELLEME =====
 
 @router.put("/QuestionTerm/update/{term_id}")
-def update_question_term(
+async def update_question_term(
     term_id: int,
     term: TermRequest,
-    user: user_dependency,
-    db: db_dependency
+    user_id: user_id_dependency,
+    db: async_db_dependency
 ):
     """Question term günceller"""
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
-
-    # Term'i bul ve kullanıcının sahip olduğu lesson'a ait olduğunu kontrol et
-    db_term = db.query(QuestionTerm).join(QuestionLesson).filter(
-        QuestionTerm.id == term_id,
-        QuestionLesson.user_id == db_user.id
-    ).first()
-    
-    if db_term is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term bulunamadı")
+    return await patch_term(db, user_id, QuestionTerm, QuestionLesson, "q_lesson_id", term_id,
+                            TermPatchRequest(term_title=term.term_title))
 
-    # Güncelle
-    db_term.term_title = term.term_title
-    db.commit()
-    db.refresh(db_term)
-    
-    return TermResponse(
-        id=db_term.id,
-        term_title=db_term.term_title,
-        lesson_id=db_term.q_lesson_id
-    )
+
+@router.patch("/QuestionTerm/{term_id}")
+async def patch_question_term(
+    term_id: int,
+    changes: TermPatchRequest,
+    user_id: user_id_dependency,
+    db: async_db_dependency
+):
+    """Question term'in sadece gönderilen alanlarını günceller"""
+    return await patch_term(db, user_id, QuestionTerm, QuestionLesson, "q_lesson_id", term_id, changes)
 
 # ===== NOTE TERM GÜNCELLEME =====
 
 @router.put("/NoteTerm/update/{term_id}")
-def update_note_term(
+async def update_note_term(
     term_id: int,
     term: TermRequest,
-    user: user_dependency,
-    db: db_dependency
+    user_id: user_id_dependency,
+    db: async_db_dependency
 ):
     """Note term günceller"""
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
-
-    # Term'i bul ve kullanıcının sahip olduğu lesson'a ait olduğunu kontrol et
-    db_term = db.query(NoteTerm).join(NoteLesson).filter(
-        NoteTerm.id == term_id,
-        NoteLesson.user_id == db_user.id
-    ).first()
-    
-    if db_term is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term bulunamadı")
+    return await patch_term(db, user_id, NoteTerm, NoteLesson, "n_lesson_id", term_id,
+                            TermPatchRequest(term_title=term.term_title))
 
-    # Güncelle
-    db_term.term_title = term.term_title
-    db.commit()
-    db.refresh(db_term)
-    
-    return TermResponse(
-        id=db_term.id,
-        term_title=db_term.term_title,
-        lesson_id=db_term.n_lesson_id
-    )
+
+@router.patch("/NoteTerm/{term_id}")
+async def patch_note_term(
+    term_id: int,
+    changes: TermPatchRequest,
+    user_id: user_id_dependency,
+    db: async_db_dependency
+):
+    """Note term'in sadece gönderilen alanlarını günceller"""
+    return await patch_term(db, user_id, NoteTerm, NoteLesson, "n_lesson_id", term_id, changes)
 
 
 @router.delete("/QuestionTerm/delete/{term_id}")
-def delete_question_term(term_id: int, user: user_dependency, db: db_dependency):
+async def delete_question_term(term: question_term_by_id_dependency, user_id: user_id_dependency, db: async_db_dependency):
     """Question term siler"""
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
-
-
-    term = db.query(QuestionTerm).join(QuestionLesson).filter(
-        QuestionTerm.id == term_id,
-        QuestionLesson.user_id == db_user.id
-    ).first()
-    
-    if term is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term bulunamadı")
-    
-    db.delete(term)
-    db.commit()
+    # Cascade ile silinecek soruları sayaçlardan düş
+    await stats.adjust(db, user_id, **(await stats.question_removal_deltas(db, QuestionTerm.id == term.id)))
+    await db.delete(term)
+    await db.commit()
     return {"message": "Question term başarıyla silindi"}
 
 
 
 @router.delete("/NoteTerm/delete/{term_id}")
-def delete_note_term(term_id: int, user: user_dependency, db: db_dependency):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
-
-    # Term'i bul ve kullanıcının sahip olduğu lesson'a ait olduğunu kontrol et
-    term = db.query(NoteTerm).join(NoteLesson).filter(
-        NoteTerm.id == term_id,
-        NoteLesson.user_id == db_user.id
-    ).first()
-    
-    if term is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term bulunamadı")
-    
-    db.delete(term)
-    db.commit()
+async def delete_note_term(term: note_term_by_id_dependency, user_id: user_id_dependency, db: async_db_dependency):
+    # Cascade ile silinecek notları sayaçlardan düş
+    await stats.adjust(db, user_id, **(await stats.note_removal_deltas(db, NoteTerm.id == term.id)))
+    await db.delete(term)
+    await db.commit()
     return {"message": "Note term ve tüm notları başarıyla silindi"}
 
 
 
 @router.get("/QuestionTerm/{term_id}")
-def get_question_term_by_id(term_id: int, user: user_dependency, db: db_dependency):
-
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
-
-    # Term'i bul ve kullanıcının sahip olduğu lesson'a ait olduğunu kontrol et
-    term = db.query(QuestionTerm).join(QuestionLesson).filter(
-        QuestionTerm.id == term_id,
-        QuestionLesson.user_id == db_user.id
-    ).first()
-    
-    if term is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term bulunamadı")
-    
+@read_only
+async def get_question_term_by_id(term: question_term_by_id_dependency):
     return TermResponse(
         id=term.id,
         term_title=term.term_title,
@@ -301,24 +239,9 @@ def get_question_term_by_id(term_id: int, user: user_dependency, db: db_dependen
     )
 
 @router.get("/NoteTerm/{term_id}")
-def get_note_term_by_id(term_id: int, user: user_dependency, db: db_dependency):
+@read_only
+async def get_note_term_by_id(term: note_term_by_id_dependency):
     """Belirli bir note term'i getirir"""
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
-    
-    db_user = db.query(User).filter(User.id == user.get("id")).first()
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kullanıcı bulunamadı")
-
-    # Term'i bul ve kullanıcının sahip olduğu lesson'a ait olduğunu kontrol et
-    term = db.query(NoteTerm).join(NoteLesson).filter(
-        NoteTerm.id == term_id,
-        NoteLesson.user_id == db_user.id
-    ).first()
-    
-    if term is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Term bulunamadı")
-    
     return TermResponse(
         id=term.id,
         term_title=term.term_title,
@@ -326,9 +249,10 @@ def get_note_term_by_id(term_id: int, user: user_dependency, db: db_dependency):
     )
 
 
-def createQuestions(terms_and_contents, difficult, time):
+async def createQuestions(terms_and_contents, difficult, time):
     google_api_key = os.getenv("GOOGLE_API_KEY")
-    if not google_api_key:
+    # Tanımlı değilse gateway diğer anahtarlara düşer
+    if not has_api_key():
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="AI API key bulunamadı")
 
     # AI prompt'u hazırla
@@ -338,42 +262,10 @@ def createQuestions(terms_and_contents, difficult, time):
 
     try:
         # Google AI API'ye istek gönder
-        url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-
-        headers = {
-            "Content-Type": "application/json"
-        }
-
-        data = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "text": prompt
-                        }
-                    ]
-                }
-            ]
-        }
-
-        response = requests.post(
-            f"{url}?key={google_api_key}",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="AI servisi ile iletişim kurulamadı"
-            )
-
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"AI servisi hatası: {str(e)}"
-        )
+        return await generate(prompt, google_api_key)
+
+    except AIServiceError as e:
+        raise to_http_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
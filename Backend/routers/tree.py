@@ -0,0 +1,105 @@
+from collections import defaultdict
+
+from fastapi import APIRouter, Query
+from sqlalchemy import select, func
+
+from read_routing import read_only
+from dependencies import async_db_dependency, user_id_dependency
+from models import NoteLesson, NoteTerm, Note, QuestionLesson, QuestionTerm, Question
+from stats import DIFFICULTY_NAMES
+
+router = APIRouter(
+    prefix="/tree",
+    tags=["Tree"]
+)
+
+# depth: 1 = sadece dersler, 2 = dersler ve term'ler, 3 = term başına içerik sayıları
+MAX_TREE_DEPTH = 3
+
+
+async def note_tree(db, user_id: int, depth: int) -> list:
+    lessons = (await db.execute(
+        select(NoteLesson.id, NoteLesson.lesson_title).where(
+            NoteLesson.user_id == user_id
+        ).order_by(NoteLesson.id)
+    )).all()
+    if depth < 2:
+        return [{"id": lesson.id, "title": lesson.lesson_title} for lesson in lessons]
+
+    columns = [NoteTerm.id, NoteTerm.term_title, NoteTerm.n_lesson_id]
+    statement = select(*columns).join(NoteTerm.n_lesson)
+    if depth >= 3:
+        # Sayılar term'lerle aynı sorguda, not içerikleri okunmadan hesaplanır
+        statement = select(*columns, func.count(Note.id).label("note_count")).join(
+            NoteTerm.n_lesson
+        ).outerjoin(NoteTerm.notes).group_by(*columns)
+    terms = (await db.execute(
+        statement.where(NoteLesson.user_id == user_id).order_by(NoteTerm.id)
+    )).all()
+
+    terms_by_lesson = defaultdict(list)
+    for term in terms:
+        item = {"id": term.id, "title": term.term_title}
+        if depth >= 3:
+            item["note_count"] = term.note_count
+        terms_by_lesson[term.n_lesson_id].append(item)
+
+    return [
+        {"id": lesson.id, "title": lesson.lesson_title, "terms": terms_by_lesson[lesson.id]}
+        for lesson in lessons
+    ]
+
+
+async def question_tree(db, user_id: int, depth: int) -> list:
+    lessons = (await db.execute(
+        select(QuestionLesson.id, QuestionLesson.lesson_title).where(
+            QuestionLesson.user_id == user_id
+        ).order_by(QuestionLesson.id)
+    )).all()
+    if depth < 2:
+        return [{"id": lesson.id, "title": lesson.lesson_title} for lesson in lessons]
+
+    columns = [QuestionTerm.id, QuestionTerm.term_title, QuestionTerm.q_lesson_id]
+    statement = select(*columns).join(QuestionTerm.q_lesson)
+    if depth >= 3:
+        counts = [
+            func.count(Question.id).filter(Question.difficulty_category == difficulty).label(name)
+            for difficulty, name in DIFFICULTY_NAMES.items()
+        ]
+        statement = select(*columns, func.count(Question.id).label("question_count"), *counts).join(
+            QuestionTerm.q_lesson
+        ).outerjoin(QuestionTerm.questions).group_by(*columns)
+    terms = (await db.execute(
+        statement.where(QuestionLesson.user_id == user_id).order_by(QuestionTerm.id)
+    )).all()
+
+    terms_by_lesson = defaultdict(list)
+    for term in terms:
+        item = {"id": term.id, "title": term.term_title}
+        if depth >= 3:
+            item["question_count"] = term.question_count
+            item["by_difficulty"] = {name: getattr(term, name) for name in DIFFICULTY_NAMES.values()}
+        terms_by_lesson[term.q_lesson_id].append(item)
+
+    return [
+        {"id": lesson.id, "title": lesson.lesson_title, "terms": terms_by_lesson[lesson.id]}
+        for lesson in lessons
+    ]
+
+
+@router.get("")
+@read_only
+async def get_tree(
+    user_id: user_id_dependency,
+    db: async_db_dependency,
+    depth: int = Query(MAX_TREE_DEPTH, ge=1, le=MAX_TREE_DEPTH, description="1=ders, 2=+term, 3=+sayılar"),
+):
+    """Not ve soru defterlerinin ders/term ağacını tek istekte döndürür.
+
+    Derinlikten bağımsız olarak en fazla dört sorgu çalışır: her defter için
+    dersler ve (depth >= 2 ise) sayılarıyla birlikte term'ler.
+    """
+    return {
+        "notes": await note_tree(db, user_id, depth),
+        "questions": await question_tree(db, user_id, depth),
+    }
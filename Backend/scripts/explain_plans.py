@@ -0,0 +1,173 @@
+"""Sık çalışan sorguların planlarını indeks migration'ından önce ve sonra karşılaştırır.
+
+Örnek:
+
+    python -m scripts.explain_plans --user 1 --note-term 1 --question-term 1 --save before.json
+    alembic upgrade head
+    python -m scripts.explain_plans --user 1 --note-term 1 --question-term 1 --compare before.json
+
+--analyze verilirse sorgular gerçekten çalıştırılır ve süreler de raporlanır.
+"""
+import argparse
+import json
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+
+from database import engine  # noqa: E402
+
+QUERIES = {
+    "note_lessons_by_user": (
+        "SELECT id, lesson_title FROM note_lessons WHERE user_id = :user_id",
+        ("user_id",),
+    ),
+    "question_lessons_by_user": (
+        "SELECT id, lesson_title FROM question_lessons WHERE user_id = :user_id",
+        ("user_id",),
+    ),
+    "note_lesson_title_check": (
+        "SELECT id FROM note_lessons WHERE user_id = :user_id AND lesson_title = :title LIMIT 1",
+        ("user_id", "title"),
+    ),
+    "note_terms_by_lesson": (
+        "SELECT id, term_title FROM note_terms WHERE n_lesson_id = :lesson_id",
+        ("lesson_id",),
+    ),
+    "question_terms_by_lesson": (
+        "SELECT id, term_title FROM question_terms WHERE q_lesson_id = :lesson_id",
+        ("lesson_id",),
+    ),
+    "notes_by_term": (
+        "SELECT id, content FROM notes WHERE term_id = :note_term_id ORDER BY id",
+        ("note_term_id",),
+    ),
+    "questions_by_term_difficulty": (
+        "SELECT id, image_path FROM questions WHERE term_id = :question_term_id "
+        "AND difficulty_category = :difficulty ORDER BY id",
+        ("question_term_id", "difficulty"),
+    ),
+    "note_statistics": (
+        "SELECT count(n.id) FROM note_lessons l JOIN note_terms t ON t.n_lesson_id = l.id "
+        "JOIN notes n ON n.term_id = t.id WHERE l.user_id = :user_id",
+        ("user_id",),
+    ),
+    "note_search": (
+        "SELECT n.id, ts_rank(n.content_tsv, websearch_to_tsquery('turkish', :search)) AS rank "
+        "FROM note_lessons l JOIN note_terms t ON t.n_lesson_id = l.id JOIN notes n ON n.term_id = t.id "
+        "WHERE l.user_id = :user_id AND n.content_tsv @@ websearch_to_tsquery('turkish', :search) "
+        "ORDER BY rank DESC, n.id LIMIT 20",
+        ("user_id", "search"),
+    ),
+    "question_search": (
+        "SELECT q.id, word_similarity(:search, q.ocr_text) AS similarity "
+        "FROM question_lessons l JOIN question_terms t ON t.q_lesson_id = l.id JOIN questions q ON q.term_id = t.id "
+        "WHERE l.user_id = :user_id AND q.ocr_text %> :search "
+        "ORDER BY similarity DESC, q.id LIMIT 20",
+        ("user_id", "search"),
+    ),
+    "question_statistics": (
+        "SELECT q.difficulty_category, count(q.id) FROM question_lessons l "
+        "JOIN question_terms t ON t.q_lesson_id = l.id JOIN questions q ON q.term_id = t.id "
+        "WHERE l.user_id = :user_id GROUP BY q.difficulty_category",
+        ("user_id",),
+    ),
+}
+
+
+def walk(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def summarize(plan: dict) -> dict:
+    root = plan["Plan"]
+    nodes = list(walk(root))
+    return {
+        "total_cost": root["Total Cost"],
+        "execution_ms": plan.get("Execution Time"),
+        "seq_scans": sorted({n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"}),
+        "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+    }
+
+
+def explain(conn, sql: str, params: dict, analyze: bool) -> dict:
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    if analyze:
+        # ANALYZE sorguyu çalıştırır, yan etki kalmaması için transaction geri alınır
+        with conn.begin() as transaction:
+            plan = conn.execute(text(f"EXPLAIN ({options}) {sql}"), params).scalar()
+            transaction.rollback()
+    else:
+        plan = conn.execute(text(f"EXPLAIN ({options}) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return summarize(plan[0])
+
+
+def run(args) -> dict:
+    values = {
+        "user_id": args.user,
+        "lesson_id": args.lesson,
+        "title": args.title,
+        "note_term_id": args.note_term,
+        "question_term_id": args.question_term,
+        "difficulty": args.difficulty,
+        "search": args.search,
+    }
+    results = {}
+    with engine.connect() as conn:
+        for name, (sql, param_names) in QUERIES.items():
+            params = {p: values[p] for p in param_names}
+            if any(v is None for v in params.values()):
+                continue
+            results[name] = explain(conn, sql, params, args.analyze)
+    return results
+
+
+def format_result(result: dict) -> str:
+    parts = [f"cost={result['total_cost']:.2f}"]
+    if result["execution_ms"] is not None:
+        parts.append(f"time={result['execution_ms']:.2f}ms")
+    if result["seq_scans"]:
+        parts.append(f"seq_scan={','.join(result['seq_scans'])}")
+    if result["indexes"]:
+        parts.append(f"index={','.join(result['indexes'])}")
+    return " ".join(parts)
+
+
+def report(results: dict, baseline: dict = None):
+    for name, result in results.items():
+        print(f"{name}")
+        if baseline and name in baseline:
+            print(f"    önce : {format_result(baseline[name])}")
+            print(f"    sonra: {format_result(result)}")
+        else:
+            print(f"    {format_result(result)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sorgu planı karşılaştırması")
+    parser.add_argument("--user", type=int, default=1)
+    parser.add_argument("--lesson", type=int, default=1)
+    parser.add_argument("--title", default="Matematik")
+    parser.add_argument("--note-term", type=int)
+    parser.add_argument("--question-term", type=int)
+    parser.add_argument("--difficulty", type=int, default=1)
+    parser.add_argument("--search", help="Arama sorgularının planı için örnek metin")
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE ile gerçek süreleri ölç")
+    parser.add_argument("--save", help="Sonuçları bu JSON dosyasına yaz")
+    parser.add_argument("--compare", help="Önceki --save çıktısıyla karşılaştır")
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
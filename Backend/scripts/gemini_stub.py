@@ -0,0 +1,117 @@
+"""Gemini generateContent / streamGenerateContent taklidi yapan yerel sunucu.
+
+Kota harcamadan yük testi yapmak için:
+
+    uvicorn scripts.gemini_stub:app --port 8001
+    GEMINI_BASE_URL=http://localhost:8001 uvicorn main:app
+
+Davranış ortam değişkenleriyle ayarlanır:
+    STUB_LATENCY_MS          ortalama yanıt gecikmesi (varsayılan 800)
+    STUB_LATENCY_JITTER_MS   gecikmeye eklenen rastgele sapma (varsayılan 200)
+    STUB_ERROR_RATE          500 dönen isteklerin oranı, 0-1 (varsayılan 0)
+    STUB_RATE_LIMIT_RATE     429 dönen isteklerin oranı, 0-1 (varsayılan 0)
+    STUB_REPLY_MODE          json | fenced | text (varsayılan fenced)
+    STUB_STREAM_CHUNK_MS     stream parçaları arasındaki bekleme (varsayılan 50)
+    STUB_STREAM_CHUNK_CHARS  stream parça boyutu (varsayılan 80)
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import uuid
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "800"))
+LATENCY_JITTER_MS = float(os.getenv("STUB_LATENCY_JITTER_MS", "200"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+RATE_LIMIT_RATE = float(os.getenv("STUB_RATE_LIMIT_RATE", "0"))
+REPLY_MODE = os.getenv("STUB_REPLY_MODE", "fenced")
+STREAM_CHUNK_MS = float(os.getenv("STUB_STREAM_CHUNK_MS", "50"))
+STREAM_CHUNK_CHARS = int(os.getenv("STUB_STREAM_CHUNK_CHARS", "80"))
+
+app = FastAPI(title="Gemini stub")
+
+
+def prompt_text(body: dict) -> str:
+    try:
+        return body["contents"][0]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
+def quiz_reply(prompt: str) -> dict:
+    match = re.search(r"(\d+) adet", prompt)
+    count = int(match.group(1)) if match else 5
+    return {
+        "questions": [
+            {
+                "question": f"Stub soru {i + 1}",
+                "options": ["A) Birinci", "B) İkinci", "C) Üçüncü", "D) Dördüncü"],
+                "correct_answer": "A) Birinci",
+                "explanation": "Stub açıklama",
+                "hint": "Stub ipucu",
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def cultural_reply() -> dict:
+    # Havuzdaki tekrar kontrolüne takılmaması için her soru benzersiz
+    return {
+        "questions": [
+            {"question": f"Stub genel kültür sorusu {uuid.uuid4().hex[:12]}?", "answer": "Stub cevap"}
+            for _ in range(10)
+        ]
+    }
+
+
+def build_reply(prompt: str) -> str:
+    if "YANIT FORMATI" in prompt:
+        data = cultural_reply() if "genel kültür" in prompt.lower() else quiz_reply(prompt)
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+        if REPLY_MODE == "fenced":
+            return f"```json\n{text}\n```"
+        if REPLY_MODE == "text":
+            return f"İşte sorular:\n{text}"
+        return text
+    return f"- Stub özet/düzenleme ({len(prompt)} karakterlik prompt)"
+
+
+def candidate(text: str) -> dict:
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+async def simulate_upstream():
+    delay = max(0.0, random.gauss(LATENCY_MS, LATENCY_JITTER_MS)) / 1000
+    await asyncio.sleep(delay)
+    roll = random.random()
+    if roll < RATE_LIMIT_RATE:
+        raise HTTPException(status_code=429, detail="Resource has been exhausted")
+    if roll < RATE_LIMIT_RATE + ERROR_RATE:
+        raise HTTPException(status_code=500, detail="Internal error")
+
+
+@app.post("/v1beta/models/{model_action}")
+async def models_endpoint(model_action: str, request: Request):
+    action = model_action.partition(":")[2]
+    body = await request.json()
+    reply = build_reply(prompt_text(body))
+
+    await simulate_upstream()
+
+    if action == "generateContent":
+        return candidate(reply)
+
+    if action == "streamGenerateContent":
+        async def events():
+            for i in range(0, len(reply), STREAM_CHUNK_CHARS):
+                yield f"data: {json.dumps(candidate(reply[i:i + STREAM_CHUNK_CHARS]), ensure_ascii=False)}\r\n\r\n"
+                await asyncio.sleep(STREAM_CHUNK_MS / 1000)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    raise HTTPException(status_code=404, detail=f"Unknown action: {action}")
@@ -0,0 +1,117 @@
+"""AI endpoint'leri için asyncio tabanlı yük testi.
+
+Örnek:
+
+    python -m scripts.load_test --base-url http://localhost:8000 \\
+        --username demo --password demo --note-lesson 1 --note-term 1 \\
+        --concurrency 50 --duration 60
+
+Her senaryo için p50/p95/p99 gecikme, throughput ve hata sayıları raporlanır.
+Gemini kotası harcamamak için sunucu GEMINI_BASE_URL ile scripts/gemini_stub.py'ye
+yönlendirilmiş olmalıdır.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def build_scenarios(args) -> dict:
+    scenarios = {
+        "cultural": lambda client: client.get("/api/getCulturalInformations"),
+        "ai_checking": lambda client: client.post(
+            "/notes/ai_checking",
+            data={"content": f"Yük testi notu {random.randint(0, args.unique_notes)}: fotosentez klorofil ile olur."},
+        ),
+    }
+    if args.note_lesson and args.note_term:
+        scenarios["note_quiz"] = lambda client: client.get(
+            f"/api/createNoteQuiz/{args.note_lesson}/{args.note_term}/{random.randint(1, 3)}/{args.quiz_count}"
+        )
+    return {name: scenarios[name] for name in args.scenarios if name in scenarios}
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def worker(client, scenarios, deadline, results, errors):
+    names = list(scenarios)
+    while time.perf_counter() < deadline:
+        name = random.choice(names)
+        started = time.perf_counter()
+        try:
+            response = await scenarios[name](client)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                errors[name][response.status_code] += 1
+            else:
+                results[name].append(elapsed)
+        except httpx.HTTPError as e:
+            errors[name][type(e).__name__] += 1
+
+
+def report(results, errors, duration):
+    print(f"\n{'senaryo':<14}{'ok':>8}{'hata':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in sorted(set(results) | set(errors)):
+        latencies = results[name]
+        failed = sum(errors[name].values())
+        print(
+            f"{name:<14}{len(latencies):>8}{failed:>8}{len(latencies) / duration:>9.1f}"
+            f"{percentile(latencies, 50) * 1000:>10.0f}"
+            f"{percentile(latencies, 95) * 1000:>10.0f}"
+            f"{percentile(latencies, 99) * 1000:>10.0f}"
+        )
+        if errors[name]:
+            print(f"{'':<14}hatalar: {dict(errors[name])}")
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        token = args.token or await login(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        scenarios = build_scenarios(args)
+        if not scenarios:
+            raise SystemExit("Çalıştırılacak senaryo yok (note_quiz için --note-lesson ve --note-term gerekli)")
+
+        results = defaultdict(list)
+        errors = defaultdict(lambda: defaultdict(int))
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            worker(client, scenarios, deadline, results, errors) for _ in range(args.concurrency)
+        ))
+        report(results, errors, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI endpoint yük testi")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", help="Hazır bearer token, verilmezse --username/--password ile giriş yapılır")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--note-lesson", type=int)
+    parser.add_argument("--note-term", type=int)
+    parser.add_argument("--quiz-count", type=int, default=5)
+    parser.add_argument("--unique-notes", type=int, default=1000,
+                        help="ai_checking için farklı içerik sayısı (önbellek isabet oranını belirler)")
+    parser.add_argument("--scenarios", nargs="+", default=["cultural", "ai_checking", "note_quiz"])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="saniye")
+    parser.add_argument("--timeout", type=float, default=60)
+    asyncio.run(main(parser.parse_args()))
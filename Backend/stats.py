@@ -0,0 +1,192 @@
+"""Kullanıcı başına sayaçlar.
+
+user_stats tablosu her kullanıcı için tek satır tutar ve oluşturma, güncelleme,
+silme yollarında adjust() ile aynı transaction içinde güncellenir. İstatistik
+okumak böylece tek bir primary key sorgusudur. Sayaçlar kayarsa reconcile()
+satırları gerçek tablolardan yeniden hesaplar:
+
+    python stats.py            # tüm kullanıcılar
+    python stats.py <user_id>  # tek kullanıcı
+"""
+import sys
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select, func, distinct, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# Script olarak çalıştırıldığında database import edilmeden önce DSN okunsun
+load_dotenv()
+
+from models import User, UserStats, Note, NoteTerm, NoteLesson, Question, QuestionTerm, QuestionLesson  # noqa: E402
+
+DIFFICULTY_NAMES = {1: "easy", 2: "medium", 3: "hard"}
+
+COUNTER_COLUMNS = (
+    "note_lessons", "note_terms", "notes",
+    "question_lessons", "question_terms", "questions",
+    "questions_easy", "questions_medium", "questions_hard",
+)
+
+
+def difficulty_column(difficulty: int) -> str:
+    return f"questions_{DIFFICULTY_NAMES[difficulty]}"
+
+
+async def adjust(db: AsyncSession, user_id: int, **deltas: int):
+    """Sayaçları atomik olarak artırır/azaltır, commit çağıranın transaction'ına bırakılır"""
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = UserStats.__table__
+    stmt = insert(table).values(user_id=user_id, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={column: table.c[column] + stmt.excluded[column] for column in deltas},
+    )
+    await db.execute(stmt)
+
+
+async def note_removal_deltas(db: AsyncSession, *criteria) -> dict:
+    """Koşula uyan note term'leri cascade ile silindiğinde düşülecek sayaçlar"""
+    row = (await db.execute(
+        select(
+            func.count(distinct(NoteTerm.id)).label("note_terms"),
+            func.count(Note.id).label("notes"),
+        ).select_from(NoteTerm).outerjoin(Note, Note.term_id == NoteTerm.id).where(*criteria)
+    )).one()
+    return {"note_terms": -row.note_terms, "notes": -row.notes}
+
+
+async def question_removal_deltas(db: AsyncSession, *criteria) -> dict:
+    """Koşula uyan question term'leri cascade ile silindiğinde düşülecek sayaçlar"""
+    by_difficulty = [
+        func.count(Question.id).filter(Question.difficulty_category == difficulty).label(difficulty_column(difficulty))
+        for difficulty in DIFFICULTY_NAMES
+    ]
+    row = (await db.execute(
+        select(
+            func.count(distinct(QuestionTerm.id)).label("question_terms"),
+            func.count(Question.id).label("questions"),
+            *by_difficulty,
+        ).select_from(QuestionTerm).outerjoin(Question, Question.term_id == QuestionTerm.id).where(*criteria)
+    )).one()
+    return {column: -value for column, value in row._mapping.items()}
+
+
+def note_counts_query():
+    """Kullanıcı başına ders, konu ve not sayıları"""
+    return select(
+        NoteLesson.user_id,
+        func.count(distinct(NoteLesson.id)).label("note_lessons"),
+        func.count(distinct(NoteTerm.id)).label("note_terms"),
+        func.count(Note.id).label("notes"),
+    ).select_from(NoteLesson).outerjoin(
+        NoteTerm, NoteTerm.n_lesson_id == NoteLesson.id
+    ).outerjoin(
+        Note, Note.term_id == NoteTerm.id
+    ).group_by(NoteLesson.user_id)
+
+
+def question_counts_query():
+    """Kullanıcı başına ders, konu, soru ve zorluk bazında soru sayıları"""
+    by_difficulty = [
+        func.count(Question.id).filter(Question.difficulty_category == difficulty).label(difficulty_column(difficulty))
+        for difficulty in DIFFICULTY_NAMES
+    ]
+    return select(
+        QuestionLesson.user_id,
+        func.count(distinct(QuestionLesson.id)).label("question_lessons"),
+        func.count(distinct(QuestionTerm.id)).label("question_terms"),
+        func.count(Question.id).label("questions"),
+        *by_difficulty,
+    ).select_from(QuestionLesson).outerjoin(
+        QuestionTerm, QuestionTerm.q_lesson_id == QuestionLesson.id
+    ).outerjoin(
+        Question, Question.term_id == QuestionTerm.id
+    ).group_by(QuestionLesson.user_id)
+
+
+def reconcile(db: Session, user_id: Optional[int] = None) -> int:
+    """user_stats satırlarını gerçek tablolardan tek INSERT ... SELECT ile yeniden yazar"""
+    note_counts = note_counts_query()
+    question_counts = question_counts_query()
+    users = select(User.id)
+    if user_id is not None:
+        note_counts = note_counts.where(NoteLesson.user_id == user_id)
+        question_counts = question_counts.where(QuestionLesson.user_id == user_id)
+        users = users.where(User.id == user_id)
+    note_counts = note_counts.subquery()
+    question_counts = question_counts.subquery()
+    users = users.subquery()
+
+    def counter(column: str):
+        source = note_counts if column.startswith("note") else question_counts
+        return func.coalesce(source.c[column], literal(0))
+
+    source = select(users.c.id, *(counter(column) for column in COUNTER_COLUMNS)).select_from(
+        users.outerjoin(note_counts, note_counts.c.user_id == users.c.id)
+        .outerjoin(question_counts, question_counts.c.user_id == users.c.id)
+    )
+    table = UserStats.__table__
+    stmt = insert(table).from_select(["user_id", *COUNTER_COLUMNS], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={column: stmt.excluded[column] for column in COUNTER_COLUMNS},
+    )
+    return db.execute(stmt).rowcount
+
+
+async def get_counters(db: AsyncSession, user_id: int) -> dict:
+    row = (await db.execute(select(UserStats.__table__).where(UserStats.user_id == user_id))).first()
+    if row is None:
+        # Henüz hiç içerik oluşturmamış kullanıcı
+        return {column: 0 for column in COUNTER_COLUMNS}
+    return dict(row._mapping)
+
+
+def format_note_statistics(counters: dict) -> dict:
+    return {
+        "total_notes": counters["notes"],
+        "total_lessons": counters["note_lessons"],
+        "total_terms": counters["note_terms"],
+    }
+
+
+def format_question_statistics(counters: dict) -> dict:
+    return {
+        "total_questions": counters["questions"],
+        "by_difficulty": {name: counters[f"questions_{name}"] for name in DIFFICULTY_NAMES.values()},
+        "total_lessons": counters["question_lessons"],
+        "total_terms": counters["question_terms"],
+    }
+
+
+async def get_note_statistics(db: AsyncSession, user_id: int) -> dict:
+    return format_note_statistics(await get_counters(db, user_id))
+
+
+async def get_question_statistics(db: AsyncSession, user_id: int) -> dict:
+    return format_question_statistics(await get_counters(db, user_id))
+
+
+async def get_dashboard_statistics(db: AsyncSession, user_id: int) -> dict:
+    counters = await get_counters(db, user_id)
+    return {
+        "notes": format_note_statistics(counters),
+        "questions": format_question_statistics(counters),
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        updated = reconcile(db, int(sys.argv[1]) if len(sys.argv) > 1 else None)
+        db.commit()
+        print(f"{updated} kullanıcının istatistikleri yeniden hesaplandı")
+    finally:
+        db.close()
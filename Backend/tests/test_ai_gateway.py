@@ -0,0 +1,255 @@
+import asyncio
+
+import pytest
+
+import ai_gateway
+from ai_client import AIServiceError
+from ai_gateway import AIUnavailableError, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ai_gateway.time, "monotonic", fake)
+    return fake
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+# ===== DURUM GEÇİŞLERİ =====
+
+def test_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_single_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+    clock.now += 29
+    assert breaker.allow_request() == CircuitBreaker.REJECTED
+    clock.now += 1
+    assert breaker.allow_request() == CircuitBreaker.TRIAL
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() == CircuitBreaker.REJECTED
+
+
+def test_half_open_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request() == CircuitBreaker.TRIAL
+    breaker.record_success(trial=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() == CircuitBreaker.ALLOWED
+
+
+def test_half_open_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request() == CircuitBreaker.TRIAL
+    breaker.record_failure(trial=True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_released_trial_allows_next_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request() == CircuitBreaker.TRIAL
+    breaker.release_trial()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() == CircuitBreaker.TRIAL
+
+
+def test_late_failure_of_closed_request_keeps_trial_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    assert breaker.allow_request() == CircuitBreaker.ALLOWED
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request() == CircuitBreaker.TRIAL
+    # Devre kapalıyken kabul edilen istek deneme sürerken başarısız biter
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request() == CircuitBreaker.REJECTED
+
+
+# ===== GATEWAY ÜZERİNDEN =====
+
+@pytest.fixture
+def gateway(monkeypatch, clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    monkeypatch.setattr(ai_gateway, "circuit", breaker)
+    monkeypatch.setattr(ai_gateway, "AI_MAX_RETRIES", 0)
+    monkeypatch.setattr(ai_gateway, "_key_cooldown_until", {})
+
+    responses = []
+
+    async def fake_generate_content(prompt, key, timeout=None):
+        response = responses.pop(0)
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+    monkeypatch.setattr(ai_gateway, "generate_content", fake_generate_content)
+    return breaker, responses
+
+
+def call():
+    return asyncio.run(ai_gateway.generate("prompt", "key"))
+
+
+def test_rate_limit_during_trial_does_not_stick_half_open(gateway):
+    breaker, responses = gateway
+    responses.extend([
+        AIServiceError("upstream", status_code=500),
+        AIServiceError("upstream", status_code=500),
+        AIServiceError("quota", status_code=429),
+        "ok",
+    ])
+    for _ in range(2):
+        with pytest.raises(AIServiceError):
+            call()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(AIServiceError) as error:
+        call()
+    assert error.value.status_code == 429
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    assert call() == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_unexpected_error_during_trial_releases_it(gateway):
+    breaker, responses = gateway
+    responses.extend([
+        AIServiceError("upstream", status_code=503),
+        AIServiceError("upstream", status_code=503),
+        ValueError("bozuk yanıt"),
+        "ok",
+    ])
+    for _ in range(2):
+        with pytest.raises(AIServiceError):
+            call()
+
+    with pytest.raises(ValueError):
+        call()
+    assert call() == "ok"
+
+
+def test_cancelled_trial_releases_it(gateway):
+    breaker, responses = gateway
+    responses.extend([
+        AIServiceError("upstream", status_code=500),
+        AIServiceError("upstream", status_code=500),
+        asyncio.CancelledError(),
+        "ok",
+    ])
+    for _ in range(2):
+        with pytest.raises(AIServiceError):
+            call()
+
+    with pytest.raises(asyncio.CancelledError):
+        call()
+    assert call() == "ok"
+
+
+def test_client_errors_do_not_open_breaker(gateway):
+    breaker, responses = gateway
+    responses.extend([AIServiceError("bad request", status_code=400) for _ in range(5)])
+    for _ in range(5):
+        with pytest.raises(AIServiceError):
+            call()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_request_admitted_while_closed_does_not_release_trial(gateway, monkeypatch):
+    breaker, responses = gateway
+
+    async def scenario():
+        finish = asyncio.Event()
+
+        async def slow_generate_content(prompt, key, timeout=None):
+            await finish.wait()
+            raise ValueError("bozuk yanıt")
+
+        monkeypatch.setattr(ai_gateway, "generate_content", slow_generate_content)
+        request = asyncio.create_task(ai_gateway.generate("prompt", "key"))
+        await asyncio.sleep(0)
+        # İstek sürerken devre açılır ve yarı açıkta bir deneme başlar
+        open_breaker(breaker)
+        assert breaker.allow_request() == CircuitBreaker.TRIAL
+        finish.set()
+        with pytest.raises(ValueError):
+            await request
+        assert breaker.allow_request() == CircuitBreaker.REJECTED
+
+    asyncio.run(scenario())
+
+
+def test_open_breaker_rejects_without_calling_upstream(gateway, monkeypatch):
+    breaker, responses = gateway
+    breaker.reset_timeout = 30
+    responses.extend([
+        AIServiceError("upstream", status_code=500),
+        AIServiceError("upstream", status_code=500),
+    ])
+    for _ in range(2):
+        with pytest.raises(AIServiceError):
+            call()
+    with pytest.raises(AIUnavailableError):
+        call()
+
+
+def test_fallback_key_counts_as_configured(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_API_KEY_3", raising=False)
+    assert not ai_gateway.has_api_key()
+    monkeypatch.setenv("GOOGLE_API_KEY_3", "yedek")
+    assert ai_gateway.has_api_key()
+    assert ai_gateway.candidate_keys(None) == ["yedek"]
+
+
+def test_cultural_pool_falls_back_to_primary_key(gateway, monkeypatch):
+    import cultural_pool
+
+    breaker, responses = gateway
+    used_keys = []
+
+    async def fake_generate_content(prompt, key, timeout=None):
+        used_keys.append(key)
+        return '{"questions": []}'
+
+    monkeypatch.setattr(ai_gateway, "generate_content", fake_generate_content)
+    monkeypatch.setenv("GOOGLE_API_KEY", "ana")
+    monkeypatch.delenv("GOOGLE_API_KEY_3", raising=False)
+    assert asyncio.run(cultural_pool.generate_cultural_questions()) == []
+    assert used_keys == ["ana"]
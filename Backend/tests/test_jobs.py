@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+import jobs
+
+
+class RecordingBackend(jobs.MemoryJobBackend):
+    def __init__(self, renew_result=True):
+        super().__init__()
+        self.renew_result = renew_result
+        self.renewed = []
+        self.released = []
+
+    async def renew(self, job_id: str) -> bool:
+        self.renewed.append(job_id)
+        return self.renew_result
+
+    async def release(self, job_id: str):
+        self.released.append(job_id)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    fake = RecordingBackend()
+    monkeypatch.setattr(jobs, "backend", fake)
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.03)
+    monkeypatch.setattr(jobs, "_stopping", False)
+    return fake
+
+
+def running_job(backend, kind: str) -> dict:
+    job = jobs.new_job(kind, 1, {}, 0)
+    job.update(status=jobs.RUNNING, started_at=jobs.now())
+    backend._jobs[job["id"]] = job
+    return job
+
+
+def test_lease_is_renewed_while_job_runs(backend, monkeypatch):
+    async def handler(job):
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    monkeypatch.setitem(jobs._handlers, "slow", handler)
+    job = running_job(backend, "slow")
+    asyncio.run(jobs._run_job(job))
+
+    assert job["status"] == jobs.DONE
+    assert backend.renewed
+
+
+def test_lost_lease_cancels_job(backend, monkeypatch):
+    backend.renew_result = False
+    cancelled = []
+
+    async def handler(job):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(job["id"])
+            raise
+
+    monkeypatch.setitem(jobs._handlers, "slow", handler)
+    job = running_job(backend, "slow")
+    asyncio.run(jobs._run_job(job))
+
+    assert cancelled == [job["id"]]
+    assert job["status"] == jobs.RUNNING
+    assert not backend.released
+
+
+def test_shutdown_releases_running_job(backend, monkeypatch):
+    async def handler(job):
+        await asyncio.sleep(1)
+
+    monkeypatch.setitem(jobs._handlers, "slow", handler)
+    job = running_job(backend, "slow")
+
+    async def scenario():
+        runner = asyncio.create_task(jobs._run_job(job))
+        await asyncio.sleep(0.01)
+        monkeypatch.setattr(jobs, "_stopping", True)
+        runner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await runner
+
+    asyncio.run(scenario())
+    assert backend.released == [job["id"]]
+
+
+def test_sweep_purges_expired_results(backend, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RESULT_TTL", 0)
+    job = running_job(backend, "slow")
+    job.update(status=jobs.DONE, finished_at=jobs.now())
+
+    asyncio.run(backend.sweep())
+    assert job["id"] not in backend._jobs
+
+
+def test_worker_survives_backend_errors(backend, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_POLL_INTERVAL", 0)
+    ran = []
+
+    async def handler(job):
+        ran.append(job["id"])
+        return {}
+
+    monkeypatch.setitem(jobs._handlers, "quick", handler)
+    job = running_job(backend, "quick")
+    claims = [ConnectionError("veritabanı yok"), job]
+
+    async def next_job():
+        if not claims:
+            await asyncio.sleep(10)
+        claim = claims.pop(0)
+        if isinstance(claim, Exception):
+            raise claim
+        return claim
+
+    monkeypatch.setattr(backend, "next_job", next_job)
+
+    async def scenario():
+        worker = asyncio.create_task(jobs._worker())
+        await asyncio.sleep(0.05)
+        assert not worker.done()
+        worker.cancel()
+
+    asyncio.run(scenario())
+    assert ran == [job["id"]]
+
+
+def test_priority_comes_from_job_kind(backend, monkeypatch):
+    async def handler(job):
+        return {}
+
+    monkeypatch.setitem(jobs._handlers, "urgent", handler)
+    monkeypatch.setitem(jobs._priorities, "urgent", 7)
+    job = asyncio.run(jobs.submit("urgent", 1, {}))
+    assert job["priority"] == 7
@@ -0,0 +1,190 @@
+import asyncio
+import time
+
+import pytest
+
+import read_routing
+from database import AsyncSessionLocal
+
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def scalar(self, statement):
+        self.engine.queries += 1
+        if isinstance(self.engine.mark, Exception):
+            raise self.engine.mark
+        return self.engine.mark
+
+
+class FakeEngine:
+    def __init__(self, mark=None):
+        self.mark = mark
+        self.queries = 0
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+REPLICA = object()
+
+
+@pytest.fixture
+def routing(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(read_routing, "async_engine", engine)
+    monkeypatch.setattr(read_routing, "ReplicaSessionLocals", [REPLICA])
+    monkeypatch.setattr(read_routing, "_replica_lag", [0.0])
+    monkeypatch.setattr(read_routing, "_last_write", {})
+    monkeypatch.setattr(read_routing, "_no_recent_write", {})
+    return engine
+
+
+def choose(read=True, user_id=1, write_token=None):
+    return asyncio.run(read_routing.session_factory(read, user_id, write_token))
+
+
+def test_reads_go_to_replica_without_recent_write(routing):
+    assert choose() is REPLICA
+    assert routing.queries == 1
+
+
+def test_write_in_another_worker_keeps_reads_on_primary(routing):
+    routing.mark = 1
+    assert choose() is AsyncSessionLocal
+
+
+def test_write_in_this_worker_skips_primary_lookup(routing):
+    read_routing.record_write(1)
+    assert choose() is AsyncSessionLocal
+    assert routing.queries == 0
+
+
+def test_unreadable_mark_falls_back_to_primary(routing):
+    routing.mark = RuntimeError("bağlantı yok")
+    assert choose() is AsyncSessionLocal
+
+
+def test_writes_never_consult_marks(routing):
+    assert choose(read=False) is AsyncSessionLocal
+    assert routing.queries == 0
+
+
+def test_unhealthy_replicas_skip_lookup(routing, monkeypatch):
+    monkeypatch.setattr(read_routing, "_replica_lag", [float("inf")])
+    assert choose() is AsyncSessionLocal
+    assert routing.queries == 0
+
+
+def test_negative_result_is_cached(routing):
+    assert choose() is REPLICA
+    routing.mark = 1
+    assert choose() is REPLICA
+    assert routing.queries == 1
+
+
+def test_recent_write_token_skips_primary_lookup(routing):
+    token = read_routing.sign_write(1, time.time())
+    assert choose(write_token=token) is AsyncSessionLocal
+    assert routing.queries == 0
+
+
+def test_old_write_token_reads_from_replica(routing):
+    routing.mark = 1
+    token = read_routing.sign_write(1, time.time() - read_routing.READ_YOUR_WRITES_SECONDS - 1)
+    assert choose(write_token=token) is REPLICA
+    assert routing.queries == 0
+
+
+def test_forged_or_foreign_token_is_ignored(routing):
+    routing.mark = 1
+    forged = read_routing.sign_write(1, time.time() - 3600).rsplit(":", 1)[0] + ":00"
+    assert choose(write_token=forged) is AsyncSessionLocal
+    assert choose(user_id=2, write_token=read_routing.sign_write(1, time.time() - 3600)) is AsyncSessionLocal
+    assert routing.queries == 2
+
+
+# ===== YAZMA İŞARETİ =====
+
+from sqlalchemy import Column, Integer, String, create_engine, update  # noqa: E402
+from sqlalchemy.orm import Session, declarative_base  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+LocalBase = declarative_base()
+
+
+class Item(LocalBase):
+    __tablename__ = "items"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(read_routing, "ReplicaSessionLocals", [])
+    monkeypatch.setattr(read_routing, "_last_write", {})
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    LocalBase.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Item(id=1, name="a"))
+        db.commit()
+        db.info["write_user_id"] = 7
+        yield db
+
+
+def test_read_only_commit_is_not_a_write(session):
+    session.get(Item, 1)
+    session.commit()
+    assert not read_routing.recently_wrote(7)
+
+
+def test_pending_changes_count_as_write(session):
+    session.get(Item, 1).name = "b"
+    session.commit()
+    assert read_routing.recently_wrote(7)
+
+
+def test_update_statement_counts_as_write(session):
+    session.execute(update(Item).where(Item.id == 1).values(name="c"))
+    session.commit()
+    assert read_routing.recently_wrote(7)
+
+
+def test_rolled_back_write_is_forgotten(session):
+    session.get(Item, 1).name = "d"
+    session.flush()
+    session.rollback()
+    session.commit()
+    assert not read_routing.recently_wrote(7)
+
+
+def test_write_response_carries_signed_token(session):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.add_middleware(read_routing.WriteTokenMiddleware)
+
+    @app.get("/read")
+    def read():
+        session.get(Item, 1)
+        session.commit()
+        return {}
+
+    @app.post("/write")
+    def write():
+        session.get(Item, 1).name = "e"
+        session.commit()
+        return {}
+
+    client = TestClient(app)
+    assert read_routing.WRITE_TOKEN_HEADER not in client.get("/read").headers
+    token = client.post("/write").headers[read_routing.WRITE_TOKEN_HEADER]
+    assert abs(read_routing.written_at_from_token(token, 7) - time.time()) < 5
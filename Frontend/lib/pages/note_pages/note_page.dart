@@ -23,14 +23,27 @@ class NotePage extends StatefulWidget {
 }
 
 class _NotePageState extends State<NotePage> with TickerProviderStateMixin {
+  static const int pageSize = 50;
+  // Sunucunun döndürdüğü preview uzunluğu (NOTE_PREVIEW_LENGTH)
+  static const int previewLength = 120;
+
   List terms = [];
   List notes = [];
+  int? nextCursor;
+  bool isLoadingMore = false;
+  final ScrollController _scrollController = ScrollController();
   TabController? _tabController;
   int selectedTermIndex = 0;
 
   @override
   void initState() {
     super.initState();
+    // Listenin sonuna yaklaşınca sonraki sayfayı getir
+    _scrollController.addListener(() {
+      if (_scrollController.position.extentAfter < 300) {
+        fetchMoreNotes();
+      }
+    });
     fetchNotes();
   }
 
@@ -65,24 +78,73 @@ class _NotePageState extends State<NotePage> with TickerProviderStateMixin {
     }
   }
 
-  Future<void> fetchNotes() async {
+  // Liste içeriğin sadece başıyla, en yeni not önce sayfa sayfa gelir; tam içerik not açılınca alınır
+  Future<Map?> fetchNotePage(int? cursor) async {
     final response = await http.get(
       Uri.parse(
-          'http://10.0.2.2:8000/notes/${widget.lessonId}/${widget.termId}'),
+          'http://10.0.2.2:8000/notes/${widget.lessonId}/${widget.termId}'
+          '?fields=id,preview,term_id,lesson_id&order=desc&limit=$pageSize'
+          '${cursor != null ? '&after=$cursor' : ''}'),
       headers: {'Authorization': 'Bearer ${widget.token}'},
     );
 
-    if (response.statusCode == 200) {
-      final data = List.from(json.decode(response.body));
-      if (mounted) {
-        setState(() {
-          notes = data.reversed.toList(); // son eklenen üstte
-        });
-      }
-    } else {
+    if (response.statusCode != 200) {
       print('Notlar alınamadı: ${response.statusCode}');
       print(response.body);
+      return null;
+    }
+    return json.decode(response.body);
+  }
+
+  Future<void> fetchNotes() async {
+    final page = await fetchNotePage(null);
+    if (page == null || !mounted) return;
+    setState(() {
+      notes = List.from(page['items']);
+      nextCursor = page['next_cursor'];
+    });
+  }
+
+  Future<void> fetchMoreNotes() async {
+    if (nextCursor == null || isLoadingMore) return;
+    isLoadingMore = true;
+    final page = await fetchNotePage(nextCursor);
+    isLoadingMore = false;
+    if (page == null || !mounted) return;
+    setState(() {
+      notes.addAll(page['items']);
+      nextCursor = page['next_cursor'];
+    });
+  }
+
+  Future<void> openNote(int noteId) async {
+    final response = await http.get(
+      Uri.parse('http://10.0.2.2:8000/notes/$noteId'),
+      headers: {'Authorization': 'Bearer ${widget.token}'},
+    );
+
+    if (response.statusCode != 200) {
+      ScaffoldMessenger.of(context).showSnackBar(
+        const SnackBar(content: Text('Not açılamadı')),
+      );
+      return;
     }
+    final note = json.decode(response.body);
+    if (!mounted) return;
+    Navigator.push(
+      context,
+      MaterialPageRoute(
+        builder: (context) => ViewNotePage(
+          noteContent: note['content'],
+          noteTitle: 'Not',
+          token: widget.token,
+          lessonId: widget.lessonId,
+          termId: widget.termId,
+          noteId: noteId,
+          onNoteUpdated: () => fetchNotes(),
+        ),
+      ),
+    );
   }
 
   Future<void> deleteNote(int noteId) async {
@@ -105,6 +167,7 @@ class _NotePageState extends State<NotePage> with TickerProviderStateMixin {
 
   @override
   void dispose() {
+    _scrollController.dispose();
     super.dispose();
   }
 
@@ -129,8 +192,15 @@ class _NotePageState extends State<NotePage> with TickerProviderStateMixin {
               margin: EdgeInsets.only(top: 8),
               padding: EdgeInsets.all(8),
               child: ListView.builder(
-                itemCount: notes.length,
+                controller: _scrollController,
+                itemCount: notes.length + (nextCursor != null ? 1 : 0),
                 itemBuilder: (context, index) {
+                  if (index == notes.length) {
+                    return const Padding(
+                      padding: EdgeInsets.all(16),
+                      child: Center(child: CircularProgressIndicator()),
+                    );
+                  }
                   return Card(
                     margin: const EdgeInsets.symmetric(
                         vertical: 6.0, horizontal: 12.0),
@@ -138,14 +208,14 @@ class _NotePageState extends State<NotePage> with TickerProviderStateMixin {
                     child: ListTile(
                       leading: const Icon(Icons.note_alt),
                       title: Text(
-                        notes[index]['content'].length > 100
-                            ? '${notes[index]['content'].substring(0, 100)}...'
-                            : notes[index]['content'],
+                        notes[index]['preview'].length >= previewLength
+                            ? '${notes[index]['preview']}...'
+                            : notes[index]['preview'],
                         maxLines: 3,
                         overflow: TextOverflow.ellipsis,
                       ),
-                      subtitle: notes[index]['content'].length > 100
-                          ? Text('Devamını görmek için tıklayın')
+                      subtitle: notes[index]['preview'].length >= previewLength
+                          ? const Text('Devamını görmek için tıklayın')
                           : null,
                       trailing: IconButton(
                         icon: const Icon(Icons.delete, color: Colors.black),
@@ -177,22 +247,7 @@ class _NotePageState extends State<NotePage> with TickerProviderStateMixin {
                           }
                         },
                       ),
-                      onTap: () {
-                        Navigator.push(
-                          context,
-                          MaterialPageRoute(
-                            builder: (context) => ViewNotePage(
-                              noteContent: notes[index]['content'],
-                              noteTitle: 'Not',
-                              token: widget.token,
-                              lessonId: widget.lessonId,
-                              termId: widget.termId,
-                              noteId: notes[index]['id'],
-                              onNoteUpdated: () => fetchNotes(),
-                            ),
-                          ),
-                        );
-                      },
+                      onTap: () => openNote(notes[index]['id']),
                     ),
                   );
                 },
@@ -39,22 +39,15 @@ class _ViewNotePageState extends State<ViewNotePage> {
   Future<void> fetchUpdatedNote() async {
     try {
       final response = await http.get(
-        Uri.parse('http://10.0.2.2:8000/notes/${widget.lessonId}/${widget.termId}'),
+        Uri.parse('http://10.0.2.2:8000/notes/${widget.noteId}'),
         headers: {'Authorization': 'Bearer ${widget.token}'},
       );
 
       if (response.statusCode == 200) {
-        final data = List.from(json.decode(response.body));
-        final updatedNote = data.firstWhere(
-          (note) => note['id'] == widget.noteId,
-          orElse: () => null,
-        );
-        
-        if (updatedNote != null) {
-          setState(() {
-            currentContent = updatedNote['content'];
-          });
-        }
+        final updatedNote = json.decode(response.body);
+        setState(() {
+          currentContent = updatedNote['content'];
+        });
       }
     } catch (e) {
       print('Not güncellenirken hata: $e');
@@ -26,43 +26,84 @@ class TopicDetailPage extends StatefulWidget {
 }
 
 class _TopicDetailPageState extends State<TopicDetailPage> {
+  static const int pageSize = 20;
+
   int selectedDifficulty = 1;
   Map<int, List<Map<String, dynamic>>> questionsByDifficulty = {
     1: [],
     2: [],
     3: [],
   };
+  Map<int, int?> nextCursorByDifficulty = {1: null, 2: null, 3: null};
+  final Set<int> loadingDifficulties = {};
 
   final ImagePicker _picker = ImagePicker();
   final TextEditingController _noteController = TextEditingController();
+  final ScrollController _scrollController = ScrollController();
 
   @override
   void initState() {
     super.initState();
+    // Listenin sonuna yaklaşınca seçili zorluğun sonraki sayfasını getir
+    _scrollController.addListener(() {
+      if (_scrollController.position.extentAfter < 300) {
+        fetchMoreQuestions(selectedDifficulty);
+      }
+    });
     fetchAllQuestions();
   }
 
+  @override
+  void dispose() {
+    _scrollController.dispose();
+    _noteController.dispose();
+    super.dispose();
+  }
+
   Future<void> fetchAllQuestions() async {
     for (int difficulty in [1, 2, 3]) {
       await fetchQuestionsByDifficulty(difficulty);
     }
   }
 
-  Future<void> fetchQuestionsByDifficulty(int difficulty) async {
+  // Liste sayfa sayfa gelir; sonraki sayfa kaydırdıkça alınır
+  Future<Map?> fetchQuestionPage(int difficulty, int? cursor) async {
     final response = await http.get(
       Uri.parse(
-          'http://10.0.2.2:8000/questions/${widget.lessonId}/$difficulty/${widget.termId}'),
+          'http://10.0.2.2:8000/questions/${widget.lessonId}/$difficulty/${widget.termId}'
+          '?limit=$pageSize${cursor != null ? '&after=$cursor' : ''}'),
       headers: {'Authorization': 'Bearer ${widget.token}'},
     );
 
-    if (response.statusCode == 200) {
-      setState(() {
-        questionsByDifficulty[difficulty] =
-            List<Map<String, dynamic>>.from(json.decode(response.body));
-      });
-    } else {
+    if (response.statusCode != 200) {
       print("Hata: ${response.statusCode} - ${response.body}");
+      return null;
     }
+    return json.decode(response.body);
+  }
+
+  Future<void> fetchQuestionsByDifficulty(int difficulty) async {
+    final page = await fetchQuestionPage(difficulty, null);
+    if (page == null || !mounted) return;
+    setState(() {
+      questionsByDifficulty[difficulty] =
+          List<Map<String, dynamic>>.from(page['items']);
+      nextCursorByDifficulty[difficulty] = page['next_cursor'];
+    });
+  }
+
+  Future<void> fetchMoreQuestions(int difficulty) async {
+    final cursor = nextCursorByDifficulty[difficulty];
+    if (cursor == null || loadingDifficulties.contains(difficulty)) return;
+    loadingDifficulties.add(difficulty);
+    final page = await fetchQuestionPage(difficulty, cursor);
+    loadingDifficulties.remove(difficulty);
+    if (page == null || !mounted) return;
+    setState(() {
+      questionsByDifficulty[difficulty]!
+          .addAll(List<Map<String, dynamic>>.from(page['items']));
+      nextCursorByDifficulty[difficulty] = page['next_cursor'];
+    });
   }
 
   void _showAddQuestionDialog() async {
@@ -213,10 +254,21 @@ class _TopicDetailPageState extends State<TopicDetailPage> {
             child: questionsByDifficulty[selectedDifficulty]!.isEmpty
                 ? Center(child: Text("Soru yok"))
                 : ListView.builder(
+                    controller: _scrollController,
                     padding: EdgeInsets.symmetric(horizontal: 12, vertical: 8),
                     itemCount:
-                        questionsByDifficulty[selectedDifficulty]!.length,
+                        questionsByDifficulty[selectedDifficulty]!.length +
+                            (nextCursorByDifficulty[selectedDifficulty] != null
+                                ? 1
+                                : 0),
                     itemBuilder: (context, index) {
+                      if (index ==
+                          questionsByDifficulty[selectedDifficulty]!.length) {
+                        return Padding(
+                          padding: EdgeInsets.all(16),
+                          child: Center(child: CircularProgressIndicator()),
+                        );
+                      }
                       final question =
                           questionsByDifficulty[selectedDifficulty]![index];
                       return GestureDetector(